@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Cast, Concat
 from django.conf import settings
 from django.utils import timezone
 
@@ -10,6 +11,15 @@ class Booking(models.Model):
         REJECTED = 'rejected', 'Rejected'
         COMPLETED = 'completed', 'Completed'
 
+    # Target status -> statuses a booking may move to it from.
+    TRANSITIONS = {
+        Status.ACCEPTED: (Status.PENDING,),
+        Status.REJECTED: (Status.PENDING,),
+        Status.COMPLETED: (Status.ACCEPTED,),
+    }
+
+    MEET_LINK_PREFIX = 'https://meet.google.com/test-session-'
+
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='student_bookings')
     mentor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mentor_bookings')
     slot_time = models.DateTimeField()
@@ -17,12 +27,64 @@ class Booking(models.Model):
     payment_id = models.CharField(max_length=64, blank=True)
     meet_link = models.URLField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # Bumped by every status transition, for optimistic concurrency.
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # "My bookings" lists: student OR mentor, newest first.
+            models.Index(fields=['student', '-created_at'], name='booking_student_created_idx'),
+            models.Index(fields=['mentor', '-created_at'], name='booking_mentor_created_idx'),
+            # Mentor earnings: bookings per mentor in a given status.
+            models.Index(fields=['mentor', 'status'], name='booking_mentor_status_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Booking {self.id} {self.student} -> {self.mentor} at {self.slot_time} ({self.status})"
 
     def generate_meet_link(self) -> str:
         # Dummy meet link as requested
-        return f"https://meet.google.com/test-session-{self.id}"
+        return f"{self.MEET_LINK_PREFIX}{self.id}"
+
+    @classmethod
+    def meet_link_expression(cls):
+        """SQL expression for generate_meet_link(), for bulk UPDATEs."""
+        return Concat(
+            models.Value(cls.MEET_LINK_PREFIX), Cast('id', models.CharField()), output_field=models.URLField(),
+        )
+
+    def can_transition(self, target) -> bool:
+        return self.status in self.TRANSITIONS.get(target, ())
+
+    @classmethod
+    def transition_updates(cls, target) -> dict:
+        """Column updates moving a booking to ``target``; accepting also fills in a missing meet link."""
+        updates = {'status': target, 'version': models.F('version') + 1}
+        if target == cls.Status.ACCEPTED:
+            updates['meet_link'] = models.Case(
+                models.When(meet_link='', then=cls.meet_link_expression()),
+                default=models.F('meet_link'),
+            )
+        return updates
+
+    def transition(self, target, version=None) -> bool:
+        """Move to ``target`` with one conditional UPDATE of the changed columns.
+
+        The UPDATE only matches while the row is still in a status ``target``
+        may follow (and, if given, still at ``version``); returns False when a
+        concurrent change got there first. On success the instance is updated
+        to match the row.
+        """
+        filters = {'pk': self.pk, 'status__in': self.TRANSITIONS[target]}
+        if version is not None:
+            filters['version'] = version
+        if not type(self).objects.filter(**filters).update(**self.transition_updates(target)):
+            return False
+        self.status = target
+        self.version = (self.version if version is None else version) + 1
+        if target == self.Status.ACCEPTED and not self.meet_link:
+            self.meet_link = self.generate_meet_link()
+        return True
+
 
 # Create your models here.
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 
 from .models import Booking
@@ -7,9 +8,9 @@ class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = [
-            'id', 'student', 'mentor', 'slot_time', 'status', 'payment_id', 'meet_link', 'created_at',
+            'id', 'student', 'mentor', 'slot_time', 'status', 'payment_id', 'meet_link', 'created_at', 'version',
         ]
-        read_only_fields = ['id', 'status', 'meet_link', 'created_at', 'student']
+        read_only_fields = ['id', 'status', 'meet_link', 'created_at', 'student', 'version']
 
     def create(self, validated_data):
         request = self.context['request']
@@ -19,3 +20,10 @@ class BookingSerializer(serializers.ModelSerializer):
         return booking
 
 
+class BulkBookingActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=['accept', 'reject', 'complete'])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BOOKING_BULK_MAX_IDS,
+    )
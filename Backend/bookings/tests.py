@@ -1,3 +1,142 @@
+from django.conf import settings
+from django.db import models
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from unimentor.query_plans import QueryPlanTestMixin
+from users.models import User
+from .models import Booking
+from .views import BookingViewSet
+
+
+class BookingQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x')
+        cls.mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        Booking.objects.create(student=cls.student, mentor=cls.mentor, slot_time=timezone.now())
+
+    def test_participant_list_uses_index(self):
+        user = self.student
+        qs = BookingViewSet.queryset.filter(models.Q(student=user) | models.Q(mentor=user))
+        self.assertNoFullTableScan(qs)
+
+    def test_mentor_earnings_uses_index(self):
+        qs = Booking.objects.filter(
+            mentor=self.mentor, status__in=[Booking.Status.ACCEPTED, Booking.Status.COMPLETED],
+        )
+        self.assertNoFullTableScan(qs)
+
+
+class BulkBookingActionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x')
+        cls.mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        other_mentor = User.objects.create_user('other', password='x', role=User.Role.MENTOR)
+        now = timezone.now()
+        cls.pending = [
+            Booking.objects.create(student=cls.student, mentor=cls.mentor, slot_time=now) for _ in range(3)
+        ]
+        cls.accepted = Booking.objects.create(
+            student=cls.student, mentor=cls.mentor, slot_time=now, status=Booking.Status.ACCEPTED,
+        )
+        cls.foreign = Booking.objects.create(student=cls.student, mentor=other_mentor, slot_time=now)
+
+    def bulk(self, user, action, ids):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/bookings/bulk/', {'action': action, 'ids': ids}, format='json')
+
+    def test_accept_updates_in_one_statement_and_reports_each_id(self):
+        ids = [b.id for b in self.pending] + [self.accepted.id, self.foreign.id, 999999]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            # SAVEPOINT, SELECT ... FOR UPDATE, UPDATE, RELEASE SAVEPOINT
+            with self.assertNumQueries(4):
+                response = self.bulk(self.mentor, 'accept', ids)
+        self.assertEqual(response.status_code, 200)
+        outcomes = {row['id']: row['outcome'] for row in response.data['results']}
+        self.assertEqual(outcomes, {
+            **{b.id: 'updated' for b in self.pending},
+            self.accepted.id: 'invalid_status',
+            self.foreign.id: 'not_found',
+            999999: 'not_found',
+        })
+        for booking in self.pending:
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, Booking.Status.ACCEPTED)
+            self.assertEqual(booking.meet_link, booking.generate_meet_link())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_student_cannot_accept(self):
+        response = self.bulk(self.student, 'accept', [self.pending[0].id])
+        self.assertEqual(response.data['results'][0]['outcome'], 'forbidden')
+        self.pending[0].refresh_from_db()
+        self.assertEqual(self.pending[0].status, Booking.Status.PENDING)
+
+    def test_student_can_complete_accepted(self):
+        response = self.bulk(self.student, 'complete', [self.accepted.id, self.pending[0].id])
+        self.assertEqual(
+            [row['outcome'] for row in response.data['results']], ['updated', 'invalid_status'],
+        )
+
+    def test_rejects_too_many_ids(self):
+        response = self.bulk(self.mentor, 'reject', list(range(1, settings.BOOKING_BULK_MAX_IDS + 2)))
+        self.assertEqual(response.status_code, 400)
+
+
+class BookingTransitionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x')
+        cls.mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+
+    def setUp(self):
+        self.booking = Booking.objects.create(student=self.student, mentor=self.mentor, slot_time=timezone.now())
+
+    def post(self, user, action, **data):
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/bookings/{self.booking.id}/{action}/', data, format='json')
+
+    def test_accept_is_one_read_and_one_update(self):
+        with self.assertNumQueries(2):
+            response = self.post(self.mentor, 'accept')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], Booking.Status.ACCEPTED)
+        self.assertEqual(response.data['version'], 1)
+        self.booking.refresh_from_db()
+        self.assertEqual(response.data['meet_link'], self.booking.meet_link)
+        self.assertEqual(self.booking.meet_link, self.booking.generate_meet_link())
+
+    def test_invalid_transitions_conflict(self):
+        self.assertEqual(self.post(self.mentor, 'reject').status_code, 200)
+        response = self.post(self.student, 'complete')
+        self.assertEqual(response.status_code, 409)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Booking.Status.REJECTED)
+
+    def test_stale_version_conflicts(self):
+        self.assertEqual(self.post(self.mentor, 'accept', version=1).status_code, 409)
+        self.assertEqual(self.post(self.mentor, 'accept', version=0).status_code, 200)
+        self.assertEqual(self.post(self.student, 'complete', version=0).status_code, 409)
+        self.assertEqual(self.post(self.student, 'complete', version=1).status_code, 200)
+
+    def test_concurrent_transition_loses(self):
+        stale = Booking.objects.get(pk=self.booking.pk)
+        self.assertTrue(self.booking.transition(Booking.Status.REJECTED, version=0))
+        self.assertFalse(stale.transition(Booking.Status.ACCEPTED, version=stale.version))
+        self.assertEqual(stale.status, Booking.Status.PENDING)
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.version), (Booking.Status.REJECTED, 1))
+
+    def test_student_cannot_accept(self):
+        self.assertEqual(self.post(self.student, 'accept').status_code, 403)
+
+    def test_create_with_idempotency_key_books_once(self):
+        self.client.force_authenticate(self.student)
+        data = {'mentor': self.mentor.id, 'slot_time': timezone.now().isoformat()}
+        first = self.client.post('/api/bookings/', data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        retry = self.client.post('/api/bookings/', data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Booking.objects.filter(student=self.student).count(), 2)  # setUp's and this one
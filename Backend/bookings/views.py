@@ -1,10 +1,14 @@
-from rest_framework import viewsets, permissions
+from functools import partial
+
+from rest_framework import exceptions, serializers, viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import models
+from django.db import models, transaction
 
+from unimentor.fieldsets import SparseFieldsetMixin
+from unimentor.idempotency import idempotent
 from .models import Booking
-from .serializers import BookingSerializer
+from .serializers import BookingSerializer, BulkBookingActionSerializer
 
 
 def send_email_reminder_placeholder(booking: Booking):
@@ -12,6 +16,26 @@ def send_email_reminder_placeholder(booking: Booking):
     print(f"[Email Placeholder] Reminder sent for booking {booking.id} at {booking.slot_time}")
 
 
+def send_email_reminders_placeholder(booking_ids):
+    # Placeholder: one batch for a bulk accept instead of a call per booking
+    print(f"[Email Placeholder] Reminders sent for bookings {', '.join(map(str, booking_ids))}")
+
+
+# Action -> (target status, roles allowed to perform it); Booking.TRANSITIONS
+# says which statuses each target may follow.
+ACTIONS = {
+    'accept': (Booking.Status.ACCEPTED, ('mentor',)),
+    'reject': (Booking.Status.REJECTED, ('mentor',)),
+    'complete': (Booking.Status.COMPLETED, ('student', 'mentor')),
+}
+
+
+class TransitionConflict(exceptions.APIException):
+    status_code = 409
+    default_detail = 'The booking changed; reload it and try again.'
+    default_code = 'conflict'
+
+
 class IsStudentOrMentor(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated
@@ -20,10 +44,14 @@ class IsStudentOrMentor(permissions.BasePermission):
         return obj.student_id == request.user.id or obj.mentor_id == request.user.id or request.user.is_staff
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all().order_by('-created_at')
     serializer_class = BookingSerializer
     permission_classes = [IsStudentOrMentor]
+    # Booking state drives payments and reminders; never read it from a lagging replica.
+    database_routing = 'primary'
+    # Read by IsStudentOrMentor whatever ?fields= asks for.
+    sparse_fields_required = ('student', 'mentor')
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -32,40 +60,90 @@ class BookingViewSet(viewsets.ModelViewSet):
             qs = qs.filter(models.Q(student=user) | models.Q(mentor=user))
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         # Only students can create bookings
         if not self.request.user.is_student() and not self.request.user.is_staff:
-            raise permissions.PermissionDenied('Only students can create bookings')
+            raise exceptions.PermissionDenied('Only students can create bookings')
         serializer.save(student=self.request.user)
 
+    def _transition(self, request, action_name):
+        """Apply ``action_name`` to one booking: one read, then one conditional UPDATE.
+
+        An optional ``version`` in the body makes the change conditional on
+        the booking not having changed since the client read it.
+        """
+        booking = self.get_object()
+        target, roles = ACTIONS[action_name]
+        participants = {'student': booking.student_id, 'mentor': booking.mentor_id}
+        if request.user.id not in (participants[role] for role in roles) and not request.user.is_staff:
+            raise exceptions.PermissionDenied(f"Only the {' or '.join(roles)} can {action_name} this booking")
+        version = request.data.get('version')
+        if version is not None and serializers.IntegerField(min_value=0).run_validation(version) != booking.version:
+            raise TransitionConflict()
+        if not booking.can_transition(target):
+            raise TransitionConflict(f'Cannot {action_name} a booking that is {booking.status}.')
+        # Conditional on the version just read: anything changed since loses.
+        if not booking.transition(target, version=booking.version):
+            raise TransitionConflict()
+        return booking
+
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
-        booking = self.get_object()
-        if booking.mentor_id != request.user.id and not request.user.is_staff:
-            raise permissions.PermissionDenied('Only the mentor can accept this booking')
-        booking.status = Booking.Status.ACCEPTED
-        if not booking.meet_link:
-            booking.save()
-            booking.meet_link = booking.generate_meet_link()
-        booking.save()
+        booking = self._transition(request, 'accept')
         send_email_reminder_placeholder(booking)
         return Response(BookingSerializer(booking).data)
 
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
-        booking = self.get_object()
-        if booking.mentor_id != request.user.id and not request.user.is_staff:
-            raise permissions.PermissionDenied('Only the mentor can reject this booking')
-        booking.status = Booking.Status.REJECTED
-        booking.save()
-        return Response(BookingSerializer(booking).data)
+        return Response(BookingSerializer(self._transition(request, 'reject')).data)
 
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
-        booking = self.get_object()
-        if booking.student_id != request.user.id and booking.mentor_id != request.user.id and not request.user.is_staff:
-            raise permissions.PermissionDenied('Only participants can complete this booking')
-        booking.status = Booking.Status.COMPLETED
-        booking.save()
-        return Response(BookingSerializer(booking).data)
+        return Response(BookingSerializer(self._transition(request, 'complete')).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Accept, reject or complete many bookings with a single UPDATE.
+
+        Returns an outcome per id: ``updated``, ``forbidden`` (not your role),
+        ``invalid_status`` (not in a state the action applies to) or
+        ``not_found`` (missing or not one of your bookings).
+        """
+        serializer = BulkBookingActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        action_name = serializer.validated_data['action']
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        target, roles = ACTIONS[action_name]
+        sources = Booking.TRANSITIONS[target]
+        user = request.user
+
+        results = {pk: ('not_found', None) for pk in ids}
+        allowed = []
+        with transaction.atomic():
+            rows = (
+                self.get_queryset().filter(pk__in=ids).select_for_update()
+                .values_list('id', 'student_id', 'mentor_id', 'status')
+            )
+            for pk, student_id, mentor_id, status in rows:
+                participants = {'student': student_id, 'mentor': mentor_id}
+                if not user.is_staff and user.id not in (participants[role] for role in roles):
+                    results[pk] = ('forbidden', status)
+                elif status not in sources:
+                    results[pk] = ('invalid_status', status)
+                else:
+                    results[pk] = ('updated', target)
+                    allowed.append(pk)
+
+            if allowed:
+                Booking.objects.filter(pk__in=allowed, status__in=sources).update(**Booking.transition_updates(target))
+                if target == Booking.Status.ACCEPTED:
+                    transaction.on_commit(partial(send_email_reminders_placeholder, allowed))
 
+        return Response({
+            'action': action_name,
+            'results': [{'id': pk, 'outcome': outcome, 'status': status} for pk, (outcome, status) in results.items()],
+        })
@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'unimentor.settings')
+    # The test suite gets its own cache, see unimentor.test_settings.
+    default = 'unimentor.test_settings' if sys.argv[1:2] == ['test'] else 'unimentor.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
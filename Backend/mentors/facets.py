@@ -0,0 +1,55 @@
+"""Facet counts for the mentor directory sidebar.
+
+All facets come from a single UNION ALL of grouped aggregates over the
+already filtered queryset. Results are cached per filter and facet set,
+tagged with the mentor directory, so any profile change invalidates them.
+"""
+import hashlib
+from collections import Counter
+
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast
+
+from unimentor.cache import TieredCache
+from .signals import DIRECTORY_TAG
+
+
+FACET_FIELDS = ('university', 'program', 'year', 'language')
+
+_cache = TieredCache('mentor-facets', timeout=5 * 60)
+
+
+def _grouped(queryset, name):
+    # Languages are stored comma-separated, so group by the whole string and
+    # split afterwards; distinct strings are far fewer than profiles.
+    field = 'languages' if name == 'language' else name
+    return (
+        queryset.order_by()
+        .annotate(facet=Value(name, output_field=CharField()), value=Cast(F(field), CharField()))
+        .values('facet', 'value')
+        .annotate(count=Count('pk'))
+    )
+
+
+def _compute(queryset, names) -> dict:
+    parts = [_grouped(queryset, name) for name in names]
+    counts = {name: Counter() for name in names}
+    for row in parts[0].union(*parts[1:], all=True):
+        if row['facet'] == 'language':
+            for language in (row['value'] or '').split(','):
+                if language.strip():
+                    counts['language'][language.strip().lower()] += row['count']
+        elif row['value']:
+            value = int(row['value']) if row['facet'] == 'year' else row['value']
+            counts[row['facet']][value] += row['count']
+    return {
+        name: [{'value': value, 'count': count} for value, count in counter.most_common()]
+        for name, counter in counts.items()
+    }
+
+
+def facet_counts(queryset, names) -> dict:
+    """Return ``{facet: [{'value', 'count'}, ...]}`` for ``queryset``, most common first."""
+    names = sorted(set(names))
+    query = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    return _cache.get_or_set(f"{','.join(names)}:{query}", lambda: _compute(queryset, names), [DIRECTORY_TAG])
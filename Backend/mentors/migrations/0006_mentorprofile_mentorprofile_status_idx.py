@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0005_remove_mentorprofile_is_verified_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['status'], name='mentorprofile_status_idx'),
+        ),
+    ]
@@ -24,7 +24,25 @@ class MentorProfile(models.Model):
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
     verification_document_url = models.URLField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='mentorprofile_status_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"MentorProfile of {self.user.username}"
 
-# Create your models here.
+
+class DirectoryVersion(models.Model):
+    """Single row holding the directory version, see ``mentors.signals``.
+
+    It is bumped with an UPDATE, whose row lock makes concurrent bumps take
+    consecutive versions and commit in that order.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+
+class DirectoryChange(models.Model):
+    """The mentor whose listing changed in a given directory version."""
+    version = models.PositiveBigIntegerField(primary_key=True)
+    mentor_user_id = models.BigIntegerField()
@@ -0,0 +1,68 @@
+"""Directory version: a counter bumped whenever a mentor's listing changes.
+
+Per-worker caches of the mentor directory (e.g. the recommendation matrix)
+compare their version with the shared one to know when to refresh. Each bump
+also records which mentor changed, so a worker that is only a few versions
+behind reloads just those mentors instead of the whole directory.
+
+The counter is a database row rather than a cache key: its UPDATE locks the
+row until the saving transaction commits, so every change gets its own
+version and versions become visible in order, with their change recorded.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review
+from unimentor.cache import invalidate_tags
+from unimentor.invalidation import broadcast_changes
+from .models import DirectoryChange, DirectoryVersion, MentorProfile
+
+
+# How many of the latest changes are kept for incremental refreshes.
+CHANGES_KEPT = 10000
+# unimentor.cache tag for anything derived from the whole directory.
+DIRECTORY_TAG = 'mentors:directory'
+
+
+def directory_version() -> int:
+    return DirectoryVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def changed_mentors(since: int, until: int):
+    """Return the mentor user ids changed in versions (since, until], or None if unknown."""
+    changes = dict(
+        DirectoryChange.objects.filter(version__gt=since, version__lte=until).values_list('version', 'mentor_user_id')
+    )
+    if len(changes) < until - since:
+        return None
+    return set(changes.values())
+
+
+def bump_directory_version(mentor_user_id: int) -> int:
+    with transaction.atomic():
+        versions = DirectoryVersion.objects.filter(pk=1)
+        if not versions.update(version=F('version') + 1):
+            DirectoryVersion.objects.get_or_create(pk=1)
+            versions.update(version=F('version') + 1)
+        version = versions.values_list('version', flat=True).get()
+        DirectoryChange.objects.create(version=version, mentor_user_id=mentor_user_id)
+        if version % 1000 == 0:
+            DirectoryChange.objects.filter(version__lte=version - CHANGES_KEPT).delete()
+    invalidate_tags(DIRECTORY_TAG)
+    return version
+
+
+@receiver([post_save, post_delete], sender=MentorProfile)
+def mentor_profile_changed(sender, instance, **kwargs):
+    bump_directory_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # Ratings feed into recommendations.
+    bump_directory_version(instance.mentor_id)
+
+
+broadcast_changes(MentorProfile)
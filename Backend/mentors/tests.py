@@ -1,3 +1,179 @@
-from django.test import TestCase
+import gzip
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+
+from unimentor import compression
+from unimentor.query_plans import QueryPlanTestMixin
+from users.models import User
+from reviews.models import Review
+from .models import DirectoryChange, MentorProfile
+from .recommendations import MentorMatrix, StudentQuery, _matrix
+from .signals import bump_directory_version, changed_mentors, directory_version
+from .views import MentorProfileViewSet
+
+
+class MentorQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        MentorProfile.objects.create(user=user, status=MentorProfile.Status.APPROVED)
+
+    def test_directory_filters_status_by_index(self):
+        qs = MentorProfileViewSet.queryset.filter(status=MentorProfile.Status.APPROVED)
+        self.assertNoFullTableScan(qs)
+
+
+class DirectoryVersionTests(TestCase):
+    def test_each_change_gets_its_own_version(self):
+        start = directory_version()
+        versions = [bump_directory_version(user_id) for user_id in (7, 8, 7)]
+        self.assertEqual(versions, [start + 1, start + 2, start + 3])
+        self.assertEqual(directory_version(), start + 3)
+        self.assertEqual(changed_mentors(start, start + 3), {7, 8})
+        self.assertEqual(changed_mentors(start + 2, start + 3), {7})
+
+    def test_unknown_changes_force_a_full_reload(self):
+        start = directory_version()
+        bump_directory_version(7)
+        bump_directory_version(8)
+        DirectoryChange.objects.filter(version=start + 1).delete()
+        self.assertIsNone(changed_mentors(start, start + 2))
+
+
+class RecommendationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x')
+
+    def setUp(self):
+        cache.clear()
+        _matrix.version = None
+        self.client.force_authenticate(self.student)
+
+    def mentor(self, username, **fields):
+        user = User.objects.create_user(username, password='x', role=User.Role.MENTOR)
+        return MentorProfile.objects.create(user=user, status=MentorProfile.Status.APPROVED, **fields)
+
+    def recommended(self, **params):
+        response = self.client.get('/api/mentors/recommended/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['user']['username'] for row in response.data]
+
+    def test_ranks_by_feature_overlap(self):
+        self.mentor('same-program', university='TUIT', program='CS', languages='en,uz', year=3)
+        self.mentor('same-uni', university='TUIT', program='Math', languages='ru', year=1)
+        self.mentor('other', university='WIUT', program='Law', languages='ru')
+        MentorProfile.objects.create(
+            user=User.objects.create_user('pending', password='x'), university='TUIT', program='CS',
+        )
+        ranked = self.recommended(university='tuit', program='cs', languages='uz', year=2)
+        self.assertEqual(ranked, ['same-program', 'same-uni', 'other'])
+
+    def test_matrix_follows_profile_and_rating_changes(self):
+        first = self.mentor('first', university='TUIT')
+        second = self.mentor('second', university='WIUT')
+        self.assertEqual(self.recommended(university='TUIT'), ['first', 'second'])
+
+        Review.objects.create(student=self.student, mentor=second.user, rating=5)
+        second.university = 'TUIT'
+        second.save()
+        self.assertEqual(self.recommended(university='TUIT'), ['second', 'first'])
+
+        first.status = MentorProfile.Status.REJECTED
+        first.save()
+        self.assertEqual(self.recommended(university='TUIT'), ['second'])
+
+
+class RecommendationLatencyTests(SimpleTestCase):
+    def test_scores_100k_mentors_in_single_digit_ms(self):
+        rng = np.random.default_rng(0)
+        matrix, n = MentorMatrix(), 100_000
+        matrix._grow(n)
+        matrix.active[:] = True
+        matrix.user_ids[:] = np.arange(n)
+        matrix.vocabulary = {
+            'university': {f'u{i}': i for i in range(200)},
+            'program': {f'p{i}': i for i in range(50)},
+            'languages': {f'l{i}': i for i in range(20)},
+        }
+        matrix.university[:] = rng.integers(0, 200, n)
+        matrix.program[:] = rng.integers(0, 50, n)
+        matrix.languages = rng.random((n, 20)) < 0.2
+        matrix.year[:] = rng.integers(1, 6, n)
+        matrix.rating[:] = rng.random(n)
+        matrix.availability[:] = rng.random(n)
+        query = StudentQuery('u3', 'p2', ['l1', 'l4'], 2)
+
+        timings = []
+        for _ in range(11):
+            started = time.perf_counter()
+            matrix.top(query, 10)
+            timings.append(time.perf_counter() - started)
+        self.assertLess(sorted(timings)[5], 0.010)
+
+
+class FacetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        student = User.objects.create_user('student', password='x')
+        cls.student = student
+        for i, (university, program, year, languages) in enumerate([
+            ('TUIT', 'CS', 2, 'en,uz'),
+            ('TUIT', 'Math', 3, 'EN'),
+            ('WIUT', 'CS', 2, 'ru, en'),
+        ]):
+            user = User.objects.create_user(f'mentor{i}', password='x', role=User.Role.MENTOR)
+            MentorProfile.objects.create(
+                user=user, status=MentorProfile.Status.APPROVED,
+                university=university, program=program, year=year, languages=languages,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.student)
+
+    def test_counts_all_facets_in_one_query(self):
+        with self.assertNumQueries(2):  # profiles + one UNION ALL of the facets
+            response = self.client.get('/api/mentors/', {'facets': 'university,program,year,language'})
+        self.assertEqual(len(response.json()['results']), 3)
+        facets = response.json()['facets']
+        self.assertEqual(facets['university'], [{'value': 'TUIT', 'count': 2}, {'value': 'WIUT', 'count': 1}])
+        self.assertEqual(facets['year'], [{'value': 2, 'count': 2}, {'value': 3, 'count': 1}])
+        self.assertEqual(facets['language'][0], {'value': 'en', 'count': 3})
+
+    def test_counts_follow_filters_and_are_cached_until_directory_changes(self):
+        params = {'facets': 'program', 'university': 'TUIT'}
+        self.assertEqual(len(self.client.get('/api/mentors/', params).json()['facets']['program']), 2)
+        with self.assertNumQueries(0):
+            self.client.get('/api/mentors/', params)
+
+        MentorProfile.objects.filter(program='Math').get().delete()
+        self.assertEqual(
+            self.client.get('/api/mentors/', params).json()['facets']['program'], [{'value': 'CS', 'count': 1}],
+        )
+
+    def test_listing_is_served_precompressed_until_a_mentor_changes(self):
+        params = {'facets': 'university,program,year,language'}
+        first = self.client.get('/api/mentors/', params, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        with mock.patch.object(compression._Gzip, 'compress') as compress:
+            second = self.client.get('/api/mentors/', params, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(json.loads(gzip.decompress(second.content))['facets']['year'][1], {'value': 3, 'count': 1})
+
+        self.client.get('/api/mentors/')
+        user = User.objects.get(username='mentor0')
+        user.first_name = 'Renamed'
+        user.save()
+        names = [profile['user']['first_name'] for profile in self.client.get('/api/mentors/').json()]
+        self.assertIn('Renamed', names)
+
+    def test_rejects_unknown_facet(self):
+        self.assertEqual(self.client.get('/api/mentors/', {'facets': 'rate'}).status_code, 400)
@@ -1,15 +1,27 @@
-from rest_framework import viewsets, permissions, filters, status
+import hashlib
+
+from rest_framework import exceptions, viewsets, permissions, filters, status
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from .facets import FACET_FIELDS, facet_counts
 from .models import MentorProfile
 from .serializers import MentorProfileSerializer
+from .signals import DIRECTORY_TAG
+from unimentor.cache import TieredCache
+from unimentor.compression import Precompressed, PrecompressedResponse
+from unimentor.fieldsets import SparseFieldsetMixin
 from unimentor.permissions import IsMentor, IsAdmin
 from users.models import User
 
 
-class MentorProfileViewSet(viewsets.ModelViewSet):
+# Rendered directory listings with their compressed forms, per query string.
+_listings = TieredCache('mentor-directory', timeout=5 * 60)
+
+
+class MentorProfileViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = MentorProfile.objects.select_related('user').all()
     serializer_class = MentorProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -34,6 +46,44 @@ class MentorProfileViewSet(viewsets.ModelViewSet):
             qs = qs.filter(languages__icontains=language)
         return qs
 
+    def list(self, request, *args, **kwargs):
+        """With ``?facets=university,program,year,language`` the profiles come
+        back under ``results`` next to per-facet counts for the same filters.
+
+        Every student sees the same approved listing, so their JSON responses
+        are cached whole and precompressed until a profile, review or user
+        changes; staff, who also see pending profiles, are not cached.
+        """
+        if request.user.is_staff or not isinstance(request.accepted_renderer, JSONRenderer):
+            return self._list(request, *args, **kwargs)
+        query = repr((request.accepted_media_type, sorted(request.query_params.lists())))
+        payload = _listings.get_or_set(
+            hashlib.md5(query.encode()).hexdigest(),
+            lambda: self._precompress(self._list(request, *args, **kwargs)),
+            [DIRECTORY_TAG, User._meta.label_lower],
+        )
+        return PrecompressedResponse(payload)
+
+    def _precompress(self, response):
+        content = self.request.accepted_renderer.render(
+            response.data, self.request.accepted_media_type, self.get_renderer_context(),
+        )
+        return Precompressed.of(content, self.request.accepted_media_type)
+
+    def _list(self, request, *args, **kwargs):
+        facets = request.query_params.get('facets')
+        if not facets:
+            return super().list(request, *args, **kwargs)
+        names = [name.strip() for name in facets.split(',') if name.strip()]
+        unknown = set(names) - set(FACET_FIELDS)
+        if unknown or not names:
+            raise exceptions.ValidationError({'facets': f"Choose from {', '.join(FACET_FIELDS)}."})
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response({
+            'results': self.get_serializer(queryset, many=True).data,
+            'facets': facet_counts(queryset, names),
+        })
+
     def perform_create(self, serializer):
         # Any authenticated user can apply to be a mentor.
         # Their profile will be pending until approved by an admin.
@@ -49,6 +99,40 @@ class MentorProfileViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied('Not allowed to modify this profile')
         serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """Approved mentors ranked by how well they match the student.
+
+        Query params: university, program, languages (comma-separated),
+        year and limit (default 10, max 50).
+        """
+        # Imported here so NumPy only loads once recommendations are used.
+        from .recommendations import StudentQuery, recommend
+
+        params = request.query_params
+        try:
+            year = int(params['year']) if params.get('year') else None
+            limit = min(max(int(params.get('limit', 10)), 1), 50)
+        except ValueError:
+            raise exceptions.ValidationError('year and limit must be integers.')
+        query = StudentQuery(
+            university=params.get('university', ''),
+            program=params.get('program', ''),
+            languages=[lang.strip().lower() for lang in params.get('languages', '').split(',') if lang.strip()],
+            year=year,
+        )
+        ranked = recommend(query, limit)
+        profiles = (
+            MentorProfile.objects.select_related('user')
+            .filter(status=MentorProfile.Status.APPROVED)
+            .in_bulk([user_id for user_id, _ in ranked], field_name='user_id')
+        )
+        data = [
+            {**self.get_serializer(profiles[user_id]).data, 'match_score': round(score, 3)}
+            for user_id, score in ranked if user_id in profiles
+        ]
+        return Response(data)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
     def pending(self, request):
         """List all mentor profiles that are pending approval."""
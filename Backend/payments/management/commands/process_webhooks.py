@@ -0,0 +1,43 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.webhooks import process_batch
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply stored payment webhook events to transactions and bookings, in batches. '
+        'Runs until stopped; several processors can run side by side on PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue, then exit')
+
+    def handle(self, *args, batch_size, interval, once, **options):
+        total = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                handled = process_batch(batch_size)
+            except Exception:
+                if once:
+                    raise
+                logger.exception('Webhook batch failed; retrying')
+                close_old_connections()
+                handled = 0
+            total += handled
+            if handled:
+                continue
+            if once:
+                break
+            time.sleep(interval)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Processed {total} events in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f}/s)')
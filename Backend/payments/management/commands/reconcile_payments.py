@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from payments import reconciliation
+
+
+def _datetime(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Match a provider settlement file (CSV with a header row, or JSON lines) against transactions in '
+        'bounded memory, recording missing, mismatched, duplicate and orphaned payments as '
+        'ReconciliationIssue rows. Run it again on the same file (and window) to resume an interrupted run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--provider', required=True)
+        parser.add_argument('--format', dest='fmt', choices=reconciliation.FORMATS, help='default: from the file name')
+        parser.add_argument('--id-column', default='external_id')
+        parser.add_argument('--amount-column', default='amount')
+        parser.add_argument('--since', type=_datetime, help='Only transactions created from then can be orphaned')
+        parser.add_argument('--until', type=_datetime, help='...and before then (default: the start of the run)')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--restart', action='store_true', help='Start over instead of resuming')
+
+    def handle(self, *args, path, provider, fmt, id_column, amount_column, since, until, chunk_size, restart, **options):
+        settlement = reconciliation.SettlementFile(path, fmt, id_column=id_column, amount_column=amount_column)
+        try:
+            run = reconciliation.start_run(settlement, provider, since=since, until=until, restart=restart)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        if run.offset:
+            self.stderr.write(f'Resuming run {run.pk} at line {run.lines + 1}')
+
+        def progress(run):
+            self.stderr.write(f'\r{run.lines} lines', ending='')
+
+        try:
+            run = reconciliation.reconcile(run, settlement, chunk_size=chunk_size, progress=progress)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stderr.write('')
+        counts = dict(run.issues.values_list('kind').annotate(Count('pk')).order_by())
+        report = ', '.join(f'{counts.get(kind, 0)} {kind}' for kind in reconciliation.Kind.values)
+        self.stdout.write(f'Run {run.pk}: {run.lines} lines, {report}')
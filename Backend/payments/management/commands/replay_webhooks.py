@@ -0,0 +1,70 @@
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import Booking
+from payments.providers import get_provider
+from payments.webhooks import process_batch
+from unimentor.benchmarking import ServerProcess, run_requests
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test webhook ingestion with the stub provider: deliver a generated (or saved NDJSON) event '
+        'stream, with duplicates and out-of-order events, to a server started for the run or to --url. '
+        'Generated events reference existing bookings, so run it against a seeded database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=1000)
+        parser.add_argument('--duplicates', type=float, default=0.1, help='Share of deliveries sent twice')
+        parser.add_argument('--disorder', type=float, default=0.2, help='Share of events swapped with the previous one')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--file', help='Replay this NDJSON stream instead of generating one')
+        parser.add_argument('--save', help='Also write the delivered stream here as NDJSON')
+        parser.add_argument('--url', help='Base URL of a running server (default: start one)')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--process', action='store_true', help='Then apply the events and time it')
+
+    def handle(self, *args, **options):
+        provider = get_provider('stub')
+        if provider is None:
+            raise CommandError('The stub provider has no secret; set STUB_WEBHOOK_SECRET.')
+        bodies = self.load_stream(provider, options)
+        if options['save']:
+            with open(options['save'], 'wb') as file:
+                file.writelines(body + b'\n' for body in bodies)
+
+        requests = [
+            {'content': body, 'headers': {provider.signature_header: provider.sign(body), 'Content-Type': 'application/json'}}
+            for body in bodies
+        ]
+        server = nullcontext() if options['url'] else ServerProcess('wsgi')
+        with server:
+            base_url = options['url'] or server.url
+            result = run_requests(f'{base_url}/api/payments/webhooks/stub/', requests, concurrency=options['concurrency'])
+        summary = result.summary()
+        self.stdout.write(
+            f"delivered {summary['requests']} events ({summary['errors']} errors) at {summary['throughput']:.0f}/s, "
+            f"ack p50 {summary['p50_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms"
+        )
+
+        if options['process']:
+            started, total = time.perf_counter(), 0
+            while handled := process_batch():
+                total += handled
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'processed {total} events in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f}/s)')
+
+    def load_stream(self, provider, options):
+        if options['file']:
+            with open(options['file'], 'rb') as file:
+                return [line.rstrip(b'\n') for line in file if line.strip()]
+        booking_ids = list(Booking.objects.values_list('pk', flat=True)[:1000])
+        if not booking_ids:
+            raise CommandError('No bookings to pay for; create some first.')
+        return list(provider.event_stream(
+            booking_ids, options['payments'],
+            duplicates=options['duplicates'], disorder=options['disorder'], seed=options['seed'],
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_webhooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('source', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(help_text='Size and hash of the head of the file', max_length=64)),
+                ('since', models.DateTimeField(blank=True, null=True)),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('phase', models.CharField(choices=[('matching', 'Matching'), ('orphans', 'Orphans'), ('done', 'Done')], default='matching', max_length=16)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('lines', models.BigIntegerField(default=0)),
+                ('orphan_cursor', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='reconciled_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payments.reconciliationrun'),
+        ),
+        migrations.CreateModel(
+            name='ReconciliationIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('missing', 'Settled but no transaction'), ('amount_mismatch', 'Amount differs'), ('orphaned', 'Successful transaction not settled'), ('duplicate', 'Settled more than once'), ('invalid', 'Unreadable line')], max_length=16)),
+                ('external_id', models.CharField(blank=True, max_length=128)),
+                ('line', models.BigIntegerField(blank=True, help_text='Line of the settlement file', null=True)),
+                ('settled_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('recorded_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payments.transaction')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='issues', to='payments.reconciliationrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['run', 'kind'], name='recon_issue_run_kind_idx')],
+            },
+        ),
+    ]
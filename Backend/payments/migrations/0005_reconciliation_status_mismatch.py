@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reconciliationissue',
+            name='kind',
+            field=models.CharField(choices=[('missing', 'Settled but no transaction'), ('amount_mismatch', 'Amount differs'), ('status_mismatch', 'Settled but not successful'), ('orphaned', 'Successful transaction not settled'), ('duplicate', 'Settled more than once'), ('invalid', 'Unreadable line')], max_length=16),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Transaction(models.Model):
@@ -15,8 +16,111 @@ class Transaction(models.Model):
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
     external_id = models.CharField(max_length=128, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Time of the newest provider event applied; older events arriving later are ignored.
+    provider_updated_at = models.DateTimeField(null=True, blank=True)
+    # Last reconciliation run that found this transaction in a settlement file.
+    reconciled_run = models.ForeignKey(
+        'ReconciliationRun', null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='transaction_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['payment_provider', 'external_id'],
+                condition=~models.Q(external_id=''),
+                name='transaction_provider_external_uniq',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Txn {self.id} booking={self.booking_id} {self.status} {self.amount}"
 
-# Create your models here.
+
+class WebhookEvent(models.Model):
+    """A provider's webhook delivery, stored verbatim before processing.
+
+    Providers retry deliveries, so ``(provider, event_id)`` is unique and
+    repeats are dropped on insert. ``process_webhooks`` applies pending
+    events in batches and stamps ``processed_at``.
+    """
+    provider = models.CharField(max_length=50)
+    event_id = models.CharField(max_length=128)
+    occurred_at = models.DateTimeField()
+    payload = models.TextField()
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='webhook_provider_event_uniq'),
+        ]
+        indexes = [
+            # The processing queue: only unprocessed rows are indexed.
+            models.Index(
+                fields=['occurred_at', 'id'], name='webhook_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"WebhookEvent {self.provider}:{self.event_id}"
+
+
+class ReconciliationRun(models.Model):
+    """One pass of ``reconcile_payments`` over a provider settlement file.
+
+    ``offset`` and ``lines`` advance with every committed chunk, so an
+    interrupted run picks up where it stopped when the same file is given
+    again. After the file comes the ``orphans`` phase, which walks the
+    provider's successful transactions the file never mentioned.
+    """
+    class Phase(models.TextChoices):
+        MATCHING = 'matching', 'Matching'
+        ORPHANS = 'orphans', 'Orphans'
+        DONE = 'done', 'Done'
+
+    provider = models.CharField(max_length=50)
+    source = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text='Size and hash of the head of the file')
+    since = models.DateTimeField(null=True, blank=True)
+    until = models.DateTimeField(null=True, blank=True)
+    phase = models.CharField(max_length=16, choices=Phase.choices, default=Phase.MATCHING)
+    offset = models.BigIntegerField(default=0)
+    lines = models.BigIntegerField(default=0)
+    orphan_cursor = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Reconciliation {self.id} {self.provider} {self.source} ({self.phase})"
+
+
+class ReconciliationIssue(models.Model):
+    class Kind(models.TextChoices):
+        MISSING = 'missing', 'Settled but no transaction'
+        AMOUNT_MISMATCH = 'amount_mismatch', 'Amount differs'
+        STATUS_MISMATCH = 'status_mismatch', 'Settled but not successful'
+        ORPHANED = 'orphaned', 'Successful transaction not settled'
+        DUPLICATE = 'duplicate', 'Settled more than once'
+        INVALID = 'invalid', 'Unreadable line'
+
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='issues')
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    external_id = models.CharField(max_length=128, blank=True)
+    line = models.BigIntegerField(null=True, blank=True, help_text='Line of the settlement file')
+    settled_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    recorded_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    transaction = models.ForeignKey(Transaction, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    detail = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run', 'kind'], name='recon_issue_run_kind_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()}: {self.external_id or self.line}"
@@ -0,0 +1,122 @@
+"""Payment providers as seen by the webhook endpoint.
+
+A provider checks a delivery's signature and turns its body into a
+``PaymentEvent``; everything after that (storage, dedupe, ordering,
+applying to ``Transaction``) is shared. Secrets come from
+``PAYMENT_WEBHOOK_SECRETS``.
+
+``StubProvider`` signs its own events, so it can stand in for a real
+provider locally and in load tests (see the ``replay_webhooks`` command).
+"""
+import hashlib
+import hmac
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import Transaction
+
+
+class InvalidEvent(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class PaymentEvent:
+    event_id: str
+    occurred_at: datetime
+    external_id: str
+    booking_id: int
+    amount: Decimal
+    status: str
+
+
+class WebhookProvider:
+    name = None
+    signature_header = None
+
+    def __init__(self, secret: str):
+        self.secret = secret
+
+    def sign(self, body: bytes) -> str:
+        return hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+
+    def verify(self, body: bytes, headers) -> bool:
+        signature = headers.get(self.signature_header, '')
+        return bool(self.secret) and hmac.compare_digest(signature, self.sign(body))
+
+    def parse(self, body) -> PaymentEvent:
+        """Normalize a delivery body; raises InvalidEvent."""
+        raise NotImplementedError
+
+
+class StubProvider(WebhookProvider):
+    name = 'stub'
+    signature_header = 'X-Stub-Signature'
+    STATUSES = {
+        'payment.pending': Transaction.Status.PENDING,
+        'payment.succeeded': Transaction.Status.SUCCESS,
+        'payment.failed': Transaction.Status.FAILED,
+    }
+
+    def parse(self, body) -> PaymentEvent:
+        try:
+            event = json.loads(body)
+            data = event['data']
+            occurred_at = datetime.fromisoformat(event['created'])
+            if occurred_at.tzinfo is None:
+                occurred_at = occurred_at.replace(tzinfo=dt_timezone.utc)
+            if not data['payment_id']:
+                raise ValueError('empty payment_id')
+            return PaymentEvent(
+                event_id=str(event['id']),
+                occurred_at=occurred_at,
+                external_id=str(data['payment_id']),
+                booking_id=int(data['booking_id']),
+                amount=Decimal(str(data['amount'])),
+                status=self.STATUSES[event['type']],
+            )
+        except (ValueError, KeyError, TypeError, ArithmeticError) as exc:
+            raise InvalidEvent(f'Malformed {self.name} event: {exc!r}') from exc
+
+    def event_stream(self, booking_ids, payments, duplicates=0.1, disorder=0.2, seed=None):
+        """Yield encoded event bodies for ``payments`` payments, as a provider would deliver them.
+
+        Each payment goes pending -> succeeded (or, one time in ten, failed).
+        A share of deliveries is repeated (``duplicates``) or swapped with
+        the one before it (``disorder``).
+        """
+        rng = random.Random(seed)
+        clock = datetime.now(dt_timezone.utc)
+        events = []
+        for _ in range(payments):
+            payment_id = f'pay_{uuid.uuid4().hex[:16]}'
+            data = {'payment_id': payment_id, 'booking_id': rng.choice(booking_ids), 'amount': '50.00'}
+            final = 'payment.failed' if rng.random() < 0.1 else 'payment.succeeded'
+            for kind in ('payment.pending', final):
+                clock += timedelta(milliseconds=1)
+                events.append({'id': f'evt_{uuid.uuid4().hex}', 'type': kind, 'created': clock.isoformat(), 'data': data})
+        for index in range(1, len(events)):
+            if rng.random() < disorder:
+                events[index - 1], events[index] = events[index], events[index - 1]
+        for event in events:
+            body = json.dumps(event).encode()
+            yield body
+            if rng.random() < duplicates:
+                yield body
+
+
+PROVIDERS = {provider.name: provider for provider in (StubProvider,)}
+
+
+def get_provider(name):
+    """The configured provider called ``name``, or None if unknown or without a secret."""
+    secret = settings.PAYMENT_WEBHOOK_SECRETS.get(name)
+    if name not in PROVIDERS or not secret:
+        return None
+    return PROVIDERS[name](secret)
@@ -0,0 +1,203 @@
+"""Reconciling ``Transaction`` rows against a provider's settlement file.
+
+The file (CSV with a header row, or JSON lines) is read ``chunk_size`` lines
+at a time. Each chunk is matched with one indexed lookup on
+``(payment_provider, external_id)`` and its results are committed together
+with the run's file offset, so memory stays bounded by the chunk and an
+interrupted run resumes at the first unreconciled line.
+
+Matched transactions are stamped with the run; once the file is done, the
+provider's successful transactions in the run's window without that stamp
+are reported as orphaned, walked in primary key order from a saved cursor.
+
+Lines are split on newlines, so quoted CSV fields must not contain any.
+"""
+import csv
+import hashlib
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReconciliationIssue, ReconciliationRun, Transaction
+
+
+FORMATS = ('csv', 'jsonl')
+# Bytes hashed from the head of the file to recognise it on resume.
+FINGERPRINT_BYTES = 1 << 20
+
+Kind = ReconciliationIssue.Kind
+
+
+def fingerprint(path: str) -> str:
+    digest = hashlib.sha256(str(os.path.getsize(path)).encode())
+    with open(path, 'rb') as file:
+        digest.update(file.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+class SettlementFile:
+    """Reads ``(line, external_id, amount)`` records in chunks; unreadable lines carry an error instead."""
+
+    def __init__(self, path, fmt=None, id_column='external_id', amount_column='amount'):
+        self.path = path
+        self.fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        self.id_column = id_column
+        self.amount_column = amount_column
+
+    def chunks(self, offset, first_line, chunk_size):
+        """Yield ``(records, end_offset, last_line)`` from byte ``offset``, which is line ``first_line``."""
+        with open(self.path, 'rb') as file:
+            header = self._header(file)
+            if offset < file.tell():
+                offset, first_line = file.tell(), 2
+            file.seek(offset)
+            lines = []
+            while True:
+                raw = file.readline()
+                if raw:
+                    lines.append(raw.decode('utf-8', errors='replace'))
+                if lines and (len(lines) >= chunk_size or not raw):
+                    yield self._parse(lines, first_line, header), file.tell(), first_line + len(lines) - 1
+                    first_line += len(lines)
+                    lines = []
+                if not raw:
+                    return
+
+    def _header(self, file):
+        if self.fmt != 'csv':
+            return None
+        header = next(csv.reader([file.readline().decode('utf-8-sig')]), [])
+        missing = {self.id_column, self.amount_column} - set(header)
+        if missing:
+            raise ValueError(f"{self.path} has no {', '.join(sorted(missing))} column")
+        return header
+
+    def _parse(self, lines, first_line, header):
+        records = []
+        rows = csv.reader(lines) if header else lines
+        for number, row in enumerate(rows, start=first_line):
+            try:
+                if header:
+                    row = dict(zip(header, row))
+                elif not row.strip():
+                    continue
+                else:
+                    row = json.loads(row)
+                external_id = str(row[self.id_column]).strip()
+                amount = Decimal(str(row[self.amount_column]).strip())
+                if not external_id or not amount.is_finite():
+                    raise ValueError('empty id or amount')
+            except (ValueError, KeyError, TypeError, InvalidOperation) as exc:
+                records.append((number, None, f'{type(exc).__name__}: {exc}'[:255]))
+                continue
+            records.append((number, external_id, amount))
+        return records
+
+
+def start_run(settlement: SettlementFile, provider, since=None, until=None, restart=False) -> ReconciliationRun:
+    """The unfinished run over this file to resume, or a new one.
+
+    Raises ValueError if ``since`` or ``until`` are given and differ from the window of the run to resume.
+    """
+    digest = fingerprint(settlement.path)
+    if not restart:
+        run = (
+            ReconciliationRun.objects.filter(provider=provider, fingerprint=digest, finished_at__isnull=True)
+            .order_by('-started_at').first()
+        )
+        if run is not None:
+            for name, value in (('since', since), ('until', until)):
+                if value is not None and value != getattr(run, name):
+                    raise ValueError(
+                        f'Run {run.pk} over this file has {name}={getattr(run, name)}, not {value}; '
+                        'resume it without changing the window or restart.'
+                    )
+            return run
+    return ReconciliationRun.objects.create(
+        provider=provider, source=settlement.path, fingerprint=digest, since=since, until=until or timezone.now(),
+    )
+
+
+def _match(run, records):
+    """Issues for one chunk of records, stamping the transactions it settles."""
+    issues = []
+    wanted = {external_id for _, external_id, _ in records if external_id is not None}
+    # external_id <> '' lets PostgreSQL use the partial unique index.
+    found = {
+        external_id: (pk, amount, status, reconciled_run)
+        for pk, external_id, amount, status, reconciled_run in Transaction.objects.filter(
+            payment_provider=run.provider, external_id__in=wanted,
+        ).exclude(external_id='').values_list('pk', 'external_id', 'amount', 'status', 'reconciled_run')
+    }
+    settled = set()
+    for line, external_id, amount in records:
+        if external_id is None:
+            issues.append(ReconciliationIssue(run=run, kind=Kind.INVALID, line=line, detail=amount))
+            continue
+        issue = ReconciliationIssue(run=run, line=line, external_id=external_id, settled_amount=amount)
+        if external_id not in found:
+            issue.kind = Kind.MISSING
+            issues.append(issue)
+            continue
+        pk, recorded, status, reconciled_run = found[external_id]
+        issue.transaction_id, issue.recorded_amount = pk, recorded
+        if pk in settled or reconciled_run == run.pk:
+            issue.kind = Kind.DUPLICATE
+            issues.append(issue)
+        elif status != Transaction.Status.SUCCESS:
+            # Money moved for a payment we consider failed or still pending.
+            issue.kind, issue.detail = Kind.STATUS_MISMATCH, f'Transaction is {status}'
+            issues.append(issue)
+        elif amount != recorded:
+            issue.kind = Kind.AMOUNT_MISMATCH
+            issues.append(issue)
+        settled.add(pk)
+    Transaction.objects.filter(pk__in=settled).update(reconciled_run=run)
+    return issues
+
+
+def _orphans(run, chunk_size):
+    """Successful transactions of the run's window that no line settled, ``chunk_size`` at a time."""
+    queryset = Transaction.objects.filter(
+        payment_provider=run.provider, status=Transaction.Status.SUCCESS, created_at__lt=run.until,
+    ).exclude(reconciled_run=run).order_by('pk')
+    if run.since:
+        queryset = queryset.filter(created_at__gte=run.since)
+    while True:
+        batch = list(queryset.filter(pk__gt=run.orphan_cursor).values_list('pk', 'external_id', 'amount')[:chunk_size])
+        if not batch:
+            return
+        yield [
+            ReconciliationIssue(
+                run=run, kind=Kind.ORPHANED, external_id=external_id, recorded_amount=amount, transaction_id=pk,
+            )
+            for pk, external_id, amount in batch
+        ], batch[-1][0]
+
+
+def reconcile(run: ReconciliationRun, settlement: SettlementFile, chunk_size=None, progress=None):
+    """Carry ``run`` through to the end, committing after every chunk; returns the finished run."""
+    chunk_size = chunk_size or settings.RECONCILIATION_CHUNK_SIZE
+    if run.phase == ReconciliationRun.Phase.MATCHING:
+        for records, offset, last_line in settlement.chunks(run.offset, run.lines + 1, chunk_size):
+            with transaction.atomic():
+                ReconciliationIssue.objects.bulk_create(_match(run, records))
+                run.offset, run.lines = offset, last_line
+                run.save(update_fields=['offset', 'lines'])
+            if progress:
+                progress(run)
+        run.phase = ReconciliationRun.Phase.ORPHANS
+        run.save(update_fields=['phase'])
+    if run.phase == ReconciliationRun.Phase.ORPHANS:
+        for issues, cursor in _orphans(run, chunk_size):
+            with transaction.atomic():
+                ReconciliationIssue.objects.bulk_create(issues)
+                run.orphan_cursor = cursor
+                run.save(update_fields=['orphan_cursor'])
+        run.phase, run.finished_at = ReconciliationRun.Phase.DONE, timezone.now()
+        run.save(update_fields=['phase', 'finished_at'])
+    return run
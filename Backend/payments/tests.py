@@ -1,3 +1,206 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bookings.models import Booking
+from unimentor.query_plans import QueryPlanTestMixin
+from users.models import User
+from . import reconciliation
+from .models import ReconciliationIssue, ReconciliationRun, Transaction, WebhookEvent
+from .providers import StubProvider
+from .views import TransactionViewSet
+from .webhooks import process_batch
+
+
+class TransactionQueryPlanTests(QueryPlanTestMixin, TestCase):
+    def test_recent_transactions_use_index(self):
+        self.assertNoFullTableScan(TransactionViewSet.queryset[:50])
+
+
+@override_settings(PAYMENT_WEBHOOK_SECRETS={'stub': 'test-secret'})
+class WebhookTests(TestCase):
+    url = '/api/payments/webhooks/stub/'
+
+    @classmethod
+    def setUpTestData(cls):
+        student = User.objects.create_user('student', password='x')
+        mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        cls.booking = Booking.objects.create(student=student, mentor=mentor, slot_time=timezone.now())
+        cls.provider = StubProvider('test-secret')
+
+    def event(self, kind, seconds=0, payment_id='pay_1', booking_id=None):
+        self.sequence = getattr(self, 'sequence', 0) + 1
+        return json.dumps({
+            'id': f'evt_{self.sequence}',
+            'type': kind,
+            'created': (timezone.now() + timedelta(seconds=seconds)).isoformat(),
+            'data': {'payment_id': payment_id, 'booking_id': booking_id or self.booking.pk, 'amount': '50.00'},
+        }).encode()
+
+    def deliver(self, body, signature=None):
+        return self.client.post(
+            self.url, body, content_type='application/json',
+            headers={'X-Stub-Signature': signature or self.provider.sign(body)},
+        )
+
+    def test_bad_signature_is_rejected(self):
+        response = self.deliver(self.event('payment.succeeded'), signature='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_unknown_provider_is_404(self):
+        response = self.client.post('/api/payments/webhooks/nope/', b'{}', content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ingestion_is_one_insert_and_duplicates_are_stored_once(self):
+        body = self.event('payment.succeeded')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.deliver(body).status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.deliver(body).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_batch_creates_transaction_and_links_booking(self):
+        self.deliver(self.event('payment.pending'))
+        self.deliver(self.event('payment.succeeded', seconds=1))
+        self.assertEqual(process_batch(), 2)
+
+        txn = Transaction.objects.get()
+        self.assertEqual((txn.status, txn.external_id, txn.booking_id), (Transaction.Status.SUCCESS, 'pay_1', self.booking.pk))
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_id, 'pay_1')
+        self.assertFalse(WebhookEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_stale_event_in_a_later_batch_is_ignored(self):
+        self.deliver(self.event('payment.succeeded', seconds=1))
+        process_batch()
+        self.deliver(self.event('payment.pending'))
+        process_batch()
+        self.assertEqual(Transaction.objects.get().status, Transaction.Status.SUCCESS)
+
+    def test_naive_timestamps_are_utc(self):
+        body = json.loads(self.event('payment.succeeded'))
+        body['created'] = '2026-01-02T03:04:05'
+        occurred_at = self.provider.parse(json.dumps(body).encode()).occurred_at
+        self.assertEqual(occurred_at, timezone.make_aware(datetime(2026, 1, 2, 3, 4, 5), dt_timezone.utc))
+
+    def test_transaction_created_elsewhere_is_updated_not_duplicated(self):
+        Transaction.objects.create(
+            booking=self.booking, amount=Decimal('50.00'), payment_provider='stub', external_id='pay_1',
+            status=Transaction.Status.PENDING,
+        )
+        self.deliver(self.event('payment.succeeded'))
+        process_batch()
+        self.assertEqual(Transaction.objects.get().status, Transaction.Status.SUCCESS)
+
+    def test_unknown_booking_is_recorded_as_error(self):
+        self.deliver(self.event('payment.succeeded', booking_id=self.booking.pk + 1000))
+        process_batch()
+        event = WebhookEvent.objects.get()
+        self.assertIsNotNone(event.processed_at)
+        self.assertIn('Unknown booking', event.error)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_replayed_stream_converges(self):
+        bodies = list(self.provider.event_stream([self.booking.pk], 20, duplicates=0.3, disorder=0.5, seed=1))
+        for body in bodies:
+            self.deliver(body)
+        while process_batch(batch_size=7):
+            pass
+        expected = {}
+        for event in map(json.loads, bodies):
+            if event['type'] != 'payment.pending':
+                expected[event['data']['payment_id']] = StubProvider.STATUSES[event['type']]
+        self.assertEqual(WebhookEvent.objects.count(), 40)
+        self.assertEqual(dict(Transaction.objects.values_list('external_id', 'status')), expected)
+
+
+class ReconciliationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        student = User.objects.create_user('student', password='x')
+        mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        booking = Booking.objects.create(student=student, mentor=mentor, slot_time=timezone.now())
+        Transaction.objects.bulk_create([
+            Transaction(booking=booking, amount=Decimal('50.00'), payment_provider='stub',
+                        external_id=f'pay_{n}', status=Transaction.Status.SUCCESS)
+            for n in range(6)
+        ])
+
+    def settlement(self, content, suffix='.jsonl'):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return reconciliation.SettlementFile(path)
+
+    def lines(self):
+        rows = [('pay_0', '50.00'), ('pay_1', '49.00'), ('pay_2', '50'), ('pay_x', '10.00'), ('pay_0', '50.00')]
+        rows += [('pay_3', '50.00')]
+        return [json.dumps({'external_id': ext, 'amount': amount}) for ext, amount in rows] + ['not json']
+
+    def issues(self, run):
+        return sorted(run.issues.values_list('kind', 'external_id', 'line'), key=lambda issue: (issue[2] or 0, issue[1]))
+
+    def test_flags_each_kind_of_discrepancy(self):
+        Transaction.objects.filter(external_id='pay_3').update(status=Transaction.Status.FAILED)
+        settlement = self.settlement('\n'.join(self.lines()) + '\n')
+        run = reconciliation.reconcile(reconciliation.start_run(settlement, 'stub'), settlement, chunk_size=3)
+
+        self.assertEqual(run.phase, ReconciliationRun.Phase.DONE)
+        self.assertEqual(run.lines, 7)
+        Kind = ReconciliationIssue.Kind
+        self.assertEqual(self.issues(run), [
+            (Kind.ORPHANED, 'pay_4', None), (Kind.ORPHANED, 'pay_5', None),
+            (Kind.AMOUNT_MISMATCH, 'pay_1', 2), (Kind.MISSING, 'pay_x', 4),
+            (Kind.DUPLICATE, 'pay_0', 5), (Kind.STATUS_MISMATCH, 'pay_3', 6), (Kind.INVALID, '', 7),
+        ])
+
+    def test_interrupted_run_resumes_where_it_stopped(self):
+        settlement = self.settlement('\n'.join(self.lines()) + '\n')
+        run = reconciliation.start_run(settlement, 'stub')
+        chunks = settlement.chunks
+        with self.assertRaises(KeyboardInterrupt):
+            def interrupted(*args):
+                yield next(chunks(*args))
+                raise KeyboardInterrupt
+            settlement.chunks = interrupted
+            reconciliation.reconcile(run, settlement, chunk_size=3)
+        settlement.chunks = chunks
+
+        resumed = reconciliation.start_run(settlement, 'stub')
+        self.assertEqual((resumed.pk, resumed.lines), (run.pk, 3))
+        with CaptureQueriesContext(connection) as queries:
+            reconciliation.reconcile(resumed, settlement, chunk_size=3)
+        matched = [query for query in queries if 'external_id" IN' in query['sql']]
+        self.assertEqual(len(matched), 1)  # lines 4-6; line 7 has no id to look up
+        self.assertEqual(len(self.issues(resumed)), 6)
+        self.assertNotEqual(reconciliation.start_run(settlement, 'stub').pk, run.pk)
+
+    def test_resume_keeps_the_window(self):
+        settlement = self.settlement('\n'.join(self.lines()) + '\n')
+        run = reconciliation.start_run(settlement, 'stub')
+        self.assertEqual(reconciliation.start_run(settlement, 'stub', until=run.until).pk, run.pk)
+        with self.assertRaises(ValueError):
+            reconciliation.start_run(settlement, 'stub', since=run.until - timedelta(days=1))
+        with self.assertRaises(CommandError):
+            call_command('reconcile_payments', settlement.path, '--provider', 'stub', '--until', '2020-01-01T00:00')
+        restarted = reconciliation.start_run(settlement, 'stub', since=run.until - timedelta(days=1), restart=True)
+        self.assertNotEqual(restarted.pk, run.pk)
+
+    def test_csv_with_custom_columns(self):
+        settlement = self.settlement('id,settled\npay_0,50.00\npay_1,50.00\n', suffix='.csv')
+        settlement.id_column, settlement.amount_column = 'id', 'settled'
+        run = reconciliation.reconcile(reconciliation.start_run(settlement, 'stub', until=timezone.now()), settlement)
+        self.assertEqual(run.lines, 3)
+        self.assertEqual(
+            sorted(run.issues.values_list('external_id', flat=True)), ['pay_2', 'pay_3', 'pay_4', 'pay_5'],
+        )
@@ -1,9 +1,14 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet
+from .views import TransactionViewSet, webhook
 
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 
 urlpatterns = router.urls
 
+webhook_urlpatterns = [
+    path('<str:provider>/', webhook, name='payment-webhook'),
+]
+
 
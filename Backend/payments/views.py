@@ -1,17 +1,26 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Transaction
+from unimentor.fieldsets import SparseFieldsetMixin
+from unimentor.idempotency import idempotent
+from .models import Transaction, WebhookEvent
+from .providers import InvalidEvent, get_provider
 from .serializers import TransactionSerializer
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all().order_by('-created_at')
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Payment state must be read from the primary.
+    database_routing = 'primary'
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def initiate(self, request):
         """Placeholder endpoint to initiate a payment.
 
@@ -23,6 +32,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def confirm(self, request, pk=None):
         """Placeholder endpoint to confirm a payment."""
         return Response({
@@ -30,3 +40,27 @@ class TransactionViewSet(viewsets.ModelViewSet):
             "message": "Payment flow placeholder for MVP",
         }, status=status.HTTP_200_OK)
 
+
+@csrf_exempt
+@require_POST
+def webhook(request, provider):
+    """Verify and store a provider's webhook delivery; ``process_webhooks`` applies it later.
+
+    Answers as soon as the raw event is saved. A redelivered event is
+    acknowledged again without storing it twice.
+    """
+    handler = get_provider(provider)
+    if handler is None:
+        return JsonResponse({'detail': 'Unknown payment provider.'}, status=404)
+    body = request.body
+    if not handler.verify(body, request.headers):
+        return JsonResponse({'detail': 'Invalid signature.'}, status=400)
+    try:
+        event = handler.parse(body)
+    except InvalidEvent as exc:
+        return JsonResponse({'detail': str(exc)}, status=400)
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(provider=provider, event_id=event.event_id, occurred_at=event.occurred_at, payload=body.decode())],
+        ignore_conflicts=True,
+    )
+    return JsonResponse({'received': True})
@@ -0,0 +1,102 @@
+"""Applying stored webhook events to transactions and bookings.
+
+``process_batch`` takes the oldest unprocessed events (skipping rows another
+processor has locked), keeps the newest event per payment, and applies it
+with a handful of bulk statements whatever the batch size. An event older
+than what its transaction already reflects is marked processed and
+ignored, so deliveries may arrive in any order. The affected transactions
+are locked while they are compared and written, so concurrent processors
+never apply an older event over a newer one.
+"""
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from bookings.models import Booking
+from .models import Transaction, WebhookEvent
+from .providers import InvalidEvent, get_provider
+
+
+def _parse(events):
+    parsed, errors = [], {}
+    for event in events:
+        provider = get_provider(event.provider)
+        if provider is None:
+            errors[event.pk] = f'Provider {event.provider!r} is not configured.'
+            continue
+        try:
+            parsed.append((event.pk, event.provider, provider.parse(event.payload)))
+        except InvalidEvent as exc:
+            errors[event.pk] = str(exc)
+    return parsed, errors
+
+
+def _link_bookings(payments):
+    """Point bookings at their payment: always on success, otherwise only if they have none yet."""
+    succeeded = {txn.booking_id: txn.external_id for txn in payments if txn.status == Transaction.Status.SUCCESS}
+    others = {txn.booking_id: txn.external_id for txn in payments if txn.booking_id not in succeeded}
+    for booking_ids, filters in ((succeeded, {}), (others, {'payment_id': ''})):
+        if booking_ids:
+            Booking.objects.filter(pk__in=booking_ids, **filters).update(payment_id=models.Case(
+                *(models.When(pk=pk, then=models.Value(payment_id)) for pk, payment_id in booking_ids.items()),
+                output_field=models.CharField(),
+            ))
+
+
+def process_batch(batch_size=None) -> int:
+    """Apply up to ``batch_size`` pending events in one transaction; returns how many were handled."""
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.filter(processed_at__isnull=True)
+            .order_by('occurred_at', 'id')
+            .select_for_update(skip_locked=True)[:batch_size or settings.WEBHOOK_BATCH_SIZE]
+        )
+        if not events:
+            return 0
+        parsed, errors = _parse(events)
+
+        booking_ids = set(
+            Booking.objects.filter(pk__in={event.booking_id for _, _, event in parsed}).values_list('pk', flat=True)
+        )
+        latest = {}
+        for pk, provider, event in parsed:
+            if event.booking_id not in booking_ids:
+                errors[pk] = f'Unknown booking {event.booking_id}.'
+                continue
+            key = (provider, event.external_id)
+            if key not in latest or event.occurred_at > latest[key][1].occurred_at:
+                latest[key] = (provider, event)
+
+        # Create missing transactions first, in a fixed order; a row another
+        # processor created meanwhile is left alone and locked below instead.
+        Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    booking_id=event.booking_id, amount=event.amount, payment_provider=provider,
+                    external_id=event.external_id, status=event.status, provider_updated_at=event.occurred_at,
+                )
+                for _, (provider, event) in sorted(latest.items())
+            ],
+            ignore_conflicts=True,
+        )
+        lookup = models.Q(pk__in=[])
+        for provider in {provider for provider, _ in latest}:
+            lookup |= models.Q(payment_provider=provider, external_id__in=[ext for p, ext in latest if p == provider])
+        # Locked so a concurrent processor cannot apply an older event over a newer one.
+        applied, updated = [], []
+        for txn in Transaction.objects.filter(lookup).select_for_update().order_by('pk'):
+            _, event = latest[(txn.payment_provider, txn.external_id)]
+            if txn.provider_updated_at is None or event.occurred_at > txn.provider_updated_at:
+                txn.status, txn.amount, txn.provider_updated_at = event.status, event.amount, event.occurred_at
+                updated.append(txn)
+                applied.append(txn)
+            elif event.occurred_at == txn.provider_updated_at:
+                applied.append(txn)  # created above
+        Transaction.objects.bulk_update(updated, ['status', 'amount', 'provider_updated_at'])
+        _link_bookings(applied)
+
+        now = timezone.now()
+        WebhookEvent.objects.filter(pk__in=[event.pk for event in events if event.pk not in errors]).update(processed_at=now)
+        for pk, error in errors.items():
+            WebhookEvent.objects.filter(pk=pk).update(processed_at=now, error=error)
+        return len(events)
@@ -12,6 +12,9 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['mentor', '-created_at'], name='review_mentor_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Review {self.id} by {self.student} for {self.mentor}: {self.rating}"
@@ -1,3 +1,55 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from unimentor.query_plans import QueryPlanTestMixin
+from users.models import User
+from .models import Review
+from .views import newest_per_mentor
+
+
+class ReviewQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='x')
+        cls.mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        Review.objects.create(student=cls.student, mentor=cls.mentor, rating=5)
+
+    def test_mentor_reviews_use_index(self):
+        self.assertNoFullTableScan(Review.objects.filter(mentor_id=self.mentor.id))
+
+    def test_top_reviews_per_mentor_use_index(self):
+        self.assertNoFullTableScan(newest_per_mentor(Review.objects.filter(mentor_id__in=[self.mentor.id]), 3))
+
+
+class TopReviewsPerMentorTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        student = User.objects.create_user('student', password='x')
+        cls.mentors = [User.objects.create_user(f'mentor{i}', password='x', role=User.Role.MENTOR) for i in range(3)]
+        now = timezone.now()
+        for mentor in cls.mentors:
+            for age in range(5):
+                Review.objects.create(
+                    student=student, mentor=mentor, rating=5, created_at=now - timedelta(days=age),
+                )
+
+    def test_returns_newest_n_per_mentor_in_one_query(self):
+        wanted = self.mentors[:2]
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/reviews/', {
+                'mentor__in': ','.join(str(m.id) for m in wanted), 'per_mentor': 2,
+            })
+        self.assertEqual(response.status_code, 200)
+        expected = [
+            review.id
+            for mentor in wanted
+            for review in Review.objects.filter(mentor=mentor).order_by('-created_at')[:2]
+        ]
+        self.assertEqual([row['id'] for row in response.data], expected)
 
-# Create your tests here.
+    def test_rejects_non_numeric_ids(self):
+        response = self.client.get('/api/reviews/', {'mentor__in': '1,abc', 'per_mentor': 2})
+        self.assertEqual(response.status_code, 400)
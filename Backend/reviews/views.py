@@ -1,5 +1,8 @@
-from rest_framework import viewsets, permissions
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import exceptions, viewsets, permissions
 
+from unimentor.fieldsets import SparseFieldsetMixin
 from .models import Review
 from .serializers import ReviewSerializer
 
@@ -16,7 +19,30 @@ class IsStudentOrReadOnly(permissions.BasePermission):
         return obj.student_id == request.user.id or request.user.is_staff
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+MAX_PER_MENTOR = 50
+
+
+def _positive_int(value: str, param: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise exceptions.ValidationError({param: 'Expected a positive integer.'})
+    return number
+
+
+def newest_per_mentor(queryset, per_mentor: int):
+    """Keep the ``per_mentor`` newest reviews of each mentor, in one query.
+
+    The window is served by review_mentor_created_idx (mentor, -created_at).
+    """
+    return queryset.annotate(
+        mentor_rank=Window(RowNumber(), partition_by=F('mentor_id'), order_by=F('created_at').desc()),
+    ).filter(mentor_rank__lte=per_mentor).order_by('mentor_id', 'mentor_rank')
+
+
+class ReviewViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [IsStudentOrReadOnly]
@@ -26,6 +52,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
         mentor_id = self.request.query_params.get('mentor')
         if mentor_id:
             qs = qs.filter(mentor_id=mentor_id)
+        mentor_ids = self.request.query_params.get('mentor__in')
+        if mentor_ids:
+            qs = qs.filter(mentor_id__in=[_positive_int(pk, 'mentor__in') for pk in mentor_ids.split(',') if pk])
+        per_mentor = self.request.query_params.get('per_mentor')
+        if per_mentor:
+            qs = newest_per_mentor(qs, min(_positive_int(per_mentor, 'per_mentor'), MAX_PER_MENTOR))
         return qs
 
     def perform_create(self, serializer):
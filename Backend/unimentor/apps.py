@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class UnimentorConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'unimentor'
+
+    def ready(self):
+        # Install the statement timeout, query timing and slow query wrappers on every new connection.
+        from . import db, metrics, slow_queries  # noqa: F401
+        # Registers the deploy check that the rate limit cache is atomic.
+        from . import ratelimit  # noqa: F401
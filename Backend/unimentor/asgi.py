@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'unimentor.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Routes /api/ through its own middleware stack, see MIDDLEWARE_PIPELINES.
+from unimentor.handlers import PipelineASGIHandler  # noqa: E402
+
+application = PipelineASGIHandler()
@@ -0,0 +1,103 @@
+"""Async read endpoints built on top of the existing DRF viewsets.
+
+DRF views are synchronous, so under an ASGI server every request to them
+occupies a thread. The views here serve the read-heavy endpoints natively
+on the event loop: authentication and the queryset are evaluated with
+Django's async ORM, while filtering, permissions and serialization reuse
+the viewset classes unchanged (none of those steps touch the database).
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+_jwt = JWTAuthentication()
+
+
+async def aauthenticate(request):
+    """Async counterpart of ``JWTAuthentication.authenticate``.
+
+    Token validation is pure CPU work; only the user lookup hits the database.
+    """
+    header = _jwt.get_header(request)
+    if header is None:
+        return None
+    raw_token = _jwt.get_raw_token(header)
+    if raw_token is None:
+        return None
+    validated_token = _jwt.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+    User = get_user_model()
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise exceptions.AuthenticationFailed('User not found')
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('User is inactive')
+    return user
+
+
+def error_response(request, exc: exceptions.APIException) -> JsonResponse:
+    """Render an APIException the way DRF's exception handler would."""
+    data = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+    response = JsonResponse(data, status=exc.status_code)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = _jwt.authenticate_header(request)
+    return response
+
+
+async def _prepare_view(viewset_class, request, action, **kwargs):
+    """Authenticate the request and return an initialized viewset instance."""
+    user = await aauthenticate(request)
+    drf_request = Request(request, authenticators=(_jwt,))
+    # Mark authentication as done so DRF never runs the sync authenticator.
+    drf_request._authenticator = _jwt if user else None
+    drf_request.user = user or AnonymousUser()
+    view = viewset_class(action=action, request=drf_request, args=(), kwargs=kwargs, format_kwarg=None)
+    view.headers = {}
+    view.check_permissions(drf_request)
+    return view
+
+
+def async_list_view(viewset_class):
+    """Build an async ``list`` endpoint for a DRF viewset."""
+
+    @require_GET
+    async def view(request):
+        try:
+            viewset = await _prepare_view(viewset_class, request, 'list')
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            objects = [obj async for obj in queryset]
+        except exceptions.APIException as exc:
+            return error_response(request, exc)
+        return JsonResponse(viewset.get_serializer(objects, many=True).data, safe=False)
+
+    return view
+
+
+def async_retrieve_view(viewset_class):
+    """Build an async ``retrieve`` endpoint for a DRF viewset."""
+
+    @require_GET
+    async def view(request, pk):
+        try:
+            viewset = await _prepare_view(viewset_class, request, 'retrieve', pk=pk)
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            try:
+                obj = await queryset.aget(pk=pk)
+            except (queryset.model.DoesNotExist, ValueError):
+                raise exceptions.NotFound()
+            viewset.check_object_permissions(viewset.request, obj)
+        except exceptions.APIException as exc:
+            return error_response(request, exc)
+        return JsonResponse(viewset.get_serializer(obj).data)
+
+    return view
@@ -0,0 +1,19 @@
+"""Async read endpoints, mounted under ``/api/async/``.
+
+They mirror the GET endpoints of the corresponding viewsets and are meant to
+be served by the ASGI application (see ``unimentor.asgi``).
+"""
+from django.urls import path
+
+from bookings.views import BookingViewSet
+from mentors.views import MentorProfileViewSet
+from users import async_views as user_views
+from .async_api import async_list_view, async_retrieve_view
+
+urlpatterns = [
+    path('mentors/', async_list_view(MentorProfileViewSet), name='async-mentor-list'),
+    path('mentors/<int:pk>/', async_retrieve_view(MentorProfileViewSet), name='async-mentor-detail'),
+    path('bookings/', async_list_view(BookingViewSet), name='async-booking-list'),
+    path('bookings/<int:pk>/', async_retrieve_view(BookingViewSet), name='async-booking-detail'),
+    path('users/me/', user_views.me, name='async-user-me'),
+]
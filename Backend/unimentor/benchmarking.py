@@ -0,0 +1,216 @@
+"""Shared helpers for the benchmark management commands.
+
+Everything here runs against a real server process started on a local port,
+so the numbers include the HTTP stack, the worker model and the database.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _StubOAuthHandler(BaseHTTPRequestHandler):
+    """Answers like Google's token and userinfo endpoints, after a delay."""
+
+    def _reply(self, payload):
+        time.sleep(self.server.delay)
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        token = self.headers.get('Authorization', '').removeprefix('Bearer ') or 'stub'
+        self._reply({
+            'id': f'stub-{token}',
+            'email': f'{token}@stub.unicraft.test',
+            'name': 'Stub User',
+            'picture': '',
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self._reply({'access_token': 'stub', 'token_type': 'Bearer', 'expires_in': 3600})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOAuthServer:
+    """A local stand-in for Google's OAuth endpoints with configurable latency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.port = free_port()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', self.port), _StubOAuthHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay
+
+    @property
+    def env(self) -> dict:
+        base = f'http://127.0.0.1:{self.port}'
+        return {
+            'GOOGLE_OAUTH2_TOKEN_URL': f'{base}/token',
+            'GOOGLE_OAUTH2_USERINFO_URL': f'{base}/userinfo',
+        }
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ServerProcess:
+    """Run the production server (``manage.py serve``) on a free local port."""
+
+    def __init__(self, interface: str = 'asgi', env: dict = None, args=()):
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.interface = interface
+        self.env = {
+            **os.environ,
+            'ALLOWED_HOSTS': '127.0.0.1,localhost',
+            **(env or {}),
+        }
+        self.args = [
+            '--port', str(self.port),
+            '--interface', interface,
+            '--pidfile', os.path.join(tempfile.gettempdir(), f'unicraft-bench-{self.port}.pid'),
+            *args,
+        ]
+        self.process = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'serve', *self.args],
+            cwd=settings.BASE_DIR,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return self
+
+    def wait_until_ready(self, path: str = '/api/health/', timeout: float = 60.0) -> float:
+        """Poll ``path`` until it answers 200; return seconds since start."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'{self.interface} server exited with code {self.process.returncode}')
+            try:
+                if httpx.get(self.url + path, timeout=1.0).status_code == 200:
+                    return time.perf_counter() - self.started_at
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        raise RuntimeError(f'{self.interface} server not ready after {timeout}s')
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def __enter__(self):
+        self.start()
+        try:
+            self.wait_until_ready()
+        except Exception:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+@dataclass
+class LoadResult:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+        total = len(ordered) + self.errors
+        mean = sum(ordered) / len(ordered) if ordered else 0.0
+        throughput = len(ordered) / self.elapsed if self.elapsed else 0.0
+        return {
+            'requests': total,
+            'errors': self.errors,
+            'error_rate': self.errors / total if total else 0.0,
+            'throughput': throughput,
+            # Little's law: requests actually in flight on average.
+            'concurrency': throughput * mean,
+            'p50_ms': percentile(ordered, 50) * 1000,
+            'p95_ms': percentile(ordered, 95) * 1000,
+            'p99_ms': percentile(ordered, 99) * 1000,
+        }
+
+
+async def _drive(url, method, requests, concurrency, timeout):
+    result = LoadResult()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def one(request):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, **request)
+                except httpx.HTTPError:
+                    result.errors += 1
+                    return
+                if response.status_code >= 400:
+                    result.errors += 1
+                else:
+                    result.latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(request) for request in requests))
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_load(url, method='GET', json_body=None, headers=None, total=200, concurrency=20, timeout=60.0) -> LoadResult:
+    """Fire ``total`` requests at ``url`` with at most ``concurrency`` in flight."""
+    request = {'json': json_body, 'headers': headers or {}}
+    return asyncio.run(_drive(url, method, [request] * total, concurrency, timeout))
+
+
+def run_requests(url, requests, method='POST', concurrency=20, timeout=60.0) -> LoadResult:
+    """Like ``run_load``, but each request gets its own httpx keyword arguments (``content``, ``headers``...)."""
+    return asyncio.run(_drive(url, method, list(requests), concurrency, timeout))
@@ -0,0 +1,266 @@
+"""Two-tier cache: a bounded per-process LRU in front of the shared cache.
+
+Reads are served from process memory while a local copy is younger than
+``local_timeout``; otherwise they fall through to the shared cache
+(``CACHES['default']``) and the producer. Entries can carry tags: tag
+versions live in the shared cache, so ``invalidate_tags`` makes every
+worker's shared-tier copy stale at once, and drops local copies in this
+process immediately. Other workers drop theirs when the invalidation bus
+(``unimentor.invalidation``) delivers the event, or after ``local_timeout``
+at the latest.
+
+Each namespace keeps hit, miss, eviction and memory counters, reported by
+``stats()`` and the ``api/internal/cache/`` endpoint.
+"""
+import functools
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import CACHE_LOOKUPS
+
+
+TAG_KEY = 'cache:tag:{}'
+_MISSING = object()
+_namespaces = {}
+
+
+@dataclass
+class Stats:
+    local_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class TieredCache:
+    def __init__(self, namespace, timeout=300, local_timeout=None, max_entries=None, alias='default'):
+        if namespace in _namespaces:
+            raise ValueError(f'Cache namespace {namespace!r} already exists')
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local_timeout = settings.CACHE_LOCAL_TIMEOUT if local_timeout is None else local_timeout
+        self.max_entries = max_entries or settings.CACHE_LOCAL_MAX_ENTRIES
+        self.alias = alias
+        self.stats = Stats()
+        self._local = OrderedDict()  # key -> (expires_at, value, tags, size)
+        self._tagged = {}  # tag -> keys holding it locally
+        self._bytes = 0
+        self._lock = threading.Lock()
+        _namespaces[namespace] = self
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _shared_key(self, key):
+        return f'{self.namespace}:{key}'
+
+    # Local tier
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] < time.monotonic():
+                self._local_pop(key)
+                self.stats.expirations += 1
+                return _MISSING
+            self._local.move_to_end(key)
+            self.stats.local_hits += 1
+        CACHE_LOOKUPS.labels(self.namespace, 'local_hit').inc()
+        return entry[1]
+
+    def _local_set(self, key, value, tags, size):
+        with self._lock:
+            if key in self._local:
+                self._local_pop(key)
+            self._local[key] = (time.monotonic() + self.local_timeout, value, tags, size)
+            self._bytes += size
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._local) > self.max_entries:
+                self._local_pop(next(iter(self._local)))
+                self.stats.evictions += 1
+
+    def _local_pop(self, key):
+        # Caller holds the lock.
+        _, _, tags, size = self._local.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def drop_local(self, keys=(), tags=()):
+        """Forget local copies by key and/or tag; returns how many were dropped."""
+        with self._lock:
+            doomed = set(keys) & self._local.keys()
+            for tag in tags:
+                doomed |= self._tagged.get(tag, set())
+            for key in doomed:
+                self._local_pop(key)
+            self.stats.invalidations += len(doomed)
+            return len(doomed)
+
+    # Public API
+
+    def get(self, key, default=None):
+        value = self._local_get(key)
+        if value is not _MISSING:
+            return value
+        entry = self.shared.get(self._shared_key(key))
+        if entry is not None and _tags_current(self.shared, entry['tags']):
+            self.stats.shared_hits += 1
+            CACHE_LOOKUPS.labels(self.namespace, 'shared_hit').inc()
+            self._local_set(key, entry['value'], tuple(entry['tags']), len(pickle.dumps(entry['value'], -1)))
+            return entry['value']
+        self.stats.misses += 1
+        CACHE_LOOKUPS.labels(self.namespace, 'miss').inc()
+        return default
+
+    def set(self, key, value, tags=()):
+        tags = tuple(tags)
+        self.shared.set(
+            self._shared_key(key), {'value': value, 'tags': _tag_versions(self.shared, tags)}, self.timeout,
+        )
+        self.stats.sets += 1
+        self._local_set(key, value, tags, len(pickle.dumps(value, -1)))
+
+    def get_or_set(self, key, producer, tags=()):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = producer()
+            self.set(key, value, tags)
+        return value
+
+    def delete(self, key):
+        self.shared.delete(self._shared_key(key))
+        self.drop_local(keys=[key])
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+            self._tagged.clear()
+            self._bytes = 0
+
+    def report(self) -> dict:
+        stats = asdict(self.stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        return {
+            **stats,
+            'hit_rate': (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0,
+            'local_hit_rate': stats['local_hits'] / lookups if lookups else 0.0,
+            'local_entries': len(self._local),
+            'local_max_entries': self.max_entries,
+            'local_bytes': self._bytes,
+        }
+
+
+def _tag_versions(shared, tags) -> dict:
+    if not tags:
+        return {}
+    keys = {tag: TAG_KEY.format(tag) for tag in tags}
+    found = shared.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        if key not in found:
+            # Never store "no version": a tag whose key was evicted must not
+            # validate entries written before its last invalidation.
+            shared.add(key, time.time_ns(), None)
+            found[key] = shared.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def _tags_current(shared, versions) -> bool:
+    if not versions:
+        return True
+    found = shared.get_many([TAG_KEY.format(tag) for tag in versions])
+    return all(found.get(TAG_KEY.format(tag)) == version for tag, version in versions.items())
+
+
+def _bump_tags(tags):
+    caches['default'].set_many({TAG_KEY.format(tag): time.time_ns() for tag in tags}, None)
+    drop_local_tags(tags)
+
+
+def invalidate_tags(*tags):
+    """Invalidate every entry carrying any of ``tags``, in all namespaces and workers.
+
+    Takes effect right away in this process and again once the current
+    transaction commits, when the invalidation bus tells the other workers;
+    the second bump discards anything cached from pre-commit data meanwhile.
+    """
+    from .invalidation import publish
+
+    if not tags:
+        return
+    _bump_tags(tags)
+
+    def on_commit():
+        _bump_tags(tags)
+        publish(tags)
+
+    transaction.on_commit(on_commit)
+
+
+def drop_local_tags(tags) -> int:
+    """Drop this process's local copies of entries carrying any of ``tags``."""
+    return sum(namespace.drop_local(tags=tags) for namespace in _namespaces.values())
+
+
+def clear_local():
+    for namespace in _namespaces.values():
+        namespace.clear_local()
+
+
+def namespace(name) -> TieredCache:
+    return _namespaces[name]
+
+
+def stats() -> dict:
+    """Per-namespace counters for this process."""
+    return {name: cache.report() for name, cache in sorted(_namespaces.items())}
+
+
+def cached(cache: TieredCache, key=None, tags=None):
+    """Cache a function's result in ``cache``.
+
+    ``key`` and ``tags`` are callables taking the function's arguments; by
+    default the key is built from the arguments' reprs and there are no tags.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key is None:
+                raw = f'{func.__module__}.{func.__qualname__}:{args!r}:{sorted(kwargs.items())!r}'
+                cache_key = hashlib.md5(raw.encode()).hexdigest()
+            else:
+                cache_key = key(*args, **kwargs)
+            entry_tags = tags(*args, **kwargs) if tags else ()
+            return cache.get_or_set(cache_key, lambda: func(*args, **kwargs), entry_tags)
+
+        return wrapper
+
+    return decorator
+
+
+def cached_queryset(cache: TieredCache, queryset, tags=()):
+    """Evaluate ``queryset`` through ``cache``, keyed by its SQL; returns a list."""
+    cache_key = 'qs:' + hashlib.md5(f'{queryset.db}:{queryset.query}'.encode()).hexdigest()
+    return cache.get_or_set(cache_key, lambda: list(queryset), tags)
@@ -0,0 +1,193 @@
+"""Response compression negotiated from ``Accept-Encoding``.
+
+``CompressionMiddleware`` compresses text-like responses (JSON, NDJSON, CSV,
+the OpenAPI schema, HTML) of at least ``COMPRESSION_MIN_SIZE`` bytes with the
+best encoding the client accepts: zstd and brotli when their packages
+(``zstandard``, ``brotli``) are installed, gzip always. Streaming responses
+are compressed chunk by chunk and flushed after each one, so clients still
+receive rows as they are produced.
+
+Payloads that are cached whole can be compressed once when stored:
+``Precompressed.of(content)`` keeps every encoding, and a
+``PrecompressedResponse`` built from it is served without compressing again.
+"""
+import gzip
+import zlib
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'application/vnd.oai.openapi', 'image/svg+xml',
+)
+
+
+class _Gzip:
+    name = 'gzip'
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+    def compressor(self):
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # gzip container
+        return lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+class _Brotli:
+    name = 'br'
+
+    def compress(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+
+    def compressor(self):
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return lambda data: compressor.process(data) + compressor.flush(), compressor.finish
+
+
+class _Zstd:
+    name = 'zstd'
+
+    def compress(self, data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+    def compressor(self):
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return lambda data: compressor.compress(data) + compressor.flush(flush_block), compressor.flush
+
+
+# Available encoders, most preferred first when the client likes several equally.
+ENCODERS = {
+    encoder.name: encoder
+    for encoder, available in ((_Zstd(), zstandard), (_Brotli(), brotli), (_Gzip(), True))
+    if available
+}
+
+
+def negotiate(accept_encoding: str, offered=None):
+    """The encoding to use for ``accept_encoding`` among ``offered``, or None for identity."""
+    offered = list(ENCODERS) if offered is None else [name for name in ENCODERS if name in offered]
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for name in offered:
+        weight = weights.get(name, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def _compressible(content_type: str) -> bool:
+    media_type = content_type.split(';')[0].strip().lower()
+    return (
+        media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith('+json') or media_type.endswith('+xml')
+    )
+
+
+@dataclass(frozen=True)
+class Precompressed:
+    """A payload together with its compressed forms, ready to be cached."""
+    content: bytes
+    content_type: str
+    encodings: dict = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, content: bytes, content_type: str):
+        if len(content) < settings.COMPRESSION_MIN_SIZE:
+            return cls(content, content_type)
+        return cls(content, content_type, {name: encoder.compress(content) for name, encoder in ENCODERS.items()})
+
+
+class PrecompressedResponse(HttpResponse):
+    def __init__(self, payload: Precompressed, **kwargs):
+        super().__init__(payload.content, content_type=payload.content_type, **kwargs)
+        self.precompressed = payload
+
+
+def _stream(encoder, chunks):
+    # Flushed after every chunk: a streamed response must not stall in the compressor.
+    compress, finish = encoder.compressor()
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def _astream(encoder, chunks):
+    compress, finish = encoder.compressor()
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not _compressible(response.get('Content-Type', '')):
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept = request.headers.get('Accept-Encoding', '')
+        precompressed = getattr(response, 'precompressed', None)
+
+        if precompressed is not None:
+            encoding = negotiate(accept, precompressed.encodings)
+            if encoding is None:
+                return response
+            response.content = precompressed.encodings[encoding]
+            response.headers['Content-Length'] = str(len(response.content))
+        elif response.streaming:
+            encoding = negotiate(accept)
+            if encoding is None:
+                return response
+            if response.is_async:
+                response.streaming_content = _astream(ENCODERS[encoding], response.streaming_content)
+            else:
+                response.streaming_content = _stream(ENCODERS[encoding], response.streaming_content)
+            response.headers.pop('Content-Length', None)
+        else:
+            encoding = negotiate(accept)
+            if encoding is None or len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = ENCODERS[encoding].compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different representation of the same resource.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
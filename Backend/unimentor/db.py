@@ -0,0 +1,204 @@
+"""Statement timeouts and connection pool telemetry.
+
+``StatementTimeoutMiddleware`` caps how long any single query may run while a
+request is served: ``DATABASE_STATEMENT_TIMEOUT`` seconds by default, or what
+the view asks for with a ``statement_timeout`` attribute (on the view, the
+view class or a viewset action) or the ``@statement_timeout()`` decorator.
+A query that runs over raises ``StatementTimeout`` and the request answers
+503 instead of holding its worker and connection.
+
+PostgreSQL enforces the limit itself. ``SET statement_timeout`` is issued only
+when the session's limit differs; inside a transaction it is a ``SET LOCAL``,
+sent once per transaction (again only after a savepoint that set it rolls
+back). SQLite aborts the query from a progress handler. Code outside requests
+runs without a limit.
+
+``pool_stats()`` reports each alias's pool for ``api/internal/db/``.
+"""
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+
+
+QUERY_CANCELED = '57014'
+# SQLite calls the progress handler every this many VM instructions.
+SQLITE_PROGRESS_STEPS = 10_000
+
+_UNKNOWN = object()
+_timeout = ContextVar('statement_timeout', default=None)
+timeouts = Counter()
+
+
+class StatementTimeout(OperationalError):
+    pass
+
+
+def statement_timeout(seconds):
+    """Let a view's queries run for up to ``seconds`` each (0 for no limit)."""
+
+    def decorator(view):
+        view.statement_timeout = seconds
+        return view
+
+    return decorator
+
+
+def _is_timeout(exc) -> bool:
+    cause = exc.__cause__
+    return (
+        getattr(cause, 'sqlstate', None) == QUERY_CANCELED
+        or getattr(cause, 'pgcode', None) == QUERY_CANCELED
+        or str(cause) == 'interrupted'
+    )
+
+
+def _local_timeout(db):
+    """The limit SET LOCAL in the current transaction, or the session's."""
+    marker = getattr(db, 'statement_timeout_marker', None)
+    # The marker is an on_commit callback, so Django drops it exactly when the
+    # SET LOCAL is undone: at the end of the transaction or the rollback of
+    # the savepoint it was sent in.
+    if marker is not None and any(entry[1] is marker for entry in db.run_on_commit):
+        return marker.timeout
+    return getattr(db, 'statement_timeout', _UNKNOWN)
+
+
+def _set_timeout(db, timeout):
+    milliseconds = int((timeout or 0) * 1000)
+    if not db.in_atomic_block:
+        if getattr(db, 'statement_timeout', _UNKNOWN) != timeout:
+            with db.connection.cursor() as cursor:
+                cursor.execute(f'SET statement_timeout = {milliseconds}')
+            db.statement_timeout = timeout
+    elif _local_timeout(db) != timeout:
+        with db.connection.cursor() as cursor:
+            cursor.execute(f'SET LOCAL statement_timeout = {milliseconds}')
+
+        def marker():
+            pass
+
+        marker.timeout = timeout
+        db.statement_timeout_marker = marker
+        db.on_commit(marker)
+
+
+def enforce_statement_timeout(execute, sql, params, many, context):
+    """``execute_wrapper`` applying the current request's statement timeout."""
+    timeout = _timeout.get()
+    db = context['connection']
+    try:
+        if db.vendor == 'postgresql':
+            # Nothing but a rollback runs in a failed transaction.
+            failed = db.connection.info.transaction_status.name == 'INERROR'
+            if not failed:
+                _set_timeout(db, timeout)
+            return execute(sql, params, many, context)
+        if db.vendor == 'sqlite' and timeout:
+            deadline = time.monotonic() + timeout
+            db.connection.set_progress_handler(lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS)
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db.connection.set_progress_handler(None, 0)
+        return execute(sql, params, many, context)
+    except OperationalError as exc:
+        if timeout and _is_timeout(exc):
+            timeouts[db.alias] += 1
+            raise StatementTimeout(f'Query exceeded the {timeout:g}s statement timeout') from exc
+        raise
+
+
+def _install(sender, connection, **kwargs):
+    # A new (or freshly checked out) session's limit is unknown until set.
+    connection.statement_timeout = _UNKNOWN
+    connection.statement_timeout_marker = None
+    if enforce_statement_timeout not in connection.execute_wrappers:
+        connection.execute_wrappers.append(enforce_statement_timeout)
+
+
+connection_created.connect(_install, dispatch_uid='unimentor.db.statement_timeout')
+
+
+def _view_timeout(request, view_func):
+    timeout = getattr(view_func, 'statement_timeout', None)
+    view_class = getattr(view_func, 'cls', None)
+    if timeout is None and view_class is not None:
+        # DRF viewsets: the action for this method, then the class.
+        action = getattr(view_func, 'actions', {}).get(request.method.lower())
+        timeout = getattr(getattr(view_class, action, None), 'statement_timeout', None) if action else None
+        if timeout is None:
+            timeout = getattr(view_class, 'statement_timeout', None)
+    return timeout
+
+
+class StatementTimeoutMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _timeout.set(settings.DATABASE_STATEMENT_TIMEOUT or None)
+        try:
+            return self.get_response(request)
+        finally:
+            _timeout.reset(token)
+
+    async def __acall__(self, request):
+        token = _timeout.set(settings.DATABASE_STATEMENT_TIMEOUT or None)
+        try:
+            return await self.get_response(request)
+        finally:
+            _timeout.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timeout = _view_timeout(request, view_func)
+        if timeout is not None:
+            _timeout.set(timeout or None)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, StatementTimeout):
+            return JsonResponse({'detail': 'The database took too long to answer.'}, status=503)
+
+
+def pool_stats() -> dict:
+    """Per-alias pool counters of this process; aliases without a pool report only that."""
+    report = {}
+    for alias in connections:
+        db = connections[alias]
+        entry = {'vendor': db.vendor, 'pooled': False, 'statement_timeouts': timeouts[alias]}
+        pool = getattr(db, 'pool', None)
+        if pool is not None:
+            stats = pool.get_stats()
+            checkouts = stats.get('requests_num', 0)
+            entry.update(
+                pooled=True,
+                size=stats['pool_size'],
+                available=stats['pool_available'],
+                min_size=stats['pool_min'],
+                max_size=stats['pool_max'],
+                saturation=(stats['pool_size'] - stats['pool_available']) / stats['pool_max'],
+                checkouts=checkouts,
+                waiting=stats.get('requests_waiting', 0),
+                queued=stats.get('requests_queued', 0),
+                wait_ms_total=stats.get('requests_wait_ms', 0),
+                wait_ms_avg=stats.get('requests_wait_ms', 0) / checkouts if checkouts else 0.0,
+                checkout_errors=stats.get('requests_errors', 0),
+                bad_returns=stats.get('returns_bad', 0),
+                connections_opened=stats.get('connections_num', 0),
+                connections_lost=stats.get('connections_lost', 0),
+            )
+        report[alias] = entry
+    return {'pid': os.getpid(), 'databases': report}
@@ -0,0 +1,172 @@
+"""Streaming CSV/NDJSON exports of whole tables for staff.
+
+Rows are read with ``QuerySet.iterator()`` as plain value tuples (a
+server-side cursor on PostgreSQL) and written out one chunk at a time, so
+memory stays flat however large the table is. With ``compress=True`` the
+stream is gzipped on the fly. ``astream`` serves the same chunks to an
+async (ASGI) response, which would otherwise drain a sync iterator into a
+list before sending the first byte.
+
+Used by ``api/internal/export/<name>.<csv|ndjson>[.gz]`` and the
+``export_data`` command.
+"""
+import csv
+import io
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Spreadsheet apps run cells starting with these as formulas.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class InvalidFilter(ValueError):
+    def __init__(self, param, message):
+        super().__init__(f'{param}: {message}')
+        self.param = param
+        self.message = message
+
+
+@dataclass(frozen=True)
+class Export:
+    model: str
+    fields: tuple
+    date_field: str
+    status_field: str = None
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+
+EXPORTS = {
+    'bookings': Export(
+        'bookings.Booking',
+        ('id', 'student_id', 'mentor_id', 'slot_time', 'status', 'payment_id', 'meet_link', 'created_at'),
+        date_field='created_at', status_field='status',
+    ),
+    'transactions': Export(
+        'payments.Transaction',
+        ('id', 'booking_id', 'amount', 'payment_provider', 'status', 'external_id', 'created_at'),
+        date_field='created_at', status_field='status',
+    ),
+    'users': Export(
+        'users.User',
+        ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'is_verified', 'is_active', 'date_joined'),
+        date_field='date_joined',
+    ),
+    'reviews': Export(
+        'reviews.Review',
+        ('id', 'student_id', 'mentor_id', 'rating', 'comment', 'created_at'),
+        date_field='created_at',
+    ),
+}
+
+
+def _bound(value: str, param: str, end=False) -> tuple:
+    """Parse an inclusive date or datetime bound into a ``(lookup, datetime)`` pair.
+
+    A bare date ``until`` covers that whole day, i.e. everything before the next one.
+    """
+    lookup = 'lte' if end else 'gte'
+    # Dates first: parse_datetime() also takes a bare date, as midnight.
+    day = parse_date(value)
+    if day is not None:
+        if end:
+            lookup, day = 'lt', day + timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise InvalidFilter(param, 'Expected a date or datetime in ISO 8601 format.')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return lookup, moment
+
+
+def export_queryset(name, since=None, until=None, statuses=()):
+    """Rows of export ``name`` as value tuples in primary key order; raises InvalidFilter."""
+    export = EXPORTS[name]
+    model = export.get_model()
+    queryset = model._default_manager.order_by('pk')
+    if since:
+        lookup, moment = _bound(since, 'since')
+        queryset = queryset.filter(**{f'{export.date_field}__{lookup}': moment})
+    if until:
+        lookup, moment = _bound(until, 'until', end=True)
+        queryset = queryset.filter(**{f'{export.date_field}__{lookup}': moment})
+    if statuses:
+        if export.status_field is None:
+            raise InvalidFilter('status', f'{name.capitalize()} have no status.')
+        allowed = {value for value, _ in model._meta.get_field(export.status_field).choices}
+        unknown = set(statuses) - allowed
+        if unknown:
+            raise InvalidFilter(
+                'status', f"Unknown {', '.join(sorted(unknown))}; expected one of {', '.join(sorted(allowed))}.",
+            )
+        queryset = queryset.filter(**{f'{export.status_field}__in': statuses})
+    return queryset.values_list(*export.fields)
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _chunks(queryset, fields, fmt, chunk_size):
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+
+        def write(row):
+            writer.writerow([_csv_cell(value) for value in row])
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+        def write(row):
+            buffer.write(encoder.encode(dict(zip(fields, row))) + '\n')
+
+    for count, row in enumerate(queryset.iterator(chunk_size=chunk_size), start=1):
+        write(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream(name, queryset, fmt, compress=False, chunk_size=None):
+    """Yield export ``name`` of ``queryset`` encoded as ``fmt``, ``chunk_size`` rows at a time."""
+    chunks = _chunks(queryset, EXPORTS[name].fields, fmt, chunk_size or settings.EXPORT_CHUNK_SIZE)
+    if not compress:
+        yield from chunks
+        return
+    gzip = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = gzip.compress(chunk)
+        if data:
+            yield data
+    yield gzip.flush()
+
+
+async def astream(name, queryset, fmt, compress=False, chunk_size=None):
+    """``stream`` as an async iterator, fetching each chunk in the request's sync thread."""
+    chunks = stream(name, queryset, fmt, compress=compress, chunk_size=chunk_size)
+    # Thread-sensitive, so every chunk reads from the same connection and cursor.
+    fetch = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await fetch(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,118 @@
+"""Sparse fieldsets: ``?fields=`` and ``?omit=`` on API reads.
+
+Add ``SparseFieldsetMixin`` in front of a viewset. On GET and HEAD,
+``?fields=id,user.username`` keeps only the listed fields and
+``?omit=availability`` drops fields; nested serializers are addressed with
+dots. Besides trimming the JSON, the kept fields are turned into
+``QuerySet.only()`` so the other columns are never read (and relations
+nothing asks for are no longer joined).
+
+Columns the view itself relies on, for example in object permissions, are
+listed in ``sparse_fields_required`` so they are loaded anyway. A field whose
+source is not a plain model field (a method, property or ``source='*'``)
+leaves the query as it was.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import exceptions, serializers
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _names(value: str) -> list:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _tree(paths) -> dict:
+    """``['id', 'user.email']`` -> ``{'id': {}, 'user': {'email': {}}}``."""
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _nested(field):
+    field = getattr(field, 'child', field)
+    return field if isinstance(field, serializers.Serializer) else None
+
+
+def _prune(serializer, keep, omit, param_path=''):
+    """Drop fields of ``serializer`` in place; raises ValidationError on unknown names."""
+    fields = serializer.fields
+    unknown = (set(keep) | set(omit)) - set(fields)
+    if unknown:
+        raise exceptions.ValidationError({
+            'fields': f"Unknown {', '.join(param_path + name for name in sorted(unknown))}; "
+                      f"choose from {', '.join(param_path + name for name in fields)}.",
+        })
+    for name in list(fields):
+        nested = _nested(fields[name])
+        if (keep and name not in keep) or (name in omit and not omit[name]):
+            fields.pop(name)
+        elif nested is not None and (keep.get(name) or omit.get(name)):
+            _prune(nested, keep.get(name, {}), omit.get(name, {}), f'{param_path}{name}.')
+        elif nested is None and (keep.get(name) or omit.get(name)):
+            raise exceptions.ValidationError({'fields': f'{param_path}{name} has no fields of its own.'})
+
+
+def _columns(serializer, model, prefix=''):
+    """``only()`` paths for the fields left on ``serializer``, or None if they cannot be known."""
+    columns = {prefix + model._meta.pk.name}
+    for field in serializer.fields.values():
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        columns.add(prefix + model_field.name)
+        nested = _nested(field)
+        if nested is not None and model_field.is_relation:
+            related = _columns(nested, model_field.related_model, f'{prefix}{model_field.name}__')
+            if related is None:
+                return None
+            columns |= related
+    return columns
+
+
+class SparseFieldsetMixin:
+    sparse_fields_required = ()
+
+    def _sparse_fieldset(self):
+        """``(keep, omit)`` trees for this request, or None."""
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = None
+            request = self.request
+            if request is not None and request.method in SAFE_METHODS:
+                keep, omit = request.query_params.get('fields', ''), request.query_params.get('omit', '')
+                if keep or omit:
+                    self._fieldset = (_tree(_names(keep)), _tree(_names(omit)))
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self._sparse_fieldset()
+        if fieldset is not None:
+            _prune(getattr(serializer, 'child', serializer), *fieldset)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self._sparse_fieldset() is None:
+            return queryset
+        serializer = self.get_serializer()
+        columns = _columns(serializer, queryset.model)
+        if columns is None:
+            return queryset
+        columns.update(self.sparse_fields_required)
+        if queryset.query.select_related:
+            # Joining a relation that is not loaded is an error with only().
+            joined = {column.split('__')[0] for column in columns if '__' in column}
+            queryset = queryset.select_related(None)
+            if joined:
+                queryset = queryset.select_related(*joined)
+        return queryset.only(*columns)
@@ -0,0 +1,84 @@
+"""Gunicorn configuration for the UniCraft backend.
+
+Usage::
+
+    python manage.py serve          # or: gunicorn -c unimentor/gunicorn_conf.py
+
+``SERVER_INTERFACE`` selects the application: ``asgi`` (default) runs
+``unimentor.asgi`` under uvicorn workers, so the async views and the OAuth
+endpoints never block a worker while waiting on the network; ``wsgi`` runs
+the threaded sync workers.
+
+The Django app is preloaded in the master and warmed before forking (see
+``unimentor.warmup``). Sizing defaults follow the CPU count and can be
+overridden with ``WEB_CONCURRENCY`` and ``GUNICORN_THREADS``.
+
+Workers share Prometheus metrics through files in ``PROMETHEUS_MULTIPROC_DIR``
+(see ``unimentor.metrics``), set here before the app is loaded.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+SERVER_INTERFACE = os.environ.get('SERVER_INTERFACE', 'asgi')
+CPU_COUNT = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+pidfile = os.environ.get('GUNICORN_PIDFILE')
+
+if SERVER_INTERFACE == 'asgi':
+    wsgi_app = 'unimentor.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # One event loop per core; blocking work goes to each loop's thread pool.
+    workers = int(os.environ.get('WEB_CONCURRENCY', CPU_COUNT))
+else:
+    wsgi_app = 'unimentor.wsgi:application'
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', CPU_COUNT + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = True
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'unicraft-metrics'))
+# The preloaded app creates metric files as it is imported, before on_starting.
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Recycle workers to bound memory growth; the jitter keeps them from all
+# restarting at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def on_starting(server):
+    # Samples left by a previous server would be added to this one's.
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+
+
+def when_ready(server):
+    from unimentor import warmup
+
+    elapsed = warmup.warm_shared()
+    warmup.close_connections()
+    server.log.info('Warmed URL resolver and API schema in %.0f ms', elapsed * 1000)
+
+
+def post_fork(server, worker):
+    from unimentor import warmup
+
+    elapsed = warmup.warm_worker()
+    server.log.info('Worker %s warmed connections and caches in %.0f ms', worker.pid, elapsed * 1000)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
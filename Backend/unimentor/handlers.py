@@ -0,0 +1,70 @@
+"""Request handlers that run a different middleware stack per URL prefix.
+
+``settings.MIDDLEWARE`` is built for the admin: sessions, CSRF, messages and
+clickjacking protection. The JSON API authenticates every request with a JWT
+and needs none of that, so ``settings.MIDDLEWARE_PIPELINES`` maps URL
+prefixes to leaner stacks. A request whose path starts with one of the
+prefixes (longest prefix wins) is handled by that stack; everything else
+goes through ``settings.MIDDLEWARE`` as before.
+"""
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+
+class _PipelineHandler(BaseHandler):
+    """A handler whose middleware chain is built from an explicit list."""
+
+    def __init__(self, middleware):
+        super().__init__()
+        self.middleware = list(middleware)
+
+    def load_middleware(self, is_async=False):
+        # BaseHandler reads settings.MIDDLEWARE; swap it only while the chain
+        # is built, which happens once per process before serving requests.
+        default = settings.MIDDLEWARE
+        settings.MIDDLEWARE = self.middleware
+        try:
+            super().load_middleware(is_async=is_async)
+        finally:
+            settings.MIDDLEWARE = default
+
+
+class PipelineHandlerMixin:
+    """Dispatch requests to the middleware pipeline matching their path."""
+
+    def load_middleware(self, is_async=False):
+        super().load_middleware(is_async=is_async)
+        self.pipelines = []
+        for prefix, middleware in getattr(settings, 'MIDDLEWARE_PIPELINES', {}).items():
+            handler = _PipelineHandler(middleware)
+            handler.load_middleware(is_async=is_async)
+            self.pipelines.append((prefix, handler))
+        self.pipelines.sort(key=lambda item: len(item[0]), reverse=True)
+
+    def pipeline_for(self, path):
+        for prefix, handler in self.pipelines:
+            if path.startswith(prefix):
+                return handler
+        return None
+
+    def get_response(self, request):
+        handler = self.pipeline_for(request.path_info)
+        if handler is None:
+            return super().get_response(request)
+        return handler.get_response(request)
+
+    async def get_response_async(self, request):
+        handler = self.pipeline_for(request.path_info)
+        if handler is None:
+            return await super().get_response_async(request)
+        return await handler.get_response_async(request)
+
+
+class PipelineWSGIHandler(PipelineHandlerMixin, WSGIHandler):
+    pass
+
+
+class PipelineASGIHandler(PipelineHandlerMixin, ASGIHandler):
+    pass
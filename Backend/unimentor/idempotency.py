@@ -0,0 +1,142 @@
+"""``Idempotency-Key`` support for unsafe API endpoints.
+
+Decorate a DRF view method with ``@idempotent``. The first request carrying
+a given key runs the view and its response is stored in ``IdempotencyKey``
+for ``IDEMPOTENCY_KEY_TTL`` seconds; retries with the same key get that
+response back, headers such as ``Location`` included and marked
+``Idempotent-Replayed: true``, without running the view again. A retry that
+arrives while the first request is still running gets 409 with
+``Retry-After`` at once, rather than holding a worker while it waits.
+
+Keys are scoped to the user, method and path. Reusing a key for a different
+request body is rejected with 422. Exceptions and server errors are not
+stored, so the client can retry them. Expired rows are deleted by the
+``purge_idempotency_keys`` command.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Seconds a retry of a request still in flight is told to wait.
+RETRY_AFTER = 1
+# Set again when the replayed response is rendered.
+UNSTORED_HEADERS = {'content-type', 'content-length'}
+
+
+def _key(request, client_key: str) -> str:
+    scope = f'{request.user.pk}:{request.method}:{request.path}:{client_key}'
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(request) -> str:
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.md5(body.encode()).hexdigest()
+
+
+def _claim(key: str, fingerprint: str):
+    """Reserve ``key`` for this request; returns None if claimed, else the existing row."""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, fingerprint=fingerprint, created_at=now, expires_at=expires_at)
+        return None
+    except IntegrityError:
+        pass
+    # Take over rows that expired, or whose request died without answering.
+    abandoned = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    taken = IdempotencyKey.objects.filter(
+        Q(expires_at__lt=now) | Q(status_code__isnull=True, created_at__lt=abandoned), key=key,
+    ).update(
+        fingerprint=fingerprint, status_code=None, response=None, headers={}, created_at=now, expires_at=expires_at,
+    )
+    if taken:
+        return None
+    return IdempotencyKey.objects.filter(key=key).first()
+
+
+def _replay(record: IdempotencyKey):
+    return Response(
+        record.response, status=record.status_code, headers={**record.headers, 'Idempotent-Replayed': 'true'},
+    )
+
+
+def _resolve(key: str, fingerprint: str):
+    """Claim ``key``, or answer from (or for) the request that already has it; None means run the view."""
+    record = _claim(key, fingerprint)
+    if record is None:
+        return None
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'detail': f'This {HEADER} was already used for a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is not None:
+        return _replay(record)
+    return Response(
+        {'detail': f'A request with this {HEADER} is still in progress; retry later.'},
+        status=status.HTTP_409_CONFLICT, headers={'Retry-After': str(RETRY_AFTER)},
+    )
+
+
+def idempotent(method):
+    """Make a DRF view method honour the ``Idempotency-Key`` header."""
+
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        client_key = request.headers.get(HEADER)
+        if not client_key:
+            return method(view, request, *args, **kwargs)
+        if len(client_key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        key, fingerprint = _key(request, client_key), _fingerprint(request)
+        answer = _resolve(key, fingerprint)
+        if answer is not None:
+            return answer
+        try:
+            response = method(view, request, *args, **kwargs)
+        except BaseException:
+            IdempotencyKey.objects.filter(key=key).delete()
+            raise
+        if response.status_code >= 500:
+            IdempotencyKey.objects.filter(key=key).delete()
+        else:
+            headers = {name: value for name, value in response.items() if name.lower() not in UNSTORED_HEADERS}
+            IdempotencyKey.objects.filter(key=key).update(
+                status_code=response.status_code, response=response.data, headers=headers,
+            )
+        return response
+
+    return wrapper
+
+
+def purge_expired(batch_size=1000) -> int:
+    """Delete expired keys ``batch_size`` rows at a time; returns how many were deleted."""
+    deleted = 0
+    while True:
+        keys = list(
+            IdempotencyKey.objects.filter(expires_at__lt=timezone.now()).values_list('key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(key__in=keys).delete()[0]
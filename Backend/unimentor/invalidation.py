@@ -0,0 +1,170 @@
+"""Invalidation bus: tells every worker which cache tags just went stale.
+
+``unimentor.cache.invalidate_tags`` publishes the tags once the surrounding
+transaction commits; each worker runs a listener thread that drops its
+local copies of entries carrying those tags, so reads never have to check
+the shared cache for freshness.
+
+On PostgreSQL events travel over ``LISTEN/NOTIFY`` and arrive as soon as the
+publishing transaction commits. Elsewhere they are rows in
+``InvalidationEvent`` that workers poll every ``INVALIDATION_POLL_INTERVAL``.
+"""
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import InvalidationEvent
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'unicraft_invalidation'
+# Keep polled events this long; workers further behind rely on local_timeout.
+RETENTION = timedelta(minutes=10)
+
+
+def _uses_notify(using='default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def publish(tags, using='default'):
+    """Broadcast ``tags`` to every worker, including this one."""
+    tags = sorted(set(tags))
+    if not tags:
+        return
+    if _uses_notify(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(tags)])
+        return
+    event = InvalidationEvent.objects.using(using).create(tags=tags)
+    if event.id % 1000 == 0:
+        InvalidationEvent.objects.using(using).filter(created_at__lt=timezone.now() - RETENTION).delete()
+
+
+def model_tags(instance) -> list:
+    """Cache tags for a model instance: ``<app_label.model>`` and ``<app_label.model>:<pk>``."""
+    label = instance._meta.label_lower
+    return [label, f'{label}:{instance.pk}']
+
+
+def broadcast_changes(model, fields=None, created=True):
+    """Invalidate ``model_tags`` in every worker whenever an instance is saved or deleted.
+
+    With ``fields``, saves limited by ``update_fields`` to other fields are
+    not broadcast; with ``created=False``, neither are inserts.
+    """
+    from django.db.models.signals import post_delete, post_save
+
+    from .cache import invalidate_tags
+
+    fields = frozenset(fields) if fields is not None else None
+
+    def changed(sender, instance, **kwargs):
+        if kwargs.get('created') and not created:
+            return
+        update_fields = kwargs.get('update_fields')
+        if fields is not None and update_fields is not None and fields.isdisjoint(update_fields):
+            return
+        invalidate_tags(*model_tags(instance))
+
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=f'broadcast:{model._meta.label_lower}')
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=f'broadcast:{model._meta.label_lower}')
+
+
+def apply(tags):
+    from .cache import drop_local_tags
+
+    dropped = drop_local_tags(tags)
+    logger.debug('Invalidation bus dropped %d local entries for %s', dropped, tags)
+
+
+class InvalidationListener:
+    """Background thread applying bus events to this process's local caches."""
+
+    def __init__(self, using='default', poll_interval=None):
+        self.using = using
+        self.poll_interval = poll_interval or settings.INVALIDATION_POLL_INTERVAL
+        self.last_id = None
+        self._stop = threading.Event()
+        self._thread = None
+        # Set once the thread is receiving events.
+        self.ready = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self.ready.clear()
+            target = self._listen if _uses_notify(self.using) else self._poll_forever
+            self._thread = threading.Thread(target=target, name='invalidation-bus', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Polling (SQLite and other backends)
+
+    def poll(self):
+        """Apply events published since the last poll; returns how many were applied."""
+        events = InvalidationEvent.objects.using(self.using).order_by('id')
+        if self.last_id is None:
+            # Only events published after start-up matter; older ones predate our caches.
+            self.last_id = events.values_list('id', flat=True).last() or 0
+            return 0
+        applied = 0
+        for event_id, tags in events.filter(id__gt=self.last_id).values_list('id', 'tags'):
+            apply(tags)
+            self.last_id = event_id
+            applied += 1
+        return applied
+
+    def _poll_forever(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                    self.ready.set()
+                except Exception:
+                    logger.exception('Invalidation bus poll failed')
+                self._stop.wait(self.poll_interval)
+        finally:
+            connections[self.using].close()
+
+    # LISTEN/NOTIFY (PostgreSQL)
+
+    def _listen(self):
+        reconnecting = False
+        while not self._stop.is_set():
+            db = connections[self.using]
+            raw = None
+            try:
+                # A dedicated session, never a pooled one: it stays in LISTEN.
+                raw = db.Database.connect(**db.get_connection_params(), autocommit=True)
+                raw.execute(f'LISTEN {CHANNEL}')
+                self.ready.set()
+                if reconnecting:
+                    # Notifications sent while disconnected are lost.
+                    from .cache import clear_local
+
+                    clear_local()
+                reconnecting = True
+                while not self._stop.is_set():
+                    for notify in raw.notifies(timeout=self.poll_interval):
+                        apply(json.loads(notify.payload))
+            except Exception:
+                logger.exception('Invalidation bus listener failed; reconnecting')
+                self._stop.wait(1)
+            finally:
+                if raw is not None:
+                    raw.close()
+
+
+listener = InvalidationListener()
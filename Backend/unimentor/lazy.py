@@ -0,0 +1,20 @@
+from django.utils.module_loading import import_string
+
+
+def lazy_view(view_path: str, **initkwargs):
+    """Return a view that imports the class-based view at ``view_path`` on first use.
+
+    Keeps rarely hit endpoints (e.g. the OpenAPI schema and Swagger UI) from
+    importing their dependencies when the URLconf is loaded.
+    """
+    resolved = None
+
+    def view(request, *args, **kwargs):
+        nonlocal resolved
+        if resolved is None:
+            resolved = import_string(view_path).as_view(**initkwargs)
+        return resolved(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    view.__name__ = view_path.rsplit('.', 1)[-1]
+    return view
@@ -0,0 +1,264 @@
+"""Load test of whole user journeys (``manage.py loadtest``).
+
+A journey is what one new student and a seeded mentor do together:
+
+1. sign up, either ``register`` then ``token`` or ``oauth`` through the stub
+   Google upstream of ``unimentor.benchmarking``;
+2. ``search`` the mentor directory and ``book`` one of the results;
+3. the mentor calls ``accept``, then the student calls ``complete`` and
+   leaves a ``review``;
+4. the mentor looks at their ``earnings``.
+
+Journeys arrive at ``rate`` per second (exponential gaps, so a Poisson
+process) or, with no rate, as fast as ``concurrency`` allows. At most
+``concurrency`` run at once and later arrivals wait. Latencies are kept
+per step. The ``journey`` row runs from arrival to the last step, waiting
+included, so a saturated server shows up there and not only as lower
+throughput. A failed step ends its journey.
+
+``report()`` turns a run into JSON tagged with the commit, for
+``compare()`` against a run saved from another commit.
+
+The seeded mentors get a fresh random password each run, and ``cleanup()``
+deletes them together with the run's students and everything they made.
+"""
+import asyncio
+import random
+import secrets
+import subprocess
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .benchmarking import LoadResult
+
+
+MENTOR_PREFIX = 'loadtest-mentor-'
+SEARCH = {'search': 'Loadtest', 'language': 'English'}
+STEPS = ('register', 'token', 'oauth', 'search', 'book', 'accept', 'complete', 'review', 'earnings', 'journey')
+
+
+def seed_mentors(count: int) -> tuple:
+    """Make sure ``count`` approved load test mentors exist; returns their usernames and password.
+
+    The password is new for every call, so it never outlives the run.
+    """
+    from mentors.models import MentorProfile
+    from mentors.signals import bump_directory_version
+
+    User = get_user_model()
+    usernames = [f'{MENTOR_PREFIX}{index}' for index in range(count)]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    raw_password = secrets.token_urlsafe(24)
+    password = make_password(raw_password)
+    User.objects.filter(username__in=existing).update(password=password)
+    users = User.objects.bulk_create([
+        User(
+            username=username, email=f'{username}@loadtest.unicraft.test', password=password,
+            role=User.Role.MENTOR, first_name='Mentor', last_name='Loadtest',
+        )
+        for username in usernames if username not in existing
+    ])
+    users = User.objects.filter(username__in=[user.username for user in users])
+    profiles = MentorProfile.objects.bulk_create([
+        MentorProfile(
+            user=user, university='Loadtest University', program='Computer Science', year=3,
+            languages='English,Spanish', status=MentorProfile.Status.APPROVED,
+        )
+        for user in users
+    ])
+    # bulk_create sends no post_save: tell the directory caches ourselves.
+    for profile in profiles:
+        bump_directory_version(profile.user_id)
+    return usernames, raw_password
+
+
+def journey_prefix(run_id: str) -> str:
+    """Username (and stub OAuth email) prefix of the students of run ``run_id``."""
+    return f'loadtest-{run_id}-'
+
+
+def cleanup(run_id: str, mentors=()) -> int:
+    """Delete the students of run ``run_id`` and ``mentors``, with their bookings and reviews."""
+    from django.db.models import Q
+
+    prefix = journey_prefix(run_id)
+    users = get_user_model().objects.filter(
+        Q(username__startswith=prefix) | Q(email__startswith=prefix) | Q(username__in=mentors)
+    )
+    deleted, _ = users.delete()
+    return deleted
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Journey:
+    def __init__(self, client, results, mentors, auth, name, rng):
+        self.client = client
+        self.results = results
+        self.mentors = mentors
+        self.auth = auth
+        self.name = name
+        self.rng = rng
+
+    async def call(self, step, method, path, token=None, expect=(200, 201), **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as exc:
+            self.results[step].errors += 1
+            raise StepFailed(f'{step}: {type(exc).__name__}') from exc
+        if response.status_code not in expect:
+            self.results[step].errors += 1
+            raise StepFailed(f'{step}: HTTP {response.status_code}')
+        self.results[step].latencies.append(time.perf_counter() - started)
+        return response.json()
+
+    async def sign_up(self):
+        if self.auth == 'oauth':
+            data = await self.call('oauth', 'POST', '/api/users/auth/google/', json={'access_token': self.name})
+            return data['access_token']
+        password = f'{self.name}-password'
+        await self.call('register', 'POST', '/api/users/register/', json={
+            'username': self.name, 'email': f'{self.name}@loadtest.unicraft.test', 'password': password,
+            'role': 'student',
+        })
+        data = await self.call('token', 'POST', '/api/token/', json={'username': self.name, 'password': password})
+        return data['access']
+
+    async def run(self):
+        student = await self.sign_up()
+        found = await self.call('search', 'GET', '/api/mentors/', token=student, params=SEARCH)
+        candidates = [profile['user'] for profile in found if profile['user']['username'] in self.mentors]
+        if not candidates:
+            self.results['search'].errors += 1
+            raise StepFailed('search: no seeded mentor found')
+        mentor = self.rng.choice(candidates)
+        mentor_token = self.mentors[mentor['username']]
+        slot_time = timezone.now() + timedelta(days=self.rng.randint(1, 60), hours=self.rng.randint(0, 23))
+        booking = await self.call('book', 'POST', '/api/bookings/', token=student, json={
+            'mentor': mentor['id'], 'slot_time': slot_time.isoformat(),
+        })
+        await self.call('accept', 'POST', f"/api/bookings/{booking['id']}/accept/", token=mentor_token)
+        await self.call('complete', 'POST', f"/api/bookings/{booking['id']}/complete/", token=student)
+        await self.call('review', 'POST', '/api/reviews/', token=student, json={
+            'mentor': mentor['id'], 'rating': self.rng.randint(3, 5), 'comment': 'Load test session.',
+        })
+        await self.call('earnings', 'GET', '/api/mentors/earnings/', token=mentor_token)
+
+
+async def _mentor_tokens(client, usernames, password) -> dict:
+    tokens = {}
+    for username in usernames:
+        response = await client.post('/api/token/', json={'username': username, 'password': password})
+        response.raise_for_status()
+        tokens[username] = response.json()['access']
+    return tokens
+
+
+async def _run(url, mentors, password, journeys, concurrency, rate, auth, seed, timeout, run_id):
+    rng = random.Random(seed)
+    results = defaultdict(LoadResult)
+    outcomes = Counter()
+    failures = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        tokens = await _mentor_tokens(client, mentors, password)
+
+        async def one(index, journey_rng, arrived):
+            journey = Journey(client, results, tokens, auth, f'{journey_prefix(run_id)}{index}', journey_rng)
+            async with semaphore:
+                try:
+                    await journey.run()
+                except StepFailed as exc:
+                    outcomes['failed'] += 1
+                    failures[str(exc)] += 1
+                    results['journey'].errors += 1
+                    return
+            outcomes['completed'] += 1
+            results['journey'].latencies.append(time.perf_counter() - arrived)
+
+        started = time.perf_counter()
+        tasks = []
+        for index in range(journeys):
+            if rate and index:
+                await asyncio.sleep(rng.expovariate(rate))
+            tasks.append(asyncio.create_task(one(index, random.Random(rng.random()), time.perf_counter())))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    for result in results.values():
+        result.elapsed = elapsed
+    return results, outcomes, failures, elapsed
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+def run_journeys(
+    url, mentors, password, journeys=100, concurrency=10, rate=0.0, auth='register', seed=None, timeout=60.0,
+    run_id=None,
+):
+    """Drive ``journeys`` journeys at the server at ``url``, with students named after ``run_id``.
+
+    Returns ``(results, outcomes, failures, elapsed)``: a ``LoadResult`` per step, completed
+    and failed journey counts, failure reasons and the wall time of the run.
+    """
+    return asyncio.run(_run(
+        url, mentors, password, journeys, concurrency, rate, auth, seed, timeout, run_id or new_run_id(),
+    ))
+
+
+def commit() -> str:
+    """The checked-out commit, ``+dirty`` with uncommitted changes, or ``unknown``."""
+    try:
+        head = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD'], cwd=settings.BASE_DIR).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return head + ('+dirty' if dirty else '')
+
+
+def report(run, options: dict) -> dict:
+    step_results, outcomes, failures, elapsed = run
+    return {
+        'commit': commit(),
+        'created_at': timezone.now().isoformat(),
+        'options': options,
+        'elapsed': elapsed,
+        'journeys': {
+            'completed': outcomes['completed'],
+            'failed': outcomes['failed'],
+            'per_second': outcomes['completed'] / elapsed if elapsed else 0.0,
+            'failures': dict(failures.most_common(10)),
+        },
+        'steps': {step: step_results[step].summary() for step in STEPS if step in step_results},
+    }
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """``(step, metric, before, after, change)`` for throughput and tail latency of the steps both runs have."""
+    rows = []
+    for step, after in current['steps'].items():
+        before = baseline['steps'].get(step)
+        if before is None:
+            continue
+        for metric in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'error_rate'):
+            change = (after[metric] - before[metric]) / before[metric] if before[metric] else None
+            rows.append((step, metric, before[metric], after[metric], change))
+    return rows
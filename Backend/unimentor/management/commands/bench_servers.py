@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from unimentor.benchmarking import ServerProcess, StubOAuthServer, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the WSGI (sync workers) and ASGI (uvicorn workers) deployments on the '
+        'Google OAuth endpoint while the upstream is slow. Requires a migrated database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--upstream-delay', type=float, default=0.25, help='Seconds the stub OAuth upstream waits')
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--path', default='/api/users/auth/google/')
+
+    def handle(self, *args, **options):
+        rows = []
+        with StubOAuthServer(delay=options['upstream_delay']) as upstream:
+            env = {**upstream.env, 'WEB_CONCURRENCY': str(options['workers'])}
+            for interface in ('wsgi', 'asgi'):
+                with ServerProcess(interface, env=env) as server:
+                    # Warm both workers before measuring.
+                    run_load(server.url + options['path'], 'POST', {'access_token': 'warmup'}, total=options['workers'] * 2)
+                    result = run_load(
+                        server.url + options['path'],
+                        'POST',
+                        {'access_token': 'bench'},
+                        total=options['requests'],
+                        concurrency=options['concurrency'],
+                    )
+                rows.append((interface, result.summary()))
+
+        self.stdout.write(
+            f"upstream delay {options['upstream_delay'] * 1000:.0f} ms, "
+            f"{options['requests']} requests, {options['concurrency']} clients, {options['workers']} workers"
+        )
+        self.stdout.write(f"{'server':<6} {'req/s':>8} {'in-flight':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for interface, summary in rows:
+            self.stdout.write(
+                f"{interface:<6} {summary['throughput']:>8.1f} {summary['concurrency']:>9.1f} "
+                f"{summary['p50_ms']:>8.1f} {summary['p99_ms']:>8.1f} {summary['errors']:>6}"
+            )
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from unimentor import exports
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a table (bookings, transactions, users or reviews) as CSV or NDJSON in constant memory, '
+        'to a file or stdout, optionally gzipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--since', help='ISO date or datetime, inclusive')
+        parser.add_argument('--until', help='ISO date or datetime, inclusive')
+        parser.add_argument('--status', action='append', default=[], help='may be repeated')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--output', '-o', help='file to write (default: stdout)')
+
+    def handle(self, *args, name, fmt, since, until, status, gzip, chunk_size, output, **options):
+        try:
+            queryset = exports.export_queryset(name, since=since, until=until, statuses=status)
+        except exports.InvalidFilter as exc:
+            raise CommandError(str(exc))
+        chunks = exports.stream(name, queryset, fmt, compress=gzip, chunk_size=chunk_size)
+        if output is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        written = 0
+        with open(output, 'wb') as file:
+            for chunk in chunks:
+                written += file.write(chunk)
+        self.stderr.write(f'Wrote {written} bytes to {output}')
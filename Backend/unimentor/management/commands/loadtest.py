@@ -0,0 +1,111 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from unimentor import loadtest
+from unimentor.benchmarking import ServerProcess, StubOAuthServer
+
+
+# Load tests sign up hundreds of users from one address.
+UNTHROTTLED = {
+    'THROTTLE_RATE_AUTH': '1000000/min',
+    'THROTTLE_RATE_OAUTH': '1000000/min',
+    'THROTTLE_RATE_REGISTER': '1000000/min',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run end-to-end user journeys (sign up, search, book, accept, complete, review, earnings) against a '
+        'server started for the run, or --url, and report throughput and p50/p95/p99 per step. Seeds load '
+        'test mentors into the configured database first, so --url must point at a server using it; this '
+        'needs DEBUG or --allow-seed. The mentors and the journeys\' users, bookings and reviews are deleted '
+        'afterwards unless --keep-data is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--journeys', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20, help='Journeys running at once')
+        parser.add_argument('--rate', type=float, default=0.0, help='Journeys starting per second (0: closed loop)')
+        parser.add_argument('--mentors', type=int, default=20)
+        parser.add_argument('--auth', choices=('register', 'oauth'), default='register')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--url', help='Base URL of a running server (default: start one)')
+        parser.add_argument('--interface', choices=('asgi', 'wsgi'), default='asgi')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--save', help='Write the results here as JSON')
+        parser.add_argument('--compare', help='Results saved from an earlier run to compare with')
+        parser.add_argument(
+            '--allow-seed', action='store_true',
+            help='Seed approved, publicly listed mentors even though DEBUG is off',
+        )
+        parser.add_argument('--keep-data', action='store_true', help='Keep the seeded mentors and journey data')
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options['allow_seed']):
+            raise CommandError(
+                'loadtest seeds approved mentor accounts into the configured database; '
+                'run it with DEBUG on or pass --allow-seed.'
+            )
+        if options['url'] and options['auth'] == 'oauth':
+            raise CommandError('--auth oauth needs the stub upstream; leave out --url.')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+        run_options = {
+            key: options[key] for key in ('journeys', 'concurrency', 'rate', 'mentors', 'auth', 'seed', 'interface', 'workers')
+        }
+        mentors, password = loadtest.seed_mentors(options['mentors'])
+        run_id = loadtest.new_run_id()
+        run = lambda url: loadtest.run_journeys(  # noqa: E731
+            url, mentors, password, options['journeys'], options['concurrency'], options['rate'], options['auth'],
+            options['seed'], run_id=run_id,
+        )
+        try:
+            if options['url']:
+                result = loadtest.report(run(options['url'].rstrip('/')), {**run_options, 'url': options['url']})
+            else:
+                with StubOAuthServer() as upstream:
+                    env = {**UNTHROTTLED, **upstream.env, 'WEB_CONCURRENCY': str(options['workers'])}
+                    with ServerProcess(options['interface'], env=env) as server:
+                        result = loadtest.report(run(server.url), run_options)
+        finally:
+            if not options['keep_data']:
+                deleted = loadtest.cleanup(run_id, mentors)
+                self.stdout.write(f'Deleted {deleted} load test rows')
+
+        self.write_report(result)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(result, file, indent=2)
+            self.stdout.write(f"Saved to {options['save']}")
+        if baseline is not None:
+            self.write_comparison(baseline, result)
+
+    def write_report(self, result):
+        journeys = result['journeys']
+        self.stdout.write(
+            f"commit {result['commit']}: {journeys['completed']} journeys completed, {journeys['failed']} failed "
+            f"in {result['elapsed']:.1f}s ({journeys['per_second']:.1f}/s)"
+        )
+        for reason, count in journeys['failures'].items():
+            self.stdout.write(f'  {count} x {reason}')
+        self.stdout.write(
+            f"{'step':<9} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for step, summary in result['steps'].items():
+            self.stdout.write(
+                f"{step:<9} {summary['requests']:>8} {summary['error_rate']:>7.1%} {summary['throughput']:>8.1f} "
+                f"{summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f}"
+            )
+
+    def write_comparison(self, baseline, result):
+        self.stdout.write(f"Against {baseline['commit']} ({baseline['created_at']}):")
+        changed = sorted(key for key in result['options'] if baseline['options'].get(key) != result['options'][key])
+        if changed:
+            self.stdout.write(self.style.WARNING(f"Options differ ({', '.join(changed)}); the numbers may not be comparable."))
+        for step, metric, before, after, change in loadtest.compare(baseline, result):
+            change = f'{change:+.1%}' if change is not None else 'n/a'
+            self.stdout.write(f'{step:<9} {metric:<10} {before:>10.2f} -> {after:>10.2f}  {change}')
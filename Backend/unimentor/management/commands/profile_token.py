@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from unimentor import profiling
+
+
+class Command(BaseCommand):
+    help = 'Print an X-Profile header value that profiles any request sending it, until it expires.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=profiling.MODES, default=profiling.CPROFILE)
+
+    def handle(self, *args, mode, **options):
+        self.stdout.write(profiling.make_token(mode))
+        self.stderr.write(f'Valid for {settings.PROFILING_TOKEN_MAX_AGE}s; send it as "X-Profile: <token>".')
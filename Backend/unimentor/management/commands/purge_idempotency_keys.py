@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from unimentor.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key responses in batches. Run it periodically, e.g. hourly from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        deleted = purge_expired(batch_size)
+        self.stdout.write(f'Deleted {deleted} expired idempotency keys')
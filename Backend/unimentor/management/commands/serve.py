@@ -0,0 +1,142 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from unimentor.warmup import allowed_host
+
+
+GUNICORN_CONF = Path(settings.BASE_DIR) / 'unimentor' / 'gunicorn_conf.py'
+
+
+def gunicorn_command() -> list:
+    # Prefer the console script: a master started with ``python -m gunicorn``
+    # cannot re-exec itself on USR2 (gunicorn's http package shadows the stdlib).
+    executable = shutil.which('gunicorn', path=os.path.dirname(sys.executable)) or shutil.which('gunicorn')
+    if executable:
+        return [executable, '-c', str(GUNICORN_CONF)]
+    return [sys.executable, '-m', 'gunicorn', '-c', str(GUNICORN_CONF)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the production server (gunicorn with unimentor/gunicorn_conf.py) and report the '
+        'cold-start-to-first-200 time. With --reload, gracefully replace a running server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', default=os.environ.get('PORT', '8000'))
+        parser.add_argument('--interface', choices=['asgi', 'wsgi'], default=os.environ.get('SERVER_INTERFACE', 'asgi'))
+        parser.add_argument('--workers', type=int, help='Defaults to a CPU-based size, see gunicorn_conf')
+        parser.add_argument('--threads', type=int, help='Threads per worker for the wsgi interface')
+        parser.add_argument('--pidfile', default=os.environ.get('GUNICORN_PIDFILE', '/tmp/unicraft-gunicorn.pid'))
+        parser.add_argument('--ready-path', default='/api/health/', help='Path polled for the first 200')
+        parser.add_argument(
+            '--measure-startup', action='store_true',
+            help='Start the server, report cold-start-to-first-200 and stop it again',
+        )
+        parser.add_argument(
+            '--reload', action='store_true',
+            help='Gracefully reload the server recorded in --pidfile: start a new master with the new '
+                 'code (USR2), then let the old one drain and exit (TERM)',
+        )
+        parser.add_argument('--settle', type=float, default=5.0, help='Seconds to wait before retiring the old master')
+
+    def handle(self, *args, **options):
+        if options['reload']:
+            return self.reload(options)
+
+        env = {
+            **os.environ,
+            'PORT': str(options['port']),
+            'SERVER_INTERFACE': options['interface'],
+            'GUNICORN_PIDFILE': options['pidfile'],
+        }
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+        if options['threads']:
+            env['GUNICORN_THREADS'] = str(options['threads'])
+
+        process = subprocess.Popen(gunicorn_command(), cwd=settings.BASE_DIR, env=env)
+        # Forward lifecycle signals so HUP/TERM/USR2 reach the gunicorn master.
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR2, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, lambda signum, frame: process.send_signal(signum))
+
+        url = f"http://127.0.0.1:{options['port']}{options['ready_path']}"
+        elapsed = self.wait_for_first_200(process, url)
+        if elapsed is None:
+            # A slow or failing probe must not take a serving gunicorn down with it.
+            self.stderr.write(self.style.WARNING(f'No 200 from {url} yet; leaving the server running'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Cold start to first 200 on {options["ready_path"]}: {elapsed:.2f}s'))
+
+        if options['measure_startup']:
+            process.terminate()
+            process.wait()
+            if elapsed is None:
+                raise CommandError(f'No 200 from {url}')
+            return
+        sys.exit(self.wait_for_master(process, Path(options['pidfile'])))
+
+    def wait_for_first_200(self, process, url, timeout=120.0):
+        """Seconds until ``url`` answers 200, or None if it has not after ``timeout``."""
+        headers = {'Host': allowed_host()}  # passes host validation
+        started = time.perf_counter()
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise CommandError(f'gunicorn exited with code {process.returncode}')
+            try:
+                if httpx.get(url, headers=headers, timeout=1.0).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        return None
+
+    def wait_for_master(self, process, pidfile) -> int:
+        """Block while a gunicorn master is running, following --reload hand-overs."""
+        returncode = process.wait()
+        while True:
+            pid = self.running_master(pidfile)
+            if pid is None:
+                return returncode
+            # A reloaded master is not our child, so poll it instead of waiting.
+            signal.signal(signal.SIGTERM, lambda signum, frame: os.kill(pid, signum))
+            time.sleep(1)
+
+    def running_master(self, pidfile):
+        # A freshly re-exec'ed master writes "<pidfile>.2" until it is promoted.
+        for path in (pidfile, Path(f'{pidfile}.2')):
+            try:
+                pid = int(path.read_text().strip())
+                os.kill(pid, 0)
+            except (OSError, ValueError):
+                continue
+            return pid
+        return None
+
+    def reload(self, options):
+        pidfile = Path(options['pidfile'])
+        try:
+            old_pid = int(pidfile.read_text().strip())
+        except (OSError, ValueError):
+            raise CommandError(f'No running server found in {pidfile}')
+
+        # With preload_app a plain HUP would re-fork the old code, so re-exec the master instead.
+        os.kill(old_pid, signal.SIGUSR2)
+        new_pidfile = Path(f'{pidfile}.2')
+        deadline = time.monotonic() + 60
+        while not new_pidfile.exists():
+            if time.monotonic() > deadline:
+                raise CommandError('New master did not start; the old one keeps serving')
+            time.sleep(0.1)
+        time.sleep(options['settle'])
+        os.kill(old_pid, signal.SIGTERM)
+        self.stdout.write(self.style.SUCCESS(f'Reloaded: master {old_pid} is draining, new master {new_pidfile.read_text().strip()}'))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from unimentor import slow_queries
+
+
+class Command(BaseCommand):
+    help = 'Summarize the slow query log: the statements that cost the most time in total, with their plans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--hours', type=float, help='Only queries logged in the last HOURS hours.')
+        parser.add_argument('--view', help='Only queries run by views whose name contains VIEW.')
+        parser.add_argument('--plans', action='store_true', help="Print each statement's slowest plan.")
+
+    def handle(self, *args, limit, hours, view, plans, **options):
+        since = timezone.now() - timedelta(hours=hours) if hours else None
+        offenders = slow_queries.top_offenders(slow_queries.read(since), limit, view)
+        if not offenders:
+            self.stdout.write(f'No slow queries logged in {settings.SLOW_QUERY_DIR}')
+            return
+        for rank, offender in enumerate(offenders, start=1):
+            views = ', '.join(f'{name} ({count})' for name, count in offender['views'])
+            self.stdout.write(
+                f"{rank}. {offender['fingerprint']}  {offender['total_ms']:.1f} ms total, {offender['count']} calls, "
+                f"mean {offender['mean_ms']:.1f} ms, max {offender['max_ms']:.1f} ms"
+            )
+            self.stdout.write(f'   views: {views}')
+            self.stdout.write(f"   {slow_queries.normalize(offender['sql'])[:300]}")
+            if plans and offender['plan']:
+                self.stdout.write(f"   params: {offender['params']}")
+                for line in offender['plan'].splitlines():
+                    self.stdout.write(f'     {line}')
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from unimentor.startup import measure_startup
+
+
+class Command(BaseCommand):
+    help = 'Report settings/app-ready/URLconf time, peak memory and per-package import cost of a fresh process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Number of packages to list')
+        parser.add_argument('--runs', type=int, default=5, help='Boot this many times and report the fastest')
+        parser.add_argument('--json', action='store_true', help='Print the raw measurement as JSON')
+
+    def handle(self, *args, **options):
+        result = min((measure_startup() for _ in range(options['runs'])), key=lambda run: run['total'])
+        if options['json']:
+            self.stdout.write(json.dumps({k: v for k, v in result.items() if k != 'modules'}, indent=2))
+            return
+
+        self.stdout.write(f"settings    {result['settings'] * 1000:8.1f} ms")
+        self.stdout.write(f"apps ready  {result['apps_ready'] * 1000:8.1f} ms")
+        self.stdout.write(f"urlconf     {result['urlconf'] * 1000:8.1f} ms")
+        self.stdout.write(f"total       {result['total'] * 1000:8.1f} ms")
+        self.stdout.write(f"peak RSS    {result['maxrss_kb'] / 1024:8.1f} MB")
+        self.stdout.write(f"modules     {len(result['modules']):8d}")
+        self.stdout.write('')
+        self.stdout.write('Import time by top-level package (self time, all submodules):')
+        ranked = sorted(result['imports'].items(), key=lambda item: item[1], reverse=True)
+        for package, seconds in ranked[:options['top']]:
+            self.stdout.write(f'  {seconds * 1000:8.1f} ms  {package}')
@@ -0,0 +1,152 @@
+"""Prometheus metrics, served as text from ``/metrics``.
+
+* ``http_request_duration_seconds{view,method}``: latency histogram per URL
+  name (DRF actions included, e.g. ``booking-accept``), or per route pattern
+  for unnamed URLs;
+* ``http_responses_total{view,method,status}`` and
+  ``http_requests_in_flight``;
+* ``db_query_duration_seconds{alias}``: count and time of SQL queries;
+* ``cache_lookups_total{namespace,result}``: two-tier cache hits and misses;
+* ``outbound_request_duration_seconds{service,outcome}``: calls to Google
+  OAuth (see ``timed_transport``).
+
+Under gunicorn, ``PROMETHEUS_MULTIPROC_DIR`` is set before the app loads
+(``unimentor/gunicorn_conf.py``), so every worker writes its samples to
+files there and a scrape of any worker reports the sum over all of them.
+Without it, as under ``runserver`` and in tests, metrics are per process.
+If ``METRICS_TOKEN`` is set, scrapes must send it as a bearer token.
+"""
+import functools
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by view.', ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSES = Counter('http_responses', 'Responses by view and status code.', ['view', 'method', 'status'])
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being served.', multiprocess_mode='livesum')
+QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'SQL query time.', ['alias'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0),
+)
+CACHE_LOOKUPS = Counter('cache_lookups', 'Two-tier cache lookups by result.', ['namespace', 'result'])
+OUTBOUND_LATENCY = Histogram(
+    'outbound_request_duration_seconds', 'Outbound HTTP calls until response headers.', ['service', 'outcome'],
+)
+
+
+def _view_label(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route or match.view_name
+
+
+def _observe(request, response, started):
+    view, method = _view_label(request), request.method
+    REQUEST_LATENCY.labels(view, method).observe(time.perf_counter() - started)
+    RESPONSES.labels(view, method, str(response.status_code)).inc()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        _observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        _observe(request, response, started)
+        return response
+
+
+def time_query(execute, sql, params, many, context):
+    """``execute_wrapper`` recording every query's duration."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        QUERY_LATENCY.labels(context['connection'].alias).observe(time.perf_counter() - started)
+
+
+def _install(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+connection_created.connect(_install, dispatch_uid='unimentor.metrics.time_query')
+
+
+@functools.cache
+def _timed_transport_class():
+    import httpx
+
+    class TimedTransport(httpx.AsyncHTTPTransport):
+        def __init__(self, service, **kwargs):
+            super().__init__(**kwargs)
+            self.service = service
+
+        async def handle_async_request(self, request):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                response = await super().handle_async_request(request)
+                outcome = f'{response.status_code // 100}xx'
+                return response
+            finally:
+                OUTBOUND_LATENCY.labels(self.service, outcome).observe(time.perf_counter() - started)
+
+    return TimedTransport
+
+
+def timed_transport(service: str, **kwargs):
+    """An httpx async transport recording each call's latency under ``service``; kwargs go to httpx."""
+    return _timed_transport_class()(service, **kwargs)
+
+
+def registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+@require_GET
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,35 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class InvalidationEvent(models.Model):
+    """Cache invalidation broadcast, polled by workers on databases without LISTEN/NOTIFY.
+
+    The auto-incrementing id doubles as the bus version: each worker remembers
+    the last id it applied.
+    """
+    tags = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self) -> str:
+        return f"InvalidationEvent {self.id}: {', '.join(self.tags)}"
+
+
+class IdempotencyKey(models.Model):
+    """First response to a request sent with an ``Idempotency-Key`` header.
+
+    ``key`` hashes the client's key with the user, method and path, so it is
+    fixed-width and doubles as the primary key. A row without a
+    ``status_code`` is a request still in flight.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=32)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"IdempotencyKey {self.key} ({self.status_code or 'in flight'})"
@@ -0,0 +1,327 @@
+"""Profiles of single requests, captured on demand and kept on disk.
+
+``ProfilingMiddleware`` profiles a request when it carries an ``X-Profile``
+header that is either
+
+* a signed token (``manage.py profile_token``), valid for
+  ``PROFILING_TOKEN_MAX_AGE`` seconds, or
+* ``cprofile`` or ``sample`` sent with a staff user's JWT,
+
+or when it is picked at random (``PROFILING_SAMPLE_RATE``, statistical
+sampler only). Any other request goes straight through without a profiler,
+wrapper or timer: the query timer is only added to a connection's execute
+wrappers while a capture is attached to that connection's thread.
+
+``cprofile`` records every call with ``cProfile``; ``sample`` reads the
+request thread's stack every ``PROFILING_SAMPLE_INTERVAL`` seconds and keeps
+folded stacks (the input format of flame graph tools), at a fraction of the
+overhead. Both also time each SQL query. A capture is written to
+``PROFILING_DIR`` as ``<id>.json`` plus ``<id>.prof`` or ``<id>.folded``, the
+oldest beyond ``PROFILING_MAX_FILES`` are deleted, and the response carries
+``X-Profile-Id``. Staff list and fetch captures under ``api/internal/profiles/``.
+
+Under ASGI a sync view runs in an executor thread, not the event loop's. The
+capture attaches to the request's sync thread (the one every thread-sensitive
+``sync_to_async`` call of the request, and so the view, runs in): its
+connections time their queries and the sampler follows it. cProfile only sees
+the thread that enabled it, so ``cprofile`` requests are sampled under ASGI. The loop thread's stacks also contain whatever else
+the event loop ran meanwhile.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+
+HEADER = 'HTTP_X_PROFILE'
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+MODES = (CPROFILE, SAMPLE)
+SALT = 'unimentor.profiling'
+ID_PATTERN = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+MAX_QUERIES = 1000
+
+_current = ContextVar('profiling_capture', default=None)
+
+
+def make_token(mode=CPROFILE) -> str:
+    """A value for the ``X-Profile`` header that turns profiling on for anyone sending it."""
+    return signing.TimestampSigner(salt=SALT).sign(mode)
+
+
+def _signed_mode(value: str):
+    try:
+        mode = signing.TimestampSigner(salt=SALT).unsign(value, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return mode if mode in MODES else None
+
+
+def _is_staff(request) -> bool:
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            user = (JWTAuthentication().authenticate(request) or (None, None))[0]
+        except AuthenticationFailed:
+            return False
+    return bool(user and user.is_staff)
+
+
+def requested_mode(request):
+    """The profiling mode this request asks for and may use, or None."""
+    value = request.META.get(HEADER)
+    if value:
+        if value in MODES:
+            return value if _is_staff(request) else None
+        return _signed_mode(value)
+    rate = settings.PROFILING_SAMPLE_RATE
+    if rate and random.random() < rate:
+        return SAMPLE
+    return None
+
+
+class Sampler:
+    """Statistical profiler: periodically records the call stacks of the threads it follows."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def follow(self, thread_id):
+        self.thread_ids.add(thread_id)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Capture:
+    """One request's profile and SQL timings, from ``start()`` to ``save()``."""
+
+    def __init__(self, request, mode, is_async=False):
+        self.id = f'{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+        self.request = request
+        # cProfile would miss the executor thread the view runs in.
+        self.mode = SAMPLE if is_async else mode
+        self.queries = []
+        self._wrapped = []
+
+    def start(self):
+        self._token = _current.set(self)
+        if self.mode == CPROFILE:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile per process; sample this one instead.
+                self.mode = SAMPLE
+        if self.mode == SAMPLE:
+            self.profiler = Sampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+            self.profiler.start()
+        self.started = time.perf_counter()
+
+    def attach(self):
+        """Time the queries of this thread's connections and sample its stack."""
+        if self.mode == SAMPLE:
+            self.profiler.follow(threading.get_ident())
+        for connection in connections.all():
+            if self.record_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(self.record_query)
+                self._wrapped.append(connection)
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self.mode == CPROFILE:
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+        for connection in self._wrapped:
+            connection.execute_wrappers.remove(self.record_query)
+        self._wrapped = []
+        _current.reset(self._token)
+
+    def record_query(self, execute, sql, params, many, context):
+        """``execute_wrapper`` timing each query of the attached threads."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'many': many,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+
+    def save(self, response):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        base = os.path.join(settings.PROFILING_DIR, self.id)
+        if self.mode == CPROFILE:
+            self.profiler.dump_stats(f'{base}.prof')
+        else:
+            with open(f'{base}.folded', 'w') as file:
+                file.write(self.profiler.folded())
+        meta = {
+            'id': self.id,
+            'mode': self.mode,
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'status': response.status_code,
+            'ms': round(self.elapsed * 1000, 3),
+            'pid': os.getpid(),
+            'created_at': timezone.now().isoformat(),
+            'query_count': len(self.queries),
+            'query_ms': round(sum(query['ms'] for query in self.queries), 3),
+            'queries': self.queries,
+        }
+        with open(f'{base}.json', 'w') as file:
+            json.dump(meta, file)
+        prune()
+
+
+def prune(keep=None):
+    """Delete all but the newest ``keep`` captures (default ``PROFILING_MAX_FILES``)."""
+    keep = settings.PROFILING_MAX_FILES if keep is None else keep
+    for profile_id in list_ids()[keep:]:
+        for extension in ('.json', '.prof', '.folded'):
+            try:
+                os.remove(os.path.join(settings.PROFILING_DIR, profile_id + extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_ids() -> list:
+    """Stored capture ids, newest first."""
+    try:
+        names = os.listdir(settings.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((name[:-5] for name in names if name.endswith('.json')), reverse=True)
+
+
+def load(profile_id, queries=True):
+    """A capture's metadata, or None; ``queries=False`` leaves out the SQL."""
+    if not ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(settings.PROFILING_DIR, f'{profile_id}.json')) as file:
+            meta = json.load(file)
+    except FileNotFoundError:
+        return None
+    if not queries:
+        meta.pop('queries', None)
+    return meta
+
+
+def data_path(profile_id):
+    """Path of a capture's ``.prof`` or ``.folded`` file, or None."""
+    if ID_PATTERN.match(profile_id):
+        for extension in ('.prof', '.folded'):
+            path = os.path.join(settings.PROFILING_DIR, profile_id + extension)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def summary(profile_id, limit=40) -> str:
+    """The top of a capture as text: functions by cumulative time, or the hottest stacks."""
+    path = data_path(profile_id)
+    if path is None:
+        return ''
+    if path.endswith('.prof'):
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+    with open(path) as file:
+        return ''.join(line for _, line in zip(range(limit), file))
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        capture = Capture(request, mode)
+        capture.start()
+        capture.attach()
+        try:
+            response = self.get_response(request)
+        finally:
+            capture.stop()
+        capture.save(response)
+        response['X-Profile-Id'] = capture.id
+        return response
+
+    async def __acall__(self, request):
+        # Checking a staff JWT reads the user from the database.
+        mode = await sync_to_async(requested_mode)(request) if request.META.get(HEADER) else requested_mode(request)
+        if mode is None:
+            return await self.get_response(request)
+        capture = Capture(request, mode, is_async=True)
+        capture.start()
+        try:
+            # Attached before any middleware touches the database there.
+            await sync_to_async(capture.attach)()
+            response = await self.get_response(request)
+        finally:
+            capture.stop()
+        await sync_to_async(capture.save)(response)
+        response['X-Profile-Id'] = capture.id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Under ASGI this runs in the thread the sync view will run in.
+        capture = _current.get()
+        if capture is not None and not iscoroutinefunction(view_func):
+            capture.attach()
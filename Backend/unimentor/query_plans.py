@@ -0,0 +1,76 @@
+"""Helpers for capturing and inspecting database query plans.
+
+Used by the query-plan regression tests to make sure the hot API queries
+keep hitting an index on every supported backend, and by the slow query log
+(``unimentor.slow_queries``).
+"""
+import re
+
+from django.db import connections
+
+
+# SQLite: "SCAN bookings_booking" is a full table scan, while
+# "SCAN bookings_booking USING INDEX ..." walks an index in order.
+_SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?P<table>\w+)(?! USING (?:COVERING )?INDEX)\s*$')
+# Subqueries SQLite evaluates itself ("CO-ROUTINE qualify") are scanned too,
+# but those scans read the subquery's output, not a table.
+_SQLITE_SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (?P<table>\w+)')
+# Postgres: "Seq Scan on bookings_booking".
+_POSTGRES_FULL_SCAN = re.compile(r'\bSeq Scan on (?P<table>\w+)')
+
+
+def explain(queryset) -> str:
+    """Return the backend's EXPLAIN output for a queryset, one plan node per line.
+
+    Runs EXPLAIN on the compiled SQL rather than calling QuerySet.explain(),
+    which breaks on queries Django wraps in a subquery (filters on window
+    functions).
+    """
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    return explain_sql(connections[queryset.db], sql, params)
+
+
+def explain_sql(connection, sql, params, analyze=False) -> str:
+    """EXPLAIN (ANALYZE on PostgreSQL, which runs the query) of raw SQL on ``connection``."""
+    options = {'analyze': True} if analyze and connection.vendor == 'postgresql' else {}
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix(**options)} {sql}', params)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def full_table_scans(plan: str, vendor: str) -> list:
+    """Return the tables a plan reads with a full table scan."""
+    pattern = _POSTGRES_FULL_SCAN if vendor == 'postgresql' else _SQLITE_FULL_SCAN
+    lines = [line.strip() for line in plan.splitlines()]
+    subqueries = {match.group('table') for match in map(_SQLITE_SUBQUERY.search, lines) if match}
+    tables = []
+    for line in lines:
+        match = pattern.search(line)
+        if match and match.group('table') not in subqueries:
+            tables.append(match.group('table'))
+    return tables
+
+
+class QueryPlanTestMixin:
+    """TestCase mixin asserting that a queryset is served from an index.
+
+    Postgres happily picks a sequential scan for the tiny tables a test
+    creates, so sequential scans are disabled for the duration of the
+    EXPLAIN; a plan that still contains one has no usable index.
+    """
+
+    def assertNoFullTableScan(self, queryset, using='default'):
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = explain(queryset)
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET enable_seqscan = on')
+        else:
+            plan = explain(queryset)
+        scans = full_table_scans(plan, connection.vendor)
+        self.assertFalse(scans, f'Full table scan on {", ".join(scans)}:\n{plan}')
+        return plan
@@ -0,0 +1,199 @@
+"""Token-bucket rate limiting shared by every worker through the cache.
+
+Each bucket is stored as a single integer, its theoretical arrival time
+(TAT) in milliseconds, which is the GCRA formulation of a token bucket: a
+request advances the TAT by one emission interval and is allowed while the
+TAT stays within the bucket's capacity of now. On Redis (REDIS_URL) a Lua
+script does all of that in one atomic round trip per identity. On other
+caches the key is only changed with ``incr`` and ``add``, so concurrent
+workers cannot overspend a bucket as long as the cache makes those atomic
+across processes, as memcached does. The file-based fallback cache
+implements ``incr`` as a read and a write, so there the limits are only
+approximate; ``check --deploy`` warns about it.
+
+Rates come from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` (``'10/min'``
+allows a burst of 10 and refills 10 per minute). DRF views use
+``TokenBucketThrottle``; plain Django views use the ``ratelimit`` decorator.
+"""
+import functools
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+CACHE_ALIAS = 'default'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Backends whose incr and add are atomic across worker processes.
+ATOMIC_BACKENDS = {
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django_redis.cache.RedisCache',
+}
+# GCRA in one step: KEYS[1] holds the TAT; ARGV is now, the emission interval
+# and the capacity, in milliseconds. Returns 0 if allowed, else the wait in
+# ms. The key expires when the bucket would be full again anyway.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+local new = tat + tonumber(ARGV[2])
+local excess = new - now - tonumber(ARGV[3])
+if excess > 0 then
+    return excess
+end
+redis.call('SET', KEYS[1], new, 'PX', new - now)
+return 0
+"""
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_atomic_cache(app_configs, **kwargs):
+    backend = settings.CACHES[CACHE_ALIAS]['BACKEND']
+    if backend in ATOMIC_BACKENDS:
+        return []
+    return [checks.Warning(
+        f'Rate limits need atomic updates shared by all workers, which {backend} does not '
+        'provide: concurrent requests can overspend a bucket.',
+        hint='Set REDIS_URL so the cache uses Redis.',
+        id='unimentor.W001',
+    )]
+
+
+class TokenBucket:
+    def __init__(self, rate: str):
+        limit, period = rate.split('/')
+        self.interval = max(1, round(PERIODS[period[0]] * 1000 / int(limit)))
+        self.capacity = self.interval * int(limit)
+        self.timeout = math.ceil(2 * self.capacity / 1000)
+        self.cache = caches[CACHE_ALIAS]
+        self._script = None
+
+    def consume(self, key: str) -> float:
+        """Take a token; return 0 if allowed, else the seconds until one is available."""
+        now = int(time.time() * 1000)
+        if isinstance(self.cache, RedisCache):
+            return self._consume_redis(key, now)
+        try:
+            tat = self.cache.incr(key, self.interval)
+        except ValueError:  # new or expired bucket
+            if self.cache.add(key, now + self.interval, self.timeout):
+                return 0.0
+            tat = self.cache.incr(key, self.interval)
+        if tat - self.interval < now:
+            # The bucket had refilled completely: restart from now. Racing
+            # restarts can only push the TAT further, never grant extra tokens.
+            tat = self.cache.incr(key, now + self.interval - tat)
+        excess = tat - now - self.capacity
+        if excess > 0:
+            self.cache.decr(key, self.interval)
+            self.cache.touch(key, self.timeout)
+            return excess / 1000
+        if tat - now > self.capacity // 2:
+            # Busy bucket: keep it from expiring (and refilling) early.
+            self.cache.touch(key, self.timeout)
+        return 0.0
+
+    def _consume_redis(self, key, now):
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        if self._script is None:
+            self._script = client.register_script(GCRA_SCRIPT)
+        excess = self._script(keys=[key], args=[now, self.interval, self.capacity], client=client)
+        return int(excess) / 1000
+
+
+_buckets = {}
+
+
+def bucket_for(scope: str) -> TokenBucket:
+    rate = api_settings.DEFAULT_THROTTLE_RATES[scope]
+    bucket = _buckets.get((scope, rate))
+    if bucket is None:
+        bucket = _buckets[(scope, rate)] = TokenBucket(rate)
+    return bucket
+
+
+def _idents(request):
+    yield f'ip:{BaseThrottle().get_ident(request)}'
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        yield f'user:{user.pk}'
+
+
+def check(scope: str, request) -> float:
+    """Consume a token for the client IP and user; return the wait in seconds, 0 if allowed."""
+    bucket = bucket_for(scope)
+    rate = api_settings.DEFAULT_THROTTLE_RATES[scope]
+    for ident in _idents(request):
+        # Keyed by rate too: a TAT left by another rate means nothing under this one.
+        wait = bucket.consume(f'ratelimit:{scope}:{rate}:{ident}')
+        if wait:
+            return wait
+    return 0.0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle for ``scope``, or the view's ``throttle_scope`` if unset."""
+    scope = None
+
+    def __init__(self):
+        self.retry_after = 0.0
+
+    def allow_request(self, request, view):
+        scope = self.scope or getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.retry_after = check(scope, request)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class AuthThrottle(TokenBucketThrottle):
+    scope = 'auth'
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = 'register'
+
+
+def _throttled(wait: float) -> JsonResponse:
+    seconds = math.ceil(wait)
+    return JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {seconds} seconds.'},
+        status=429,
+        headers={'Retry-After': str(seconds)},
+    )
+
+
+def ratelimit(scope: str):
+    """Rate limit a plain Django view (sync or async) like ``TokenBucketThrottle``."""
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                # Cache round trips (and the lazy request.user) must stay off the event loop.
+                wait = await sync_to_async(check)(scope, request)
+                if wait:
+                    return _throttled(wait)
+                return await view(request, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                wait = check(scope, request)
+                if wait:
+                    return _throttled(wait)
+                return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
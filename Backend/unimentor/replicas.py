@@ -0,0 +1,129 @@
+"""Read-replica routing with read-your-writes stickiness.
+
+``ReplicaRoutingMiddleware`` (in the ``/api/`` pipeline) decides per request
+where reads go; ``ReplicaRouter`` applies that decision to every query:
+
+* safe-method requests read from a random replica in ``DATABASE_REPLICAS``;
+* writes always go to the primary, and once a request has written, its
+  remaining reads do too;
+* after a successful write a client (identified by its Authorization header,
+  or its IP) reads from the primary for ``REPLICA_STICKY_SECONDS``, so it
+  sees its own changes despite replication lag;
+* views can opt out either way with ``database_routing = 'primary'`` (or
+  ``'replica'``) on the view class or the ``@database_routing()`` decorator.
+
+Outside a request (management commands, background threads) everything
+uses the primary.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+# Internal states that no view override can lift.
+_STICKY = 'sticky'
+_WROTE = 'wrote'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = 'db:sticky:{}'
+
+_routing = ContextVar('database_routing', default=PRIMARY)
+
+
+def database_routing(mode):
+    """Force reads of a view (function or class) to ``'primary'`` or ``'replica'``.
+
+    ``'replica'`` only applies to safe methods; writes always read the primary.
+    """
+    if mode not in (PRIMARY, REPLICA):
+        raise ValueError(f'Unknown database routing {mode!r}')
+
+    def decorator(view):
+        view.database_routing = mode
+        return view
+
+    return decorator
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _routing.get() == REPLICA and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if _routing.get() != PRIMARY:
+            _routing.set(_WROTE)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary.
+        return db not in settings.DATABASE_REPLICAS
+
+
+def _client_key(request) -> str:
+    identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+    return STICKY_KEY.format(hashlib.sha1(identity.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _initial(self, request) -> str:
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return PRIMARY
+        if cache.get(_client_key(request)):
+            return _STICKY
+        return REPLICA
+
+    def _finish(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            cache.set(_client_key(request), True, settings.REPLICA_STICKY_SECONDS)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _routing.set(self._initial(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self._finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(self._initial(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self._finish(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = getattr(view_func, 'database_routing', None)
+        if mode is None:
+            # DRF's as_view() keeps the view class on the function.
+            mode = getattr(getattr(view_func, 'cls', None), 'database_routing', None)
+        if mode == REPLICA and request.method not in SAFE_METHODS:
+            return None  # a write's reads must see the primary
+        if mode is not None and _routing.get() in (PRIMARY, REPLICA) and settings.DATABASE_REPLICAS:
+            _routing.set(mode)
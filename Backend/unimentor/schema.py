@@ -0,0 +1,41 @@
+"""The OpenAPI schema, generated once per process and served pre-compressed.
+
+The schema only changes with a deploy, yet generating and rendering it walks
+every view and serializer. ``CachedSchemaView`` keeps the rendered document
+per format, version and language, with its compressed forms (see
+``unimentor.compression``), so repeat requests cost neither.
+"""
+from django.conf import settings
+from django.utils import translation
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.settings import api_settings
+
+from .compression import Precompressed, PrecompressedResponse
+
+
+class CachedSchemaView(SpectacularAPIView):
+    payloads = {}
+
+    def _cacheable(self, request, version) -> bool:
+        # Only keys from known values, so query strings cannot grow the cache.
+        lang = request.GET.get('lang')
+        return (
+            (not lang or lang in dict(settings.LANGUAGES))
+            and (version is None or version in (api_settings.ALLOWED_VERSIONS or ()))
+        )
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        if not self._cacheable(request, version):
+            return super()._get_schema_response(request)
+        key = (request.accepted_media_type, version, translation.get_language())
+        if key not in self.payloads:
+            response = super()._get_schema_response(request)
+            renderer = request.accepted_renderer
+            content_type = request.accepted_media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            content = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+            self.payloads[key] = (Precompressed.of(content, content_type), response['Content-Disposition'])
+        payload, disposition = self.payloads[key]
+        return PrecompressedResponse(payload, headers={'Content-Disposition': disposition})
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from datetime import timedelta
 import dj_database_url
 
@@ -26,6 +27,24 @@ GOOGLE_OAUTH2_CLIENT_SECRET = os.environ.get('GOOGLE_OAUTH2_CLIENT_SECRET')
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
 PUBLIC_BACKEND_URL = os.environ.get('PUBLIC_BACKEND_URL')
 
+# Outbound OAuth endpoints; overridable so benchmarks and load tests can
+# point them at a local stub.
+GOOGLE_OAUTH2_TOKEN_URL = os.environ.get('GOOGLE_OAUTH2_TOKEN_URL', 'https://oauth2.googleapis.com/token')
+GOOGLE_OAUTH2_USERINFO_URL = os.environ.get('GOOGLE_OAUTH2_USERINFO_URL', 'https://www.googleapis.com/oauth2/v2/userinfo')
+GOOGLE_OAUTH2_CERTS_URL = os.environ.get('GOOGLE_OAUTH2_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+OAUTH_HTTP_TIMEOUT = float(os.environ.get('OAUTH_HTTP_TIMEOUT', '10'))
+
+# Payment webhook signing secrets per provider (payments.providers); a provider
+# without a secret rejects every delivery. The stub provider is for local runs
+# and load tests, and stays off unless STUB_WEBHOOK_SECRET is set explicitly.
+PAYMENT_WEBHOOK_SECRETS = {
+    'stub': os.environ.get('STUB_WEBHOOK_SECRET', ''),
+}
+# Events applied per transaction by process_webhooks.
+WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', '500'))
+# Settlement file lines matched and committed per chunk by reconcile_payments.
+RECONCILIATION_CHUNK_SIZE = int(os.environ.get('RECONCILIATION_CHUNK_SIZE', '5000'))
+
 
 # Application definition
 
@@ -44,19 +63,13 @@ INSTALLED_APPS = [
     'drf_spectacular',
     'rest_framework_simplejwt',
 
-    # Allauth for social login compatibility
-    'django.contrib.sites',
-    'allauth',
-    'allauth.account',
-    'allauth.socialaccount',
-    'allauth.socialaccount.providers.google',
-
     # Local apps
     'bookings',
     'mentors',
     'payments',
     'reviews',
     'users',
+    'unimentor',
 
     
 ]
@@ -64,18 +77,60 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'unimentor.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'unimentor.profiling.ProfilingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'unimentor.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'allauth.account.middleware.AccountMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'unimentor.db.StatementTimeoutMiddleware',
+    'unimentor.slow_queries.SlowQueryMiddleware',
 ]
 
+# Leaner middleware stacks per URL prefix, used by unimentor.handlers. The API
+# authenticates with JWTs, so it skips sessions, CSRF, messages and framing.
+MIDDLEWARE_PIPELINES = {
+    '/api/': [
+        'unimentor.metrics.MetricsMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'unimentor.profiling.ProfilingMiddleware',
+        'unimentor.compression.CompressionMiddleware',
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'unimentor.replicas.ReplicaRoutingMiddleware',
+        'unimentor.db.StatementTimeoutMiddleware',
+        'unimentor.slow_queries.SlowQueryMiddleware',
+    ],
+}
+
+# Allauth for social login compatibility. The API authenticates Google users
+# itself (users.oauth_views), so allauth and its Google provider are only
+# loaded when explicitly enabled, e.g. to manage legacy social accounts.
+# A database that ran with them keeps their tables (account_*, socialaccount_*,
+# django_site) after they are switched off. To drop those, run once with
+# ALLAUTH_ENABLED=True, before deploying with it off:
+#   python manage.py migrate socialaccount zero
+#   python manage.py migrate account zero
+#   python manage.py migrate sites zero
+ALLAUTH_ENABLED = os.environ.get('ALLAUTH_ENABLED', 'False') == 'True'
+if ALLAUTH_ENABLED:
+    INSTALLED_APPS += [
+        'django.contrib.sites',
+        'allauth',
+        'allauth.account',
+        'allauth.socialaccount',
+        'allauth.socialaccount.providers.google',
+    ]
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.messages.middleware.MessageMiddleware'),
+                      'allauth.account.middleware.AccountMiddleware')
+    SITE_ID = 1
+
 ROOT_URLCONF = 'unimentor.urls'
 
 TEMPLATES = [
@@ -95,18 +150,127 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'unimentor.wsgi.application'
+ASGI_APPLICATION = 'unimentor.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# The application gunicorn serves (unimentor/gunicorn_conf.py, manage.py serve).
+SERVER_INTERFACE = os.environ.get('SERVER_INTERFACE', 'asgi')
+
+# PostgreSQL connections come from a per-process psycopg pool when
+# DATABASE_POOL_MAX_SIZE is set; checkouts are health-checked and wait at most
+# DATABASE_POOL_TIMEOUT seconds for a free connection. Under ASGI every request
+# runs its sync code in a new executor thread, so a persistent connection would
+# never be reused: there the pool is on by default and CONN_MAX_AGE is 0.
+DATABASE_POOL_MIN_SIZE = int(os.environ.get('DATABASE_POOL_MIN_SIZE', '2'))
+DATABASE_POOL_MAX_SIZE = int(os.environ.get('DATABASE_POOL_MAX_SIZE', '10' if SERVER_INTERFACE == 'asgi' else '0'))
+DATABASE_POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', '10'))
+
+
+def _database(url, alias):
+    conn_max_age = 0 if SERVER_INTERFACE == 'asgi' else 600
+    config = dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=True)
+    if DATABASE_POOL_MAX_SIZE and config['ENGINE'] == 'django.db.backends.postgresql':
+        config['CONN_MAX_AGE'] = 0  # the pool keeps connections open instead
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'name': alias,
+            'min_size': min(DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE),
+            'max_size': DATABASE_POOL_MAX_SIZE,
+            'timeout': DATABASE_POOL_TIMEOUT,
+        }
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default='sqlite:///db.sqlite3',
-        conn_max_age=600,
-    )
+    'default': _database(os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3'), 'default'),
 }
 
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica-1/db,postgres://replica-2/db.
+# Safe API reads go to a replica unless the view or a recent write pins them
+# to the primary, see unimentor.replicas.
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica{_index}'] = {
+        **_database(_url, f'replica{_index}'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+
+DATABASE_ROUTERS = ['unimentor.replicas.ReplicaRouter']
+# Seconds a client's reads stay on the primary after it writes.
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+# Seconds a single query may run during a request (0 disables); views can set
+# their own, see unimentor.db.
+DATABASE_STATEMENT_TIMEOUT = float(os.environ.get('DATABASE_STATEMENT_TIMEOUT', '5'))
+
+
+# Cache
+# Shared between worker processes: Redis when REDIS_URL is set, otherwise a
+# file-based cache so a single host needs no outside services. unimentor.cache
+# puts a per-process LRU in front of it. Production needs Redis: rate limits
+# rely on its atomic updates (see unimentor.ratelimit). Tests run with
+# unimentor.test_settings, which swaps in a private in-process cache.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'unicraft-cache')),
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))},
+        }
+    }
+
+# Per-process LRU tier of unimentor.cache: entries per namespace and how long
+# a local copy is trusted before re-checking the shared cache.
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '1024'))
+CACHE_LOCAL_TIMEOUT = float(os.environ.get('CACHE_LOCAL_TIMEOUT', '30'))
+# Seconds between invalidation bus polls on databases without LISTEN/NOTIFY.
+INVALIDATION_POLL_INTERVAL = float(os.environ.get('INVALIDATION_POLL_INTERVAL', '0.1'))
+
+# Idempotency-Key handling (unimentor.idempotency): how long a stored response
+# is replayed, and after how long a request that never answered is considered
+# dead.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', '60'))
+
+# Rows fetched and written per chunk by the streaming exports (unimentor.exports).
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+
+# Responses smaller than this many bytes go out uncompressed (unimentor.compression).
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+
+# Per-request profiling (unimentor.profiling): where captures are stored and how
+# many are kept, how long a signed X-Profile token is valid, the share of
+# requests profiled at random (0 = none) and the stack sampler's interval.
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'unicraft-profiles'))
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', '200'))
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', '3600'))
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', '0.005'))
+
+# Bearer token required to scrape /metrics (unimentor.metrics); unset leaves it open.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Queries taking SLOW_QUERY_THRESHOLD seconds or more are logged with their
+# EXPLAIN plan to per-process JSON lines files in SLOW_QUERY_DIR
+# (unimentor.slow_queries, summarized by manage.py slow_queries); 0 turns the
+# log off. SLOW_QUERY_EXPLAIN_ANALYZE=True runs slow SELECTs again on
+# PostgreSQL to get actual row counts and timings.
+SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', '0.5'))
+SLOW_QUERY_EXPLAIN_ANALYZE = os.environ.get('SLOW_QUERY_EXPLAIN_ANALYZE', 'False') == 'True'
+SLOW_QUERY_DIR = os.environ.get('SLOW_QUERY_DIR', os.path.join(tempfile.gettempdir(), 'unicraft-slow-queries'))
+SLOW_QUERY_FILE_MAX_BYTES = int(os.environ.get('SLOW_QUERY_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+SLOW_QUERY_MAX_FILES = int(os.environ.get('SLOW_QUERY_MAX_FILES', '50'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,6 +324,14 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Token-bucket limits per scope (unimentor.ratelimit), per client IP and per user.
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': os.environ.get('THROTTLE_RATE_AUTH', '10/min'),
+        'oauth': os.environ.get('THROTTLE_RATE_OAUTH', '20/min'),
+        'register': os.environ.get('THROTTLE_RATE_REGISTER', '5/hour'),
+    },
+    # Proxies in front of the app; the client IP is read from X-Forwarded-For accordingly.
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES') else None,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -206,4 +378,9 @@ CSRF_TRUSTED_ORIGINS = os.environ.get(
 
 CORS_ALLOW_CREDENTIALS = True
 
-SITE_ID = 1
+# Upper bound for settings + app loading + URLconf import, enforced by
+# unimentor.tests.StartupBudgetTests.
+STARTUP_TIME_BUDGET = float(os.environ.get('STARTUP_TIME_BUDGET', '2.0'))
+
+# Most bookings a single POST /api/bookings/bulk/ may transition.
+BOOKING_BULK_MAX_IDS = int(os.environ.get('BOOKING_BULK_MAX_IDS', '100'))
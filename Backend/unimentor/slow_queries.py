@@ -0,0 +1,253 @@
+"""Slow query log with the plan of every logged query.
+
+Every query that takes at least ``SLOW_QUERY_THRESHOLD`` seconds (0 turns the
+log off) is written as one JSON line with its fingerprint (the SQL with
+literals and ``IN`` lists collapsed, hashed), redacted parameters (numbers
+are kept, anything else becomes its type name), the view and action that ran
+it (``SlowQueryMiddleware``) and the backend's ``EXPLAIN``, with string
+literals redacted there too. With ``SLOW_QUERY_EXPLAIN_ANALYZE`` PostgreSQL
+runs ``EXPLAIN ANALYZE`` on slow SELECTs, executing them a second time.
+
+Each process appends to its own file in ``SLOW_QUERY_DIR``, so gunicorn
+workers never rotate a file under each other. A file is rotated once at
+``SLOW_QUERY_FILE_MAX_BYTES`` and the oldest files beyond
+``SLOW_QUERY_MAX_FILES`` are deleted. ``manage.py slow_queries`` ranks the
+fingerprints by total time.
+"""
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from decimal import Decimal
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .query_plans import explain_sql
+
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+MAX_PARAMS = 20
+MAX_SQL = 10_000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_IN_LIST = re.compile(r'\(\?(?:\s*,\s*\?)+\)')
+_SPACE = re.compile(r'\s+')
+
+_view = ContextVar('slow_query_view', default=None)
+_explaining = ContextVar('slow_query_explaining', default=False)
+_handler = None
+
+
+def normalize(sql: str) -> str:
+    """``sql`` with every literal and placeholder as ``?`` and ``IN`` lists as ``(?+)``."""
+    return _SPACE.sub(' ', _IN_LIST.sub('(?+)', _LITERAL.sub('?', sql))).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    return f'<{type(value).__name__}>'
+
+
+def redact(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    params = list(params)
+    redacted = [_redact_value(value) for value in params[:MAX_PARAMS]]
+    if len(params) > MAX_PARAMS:
+        redacted.append(f'... {len(params) - MAX_PARAMS} more')
+    return redacted
+
+
+def _plan(db, sql, params):
+    statement = sql.lstrip()[:6].upper()
+    if not statement.startswith(EXPLAINABLE):
+        return None
+    if db.vendor == 'postgresql' and db.connection.info.transaction_status.name == 'INERROR':
+        return None
+    token = _explaining.set(True)
+    try:
+        # A failed EXPLAIN must not abort the caller's transaction.
+        with transaction.atomic(using=db.alias):
+            plan = explain_sql(db, sql, params, analyze=settings.SLOW_QUERY_EXPLAIN_ANALYZE and statement == 'SELECT')
+        # PostgreSQL shows the parameters' values in conditions.
+        return _STRING.sub("'?'", plan)
+    except Exception as exc:
+        return f'EXPLAIN failed: {type(exc).__name__}: {exc}'
+    finally:
+        _explaining.reset(token)
+
+
+def _prune(directory, keep):
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if '.jsonl' in name]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _file_handler():
+    """This process's handler, opened again after a fork or a change of ``SLOW_QUERY_DIR``."""
+    global _handler
+    path = os.path.join(settings.SLOW_QUERY_DIR, f'{os.getpid()}.jsonl')
+    if _handler is None or _handler.baseFilename != path:
+        if _handler is not None:
+            logger.removeHandler(_handler)
+            _handler.close()
+        os.makedirs(settings.SLOW_QUERY_DIR, exist_ok=True)
+        _prune(settings.SLOW_QUERY_DIR, settings.SLOW_QUERY_MAX_FILES - 1)
+        _handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=settings.SLOW_QUERY_FILE_MAX_BYTES, backupCount=1, delay=True,
+        )
+        _handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+        # The file is the log: keep parameters and plans out of the console and error reporting.
+        logger.propagate = False
+    return _handler
+
+
+def record(db, sql, params, many, elapsed):
+    entry = {
+        'at': timezone.now().isoformat(),
+        'pid': os.getpid(),
+        'alias': db.alias,
+        'ms': round(elapsed * 1000, 3),
+        'fingerprint': fingerprint(sql),
+        'sql': sql[:MAX_SQL],
+        'params': None if many else redact(params),
+        'many': many,
+        'view': _view.get(),
+        'plan': None if many else _plan(db, sql, params),
+    }
+    _file_handler()
+    logger.info(json.dumps(entry, default=str))
+
+
+def log_slow_query(execute, sql, params, many, context):
+    """``execute_wrapper`` recording queries slower than ``SLOW_QUERY_THRESHOLD``."""
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if not threshold or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed = time.perf_counter() - started
+    if elapsed >= threshold:
+        record(context['connection'], sql, params, many, elapsed)
+    return result
+
+
+def _install(sender, connection, **kwargs):
+    if log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
+
+
+connection_created.connect(_install, dispatch_uid='unimentor.slow_queries.log_slow_query')
+
+
+def view_label(request, view_func) -> str:
+    """``MentorProfileViewSet.list`` for DRF views, the dotted function name otherwise."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{getattr(view_func, "__qualname__", type(view_func).__name__)}'
+    method = request.method.lower()
+    return f'{view_class.__name__}.{getattr(view_func, "actions", {}).get(method, method)}'
+
+
+class SlowQueryMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _view.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _view.reset(token)
+
+    async def __acall__(self, request):
+        token = _view.set(None)
+        try:
+            return await self.get_response(request)
+        finally:
+            _view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if settings.SLOW_QUERY_THRESHOLD:
+            _view.set(view_label(request, view_func))
+
+
+def read(since=None):
+    """Logged entries of every process, optionally only those at or after ``since``."""
+    try:
+        names = sorted(os.listdir(settings.SLOW_QUERY_DIR))
+    except FileNotFoundError:
+        return
+    for name in names:
+        if '.jsonl' not in name:
+            continue
+        try:
+            with open(os.path.join(settings.SLOW_QUERY_DIR, name)) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # cut short by a crash or a rotation
+                    if since is None or entry['at'] >= since.isoformat():
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def top_offenders(entries, limit=10, view=None) -> list:
+    """Fingerprints by total time, each with its slowest entry's SQL and plan."""
+    groups = defaultdict(list)
+    for entry in entries:
+        if view is None or view in (entry['view'] or ''):
+            groups[entry['fingerprint']].append(entry)
+    offenders = []
+    for key, group in groups.items():
+        slowest = max(group, key=lambda entry: entry['ms'])
+        total = sum(entry['ms'] for entry in group)
+        offenders.append({
+            'fingerprint': key,
+            'count': len(group),
+            'total_ms': round(total, 3),
+            'mean_ms': round(total / len(group), 3),
+            'max_ms': slowest['ms'],
+            'views': Counter(entry['view'] or '-' for entry in group).most_common(3),
+            'sql': slowest['sql'],
+            'params': slowest['params'],
+            'plan': slowest['plan'],
+        })
+    offenders.sort(key=lambda offender: offender['total_ms'], reverse=True)
+    return offenders[:limit]
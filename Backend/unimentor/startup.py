@@ -0,0 +1,64 @@
+"""Measure what a fresh worker pays before it can serve its first request.
+
+The measurement runs in a clean interpreter (``python -X importtime``) so
+modules already imported by the caller do not hide their cost.
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+
+# Runs inside the child interpreter and prints its timings as JSON.
+_PROBE = """
+import json, os, resource, sys, time
+t0 = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+t1 = time.perf_counter()
+django.setup()
+t2 = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+t3 = time.perf_counter()
+print(json.dumps({
+    'settings': t1 - t0,
+    'apps_ready': t2 - t1,
+    'urlconf': t3 - t2,
+    'total': t3 - t0,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+
+def measure_startup() -> dict:
+    """Boot Django in a subprocess and return phase timings and import costs.
+
+    ``imports`` maps each top-level package to its self import time in
+    seconds, summed over all of its submodules.
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'unimentor.settings')}
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    imports = defaultdict(float)
+    for line in completed.stderr.splitlines():
+        # "import time:       123 |        456 |   package.module"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _cumulative_us, name = line[len('import time:'):].split('|')
+        imports[name.strip().split('.')[0]] += int(self_us) / 1e6
+    result['imports'] = dict(imports)
+    return result
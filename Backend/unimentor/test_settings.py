@@ -0,0 +1,14 @@
+"""Settings for the test suite: the project settings with a private cache.
+
+The tests clear the cache freely, so they must not share the file-based
+cache of a local server or the Redis of ``REDIS_URL``. ``manage.py test``
+picks this module; other runners (pytest-django) use ``pytest.ini``.
+"""
+from .settings import *  # noqa: F401,F403
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'unicraft-tests',
+    }
+}
@@ -0,0 +1,1115 @@
+import gzip
+import json
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import (
+    Client, LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.http import HttpResponse
+from django.test.client import ClientHandler
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import TieredCache, cached, invalidate_tags
+from . import compression, exports, loadtest, metrics, profiling, slow_queries
+from .db import StatementTimeoutMiddleware, statement_timeout, timeouts
+from .idempotency import idempotent, purge_expired
+from .handlers import PipelineASGIHandler, PipelineHandlerMixin
+from .invalidation import InvalidationListener, publish
+from .models import IdempotencyKey, InvalidationEvent
+from .ratelimit import TokenBucket
+from .replicas import ReplicaRouter, ReplicaRoutingMiddleware, database_routing
+from .startup import measure_startup
+
+
+class StartupBudgetTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Best of three boots, to keep a busy test machine from failing the budget.
+        cls.result = min((measure_startup() for _ in range(3)), key=lambda run: run['total'])
+
+    def test_boot_within_budget(self):
+        self.assertLess(
+            self.result['total'], settings.STARTUP_TIME_BUDGET,
+            f"Boot took {self.result['total']:.2f}s (budget {settings.STARTUP_TIME_BUDGET:.2f}s)",
+        )
+
+    def test_unused_subsystems_are_not_imported(self):
+        loaded = set(self.result['modules'])
+        for module in ('allauth', 'drf_spectacular.views', 'httpx', 'pkg_resources'):
+            self.assertFalse(module in loaded, f'{module} is imported at startup')
+
+
+class ServeProbeTests(TestCase):
+    @override_settings(ALLOWED_HOSTS=['.unicraft.uz', 'api.unicraft.uz'], DEBUG=False)
+    def test_probe_passes_host_validation(self):
+        from .warmup import allowed_host
+
+        self.assertEqual(allowed_host(), 'unicraft.uz')
+        self.assertEqual(self.client.get('/api/health/', HTTP_HOST=allowed_host()).status_code, 200)
+
+    def test_probe_timeout_leaves_the_server_running(self):
+        from .management.commands.serve import Command
+
+        process = mock.Mock(**{'poll.return_value': None})
+        with mock.patch('httpx.get', return_value=HttpResponse(status=400)):
+            self.assertIsNone(Command().wait_for_first_200(process, 'http://127.0.0.1:1/api/health/', timeout=0.05))
+        process.terminate.assert_not_called()
+
+
+class WarmupTests(TestCase):
+    def test_shared_warmup_seeds_the_schema_cache(self):
+        from drf_spectacular.views import SpectacularAPIView
+
+        from .schema import CachedSchemaView
+        from .warmup import warm_shared
+
+        CachedSchemaView.payloads.clear()
+        warm_shared()
+        with mock.patch.object(SpectacularAPIView, '_get_schema_response') as generate:
+            response = self.client.get('/api/schema/')
+        generate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+
+    def test_worker_warmup_keeps_no_connection(self):
+        from .warmup import warm_worker
+
+        with mock.patch('unimentor.invalidation.listener.start'), \
+                mock.patch.object(type(connections['default']), 'ensure_connection') as connect:
+            warm_worker()
+        connect.assert_not_called()
+
+
+class PipelineClientHandler(PipelineHandlerMixin, ClientHandler):
+    pass
+
+
+class PipelineClient(Client):
+    def __init__(self, **defaults):
+        super().__init__(**defaults)
+        self.handler = PipelineClientHandler(enforce_csrf_checks=False)
+
+
+class MiddlewarePipelineTests(TestCase):
+    client_class = PipelineClient
+
+    def test_api_skips_session_and_framing_middleware(self):
+        response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Frame-Options', response.headers)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+
+    def test_admin_keeps_full_stack(self):
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Frame-Options'], 'DENY')
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+
+    def test_api_keeps_cors_and_jwt_auth(self):
+        user = get_user_model().objects.create_user(username='pipeline', password='pw')
+        response = self.client.get(
+            '/api/bookings/',
+            HTTP_ORIGIN=settings.CORS_ALLOWED_ORIGINS[0],
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Access-Control-Allow-Origin'], settings.CORS_ALLOWED_ORIGINS[0])
+
+    @override_settings(MIDDLEWARE_PIPELINES={
+        '/api/': ['django.middleware.common.CommonMiddleware'],
+        '/api/async/': [],
+    })
+    def test_longest_prefix_wins(self):
+        handler = PipelineClientHandler()
+        handler.load_middleware()
+        self.assertIs(handler.pipeline_for('/api/async/mentors/'), dict(handler.pipelines)['/api/async/'])
+        self.assertIs(handler.pipeline_for('/api/bookings/'), dict(handler.pipelines)['/api/'])
+        self.assertIsNone(handler.pipeline_for('/admin/'))
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'auth': '3/min', 'oauth': '2/min', 'register': '2/hour'},
+})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bucket_allows_burst_then_refills_at_rate(self):
+        bucket = TokenBucket('3/min')
+        with mock.patch('unimentor.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual([bucket.consume('k') for _ in range(3)], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(bucket.consume('k'), 20.0)
+        with mock.patch('unimentor.ratelimit.time.time', return_value=1020.0):
+            self.assertEqual(bucket.consume('k'), 0.0)
+            self.assertGreater(bucket.consume('k'), 0)
+
+    def test_token_endpoint_returns_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.client.post('/api/token/', {'username': 'x', 'password': 'y'}).status_code, 401)
+        response = self.client.post('/api/token/', {'username': 'x', 'password': 'y'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+
+    def test_register_is_limited_per_ip(self):
+        for i in range(2):
+            response = self.client.post('/api/users/register/', {'username': f'u{i}', 'password': 'S3cure-pass!'})
+            self.assertNotEqual(response.status_code, 429)
+        response = self.client.post('/api/users/register/', {'username': 'u3', 'password': 'S3cure-pass!'})
+        self.assertEqual(response.status_code, 429)
+        other_ip = self.client.post(
+            '/api/users/register/', {'username': 'u4', 'password': 'S3cure-pass!'}, REMOTE_ADDR='10.0.0.2',
+        )
+        self.assertNotEqual(other_ip.status_code, 429)
+
+    def test_oauth_views_are_limited(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/users/auth/google/', {}).status_code, 400)
+        response = self.client.post('/api/users/auth/google/', {})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_deploy_check_warns_about_a_non_atomic_cache(self):
+        from .ratelimit import check_atomic_cache
+
+        self.assertEqual([warning.id for warning in check_atomic_cache(None)], ['unimentor.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(check_atomic_cache(None), [])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:1',
+    }})
+    def test_redis_consumes_in_one_script_call(self):
+        bucket = TokenBucket('3/min')
+        client = mock.Mock()
+        client.register_script.return_value.return_value = 20000
+        with mock.patch.object(bucket.cache._cache, 'get_client', return_value=client), \
+                mock.patch('unimentor.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual(bucket.consume('k'), 20.0)
+        # No get/incr/touch besides the one script call.
+        self.assertEqual([name for name, args, kwargs in client.mock_calls], ['register_script', 'register_script()'])
+        client.register_script.return_value.assert_called_once_with(
+            keys=[bucket.cache.make_key('k')], args=[1000000, 20000, 60000], client=client,
+        )
+
+    async def test_async_views_check_off_the_event_loop(self):
+        from .ratelimit import ratelimit
+
+        threads = []
+
+        @ratelimit('oauth')
+        async def view(request):
+            return HttpResponse()
+
+        def check(scope, request):
+            threads.append(threading.get_ident())
+            return 0.0
+
+        with mock.patch('unimentor.ratelimit.check', check):
+            response = await view(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(threads, [threading.get_ident()])
+
+
+test_cache = TieredCache('tests', max_entries=2, local_timeout=60)
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        test_cache.clear_local()
+        test_cache.stats = type(test_cache.stats)()
+
+    def test_local_then_shared_then_producer(self):
+        calls = []
+        produce = lambda: calls.append(1) or 'value'  # noqa: E731
+        self.assertEqual(test_cache.get_or_set('k', produce), 'value')
+        self.assertEqual(test_cache.get_or_set('k', produce), 'value')
+        test_cache.clear_local()  # what another worker sees
+        self.assertEqual(test_cache.get_or_set('k', produce), 'value')
+        self.assertEqual(len(calls), 1)
+        report = test_cache.report()
+        self.assertEqual((report['misses'], report['local_hits'], report['shared_hits']), (1, 1, 1))
+        self.assertGreater(report['local_bytes'], 0)
+
+    def test_tags_invalidate_both_tiers(self):
+        test_cache.set('a', 1, tags=['mentor:1'])
+        test_cache.set('b', 2, tags=['mentor:2'])
+        invalidate_tags('mentor:1')
+        self.assertIsNone(test_cache.get('a'))
+        test_cache.clear_local()
+        self.assertIsNone(test_cache.get('a'))
+        self.assertEqual(test_cache.get('b'), 2)
+
+    def test_lru_evicts_least_recently_used(self):
+        test_cache.set('a', 1)
+        test_cache.set('b', 2)
+        test_cache.get('a')
+        test_cache.set('c', 3)
+        self.assertEqual(list(test_cache._local), ['a', 'c'])
+        self.assertEqual(test_cache.report()['evictions'], 1)
+
+    def test_local_copies_expire(self):
+        test_cache.set('a', 1)
+        with mock.patch('unimentor.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(test_cache.get('a'), 1)  # refetched from the shared tier
+        self.assertEqual(test_cache.report()['expirations'], 1)
+
+    def test_cached_decorator(self):
+        calls = []
+
+        @cached(test_cache, key=lambda pk: f'user:{pk}', tags=lambda pk: [f'user:{pk}'])
+        def load(pk):
+            calls.append(pk)
+            return {'id': pk}
+
+        load(1)
+        load(1)
+        invalidate_tags('user:1')
+        load(1)
+        self.assertEqual(calls, [1, 1])
+
+    def test_stats_endpoint_is_admin_only(self):
+        admin = get_user_model().objects.create_user('admin', password='x', is_staff=True)
+        self.assertEqual(self.client.get('/api/internal/cache/').status_code, 401)
+        response = self.client.get(
+            '/api/internal/cache/', HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tests', response.json()['namespaces'])
+
+
+@skipIf(connection.vendor == 'postgresql', 'events travel over NOTIFY, not the event table')
+class InvalidationBusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        test_cache.clear_local()
+
+    def test_commit_publishes_and_other_workers_drop_only_affected_keys(self):
+        listener = InvalidationListener()
+        listener.poll()  # start from the current position
+        test_cache.set('mentor-1', 'cached', tags=['mentors.mentorprofile:1'])
+        test_cache.set('mentor-2', 'cached', tags=['mentors.mentorprofile:2'])
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_tags('mentors.mentorprofile:1')
+        self.assertEqual(InvalidationEvent.objects.get().tags, ['mentors.mentorprofile:1'])
+
+        test_cache.set('mentor-1', 'cached again', tags=['mentors.mentorprofile:1'])  # another worker's copy
+        self.assertEqual(listener.poll(), 1)
+        self.assertEqual(list(test_cache._local), ['mentor-2'])
+
+    def test_model_changes_are_broadcast(self):
+        user = get_user_model().objects.create_user('bus', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.first_name = 'Bus'
+            user.save()
+        self.assertIn(f'users.user:{user.pk}', InvalidationEvent.objects.last().tags)
+
+    def test_signups_and_logins_are_not_broadcast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = get_user_model().objects.create_user('quiet', password='x')
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        self.assertFalse(InvalidationEvent.objects.exists())
+
+
+class InvalidationBusLatencyTests(TransactionTestCase):
+    def test_listener_thread_applies_events_within_milliseconds(self):
+        listener = InvalidationListener(poll_interval=0.01)
+        listener.poll()
+        listener.start().ready.wait(5)
+        try:
+            test_cache.set('k', 'v', tags=['latency'])
+            publish(['latency'])
+            started = time.perf_counter()
+            while 'k' in test_cache._local and time.perf_counter() - started < 2:
+                time.sleep(0.001)
+            self.assertNotIn('k', test_cache._local)
+            self.assertLess(time.perf_counter() - started, 0.2)
+        finally:
+            listener.stop()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory(HTTP_AUTHORIZATION='Bearer student')
+        self.router = ReplicaRouter()
+
+    def read(self, request):
+        self.read_from = self.router.db_for_read(get_user_model())
+        return HttpResponse()
+
+    def route(self, request, view=None):
+        """Run ``request`` through the middleware; returns where the view read from."""
+        view = view or self.read
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: middleware.process_view(request, view, (), {}) or view(request),
+        )
+        middleware(request)
+        return self.read_from
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.route(self.factory.get('/api/mentors/')), 'replica1')
+        self.assertEqual(self.router.db_for_read(get_user_model()), 'default')
+
+    def test_client_reads_from_primary_after_writing(self):
+        self.assertEqual(self.route(self.factory.post('/api/bookings/')), 'default')
+        self.assertEqual(self.route(self.factory.get('/api/bookings/')), 'default')
+        other_client = self.factory.get('/api/bookings/', HTTP_AUTHORIZATION='Bearer mentor')
+        self.assertEqual(self.route(other_client), 'replica1')
+
+    def test_reads_after_a_write_in_the_same_request_use_primary(self):
+        def view(request):
+            self.router.db_for_write(get_user_model())
+            return self.read(request)
+
+        self.assertEqual(self.route(self.factory.get('/api/mentors/'), view), 'default')
+
+    def test_views_can_pin_primary(self):
+        view = database_routing('primary')(lambda request: self.read(request))
+        self.assertEqual(self.route(self.factory.get('/api/bookings/'), view), 'default')
+
+    def test_views_pinned_to_replica_still_write_on_primary(self):
+        view = database_routing('replica')(lambda request: self.read(request))
+        self.assertEqual(self.route(self.factory.get('/api/mentors/', HTTP_AUTHORIZATION='Bearer mentor'), view), 'replica1')
+        for method in ('post', 'put', 'patch', 'delete'):
+            self.assertEqual(self.route(getattr(self.factory, method)('/api/mentors/'), view), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        self.assertEqual(self.route(self.factory.get('/api/mentors/')), 'default')
+
+
+SLOW_QUERY = (
+    'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000000) SELECT count(*) FROM n'
+)
+
+
+def slow_view(request):
+    # A savepoint, so a cancelled query leaves the test transaction usable on PostgreSQL.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SLOW_QUERY if request.GET.get('slow') else 'SELECT 1')
+    return HttpResponse()
+
+
+@override_settings(DATABASE_STATEMENT_TIMEOUT=0.05)
+class StatementTimeoutTests(TestCase):
+    def call(self, view, query=''):
+        def get_response(request):
+            try:
+                return middleware.process_view(request, view, (), {}) or view(request)
+            except Exception as exc:
+                return middleware.process_exception(request, exc)
+
+        middleware = StatementTimeoutMiddleware(get_response)
+        return middleware(RequestFactory().get(f'/api/slow/{query}'))
+
+    def test_slow_query_is_cancelled_with_503(self):
+        before = timeouts['default']
+        started = time.perf_counter()
+        response = self.call(slow_view, '?slow=1')
+        self.assertEqual(response.status_code, 503)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(timeouts['default'], before + 1)
+        self.assertEqual(self.call(slow_view).status_code, 200)
+
+    def test_view_can_lift_the_limit(self):
+        # 0 disables the limit; the query itself is cut short so the test stays fast.
+        view = statement_timeout(0)(lambda request: slow_view(request))
+        with mock.patch(f'{__name__}.SLOW_QUERY', SLOW_QUERY.replace('100000000', '300000')):
+            self.assertEqual(self.call(view, '?slow=1').status_code, 200)
+
+    def test_outside_requests_there_is_no_limit(self):
+        with connection.cursor() as cursor:
+            cursor.execute(SLOW_QUERY.replace('100000000', '300000'))
+            self.assertEqual(cursor.fetchone(), (300000,))
+
+    def test_postgresql_sets_the_limit_once_per_transaction(self):
+        class FakePostgres:
+            vendor = alias = 'postgresql'
+            in_atomic_block = False
+
+            def __init__(self):
+                self.statements = []
+                self.run_on_commit = []
+                cursor = mock.MagicMock()
+                cursor.__enter__.return_value.execute.side_effect = self.statements.append
+                self.connection = mock.Mock(**{'cursor.return_value': cursor})
+                self.connection.info.transaction_status.name = 'INTRANS'
+
+            def on_commit(self, func):
+                self.run_on_commit.append((set(), func, False))
+
+        from .db import _timeout, enforce_statement_timeout
+
+        db = FakePostgres()
+        run = lambda: enforce_statement_timeout(lambda *args: None, 'SELECT 1', (), False, {'connection': db})  # noqa: E731
+        token = _timeout.set(0.5)
+        try:
+            db.in_atomic_block = True
+            run(), run(), run()
+            self.assertEqual(db.statements, ['SET LOCAL statement_timeout = 500'])
+            db.run_on_commit.clear()  # the transaction ended
+            run()
+            self.assertEqual(len(db.statements), 2)
+            db.in_atomic_block = False
+            run(), run()
+            self.assertEqual(db.statements[2:], ['SET statement_timeout = 500'])
+            db.in_atomic_block = True
+            run()
+            self.assertEqual(len(db.statements), 3)  # the session already has the limit
+        finally:
+            _timeout.reset(token)
+
+    def test_pool_stats_endpoint(self):
+        admin = get_user_model().objects.create_user(username='dba', password='pw', is_staff=True)
+        response = self.client.get(
+            '/api/internal/db/', HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['databases']['default']['vendor'], connection.vendor)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from bookings.models import Booking
+
+        User = get_user_model()
+        cls.admin = User.objects.create_user('exporter', password='x', is_staff=True)
+        student = User.objects.create_user('student', password='x')
+        mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        now = timezone.now()
+        Booking.objects.bulk_create(
+            Booking(
+                student=student, mentor=mentor, slot_time=now, created_at=now - timedelta(days=i % 10),
+                status=Booking.Status.ACCEPTED if i % 2 else Booking.Status.PENDING,
+                payment_id='=HYPERLINK("x")' if i == 0 else '',
+            )
+            for i in range(3000)
+        )
+
+    def get(self, path, user=None):
+        token = RefreshToken.for_user(user or self.admin).access_token
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_csv_with_filters(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.get(f'/api/internal/export/bookings.csv?since={since}&status=accepted')
+        self.assertTrue(response.streaming)
+        self.assertIn('bookings-', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(exports.EXPORTS['bookings'].fields))
+        self.assertEqual(len(lines) - 1, 300)  # days 0 and 1, odd rows only
+        self.assertTrue(all(',accepted,' in line for line in lines[1:]))
+
+    def test_until_is_inclusive(self):
+        from bookings.models import Booking
+
+        latest = Booking.objects.order_by('-created_at').first()
+        moment = latest.created_at.isoformat()
+        self.assertIn(latest.pk, exports.export_queryset('bookings', until=moment).values_list('pk', flat=True))
+        self.assertIn(latest.pk, exports.export_queryset('bookings', since=moment).values_list('pk', flat=True))
+        day = timezone.localdate(latest.created_at).isoformat()
+        self.assertEqual(exports.export_queryset('bookings', until=day).count(), 3000)
+
+    def test_gzipped_ndjson(self):
+        response = self.get('/api/internal/export/bookings.ndjson.gz?status=pending')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(len(rows), 1500)
+        self.assertEqual(rows[0]['payment_id'], '=HYPERLINK("x")')  # only CSV cells are defused
+
+    def test_csv_cells_cannot_be_formulas(self):
+        body = b''.join(self.get('/api/internal/export/bookings.csv').streaming_content).decode()
+        self.assertIn(',"\'=HYPERLINK(""x"")",', body)
+
+    def test_bad_filters_and_non_staff_are_rejected(self):
+        self.assertEqual(self.get('/api/internal/export/bookings.csv?since=yesterday').status_code, 400)
+        self.assertEqual(self.get('/api/internal/export/users.csv?status=active').status_code, 400)
+        self.assertEqual(self.get('/api/internal/export/secrets.csv').status_code, 404)
+        student = get_user_model().objects.get(username='student')
+        self.assertEqual(self.get('/api/internal/export/users.csv', user=student).status_code, 403)
+
+    @override_settings(EXPORT_CHUNK_SIZE=100)
+    async def test_asgi_streams_chunks_lazily(self):
+        produced = []
+        chunks = exports._chunks
+
+        def counting(*args, **kwargs):
+            for chunk in chunks(*args, **kwargs):
+                produced.append(chunk)
+                yield chunk
+
+        token = RefreshToken.for_user(self.admin).access_token
+        with mock.patch.object(exports, '_chunks', counting):
+            response = await self.async_client.get(
+                '/api/internal/export/bookings.csv', headers={'Authorization': f'Bearer {token}'},
+            )
+            self.assertTrue(response.is_async)
+            body = response.__aiter__()
+            first = await anext(body)
+            self.assertEqual(len(produced), 1)
+            rest = [chunk async for chunk in body]
+        self.assertEqual(len(produced), 30)  # 3000 rows, 100 per chunk
+        self.assertEqual(b''.join([first, *rest]), b''.join(produced))
+
+    def measure(self, **filters):
+        queryset = exports.export_queryset('bookings', **filters)
+        tracemalloc.start()
+        try:
+            total = sum(len(chunk) for chunk in exports.stream('bookings', queryset, 'ndjson', chunk_size=100))
+            return total, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_does_not_grow_with_rows(self):
+        half_size, half_peak = self.measure(statuses=['accepted'])
+        full_size, full_peak = self.measure()
+        self.assertGreater(full_size, 1.9 * half_size)
+        self.assertLess(full_peak, 1.5 * half_peak)
+
+
+class CountingView(APIView):
+    calls = 0
+    delay = 0
+
+    @idempotent
+    def post(self, request):
+        type(self).calls += 1
+        time.sleep(self.delay)
+        return Response(
+            {'call': self.calls, 'echo': request.data}, status=201, headers={'Location': f'/api/pay/{self.calls}/'},
+        )
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('retrier', password='x')
+
+    def setUp(self):
+        CountingView.calls = 0
+
+    def post(self, key, data=None, view=CountingView):
+        request = APIRequestFactory().post('/api/pay/', data or {'amount': 10}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, self.user)
+        return view.as_view()(request)
+
+    def test_replay_returns_stored_response_without_running_view(self):
+        first = self.post('k1')
+        replay = self.post('k1')
+        self.assertEqual((first.status_code, replay.status_code), (201, 201))
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay['Location'], '/api/pay/1/')
+        self.assertEqual(CountingView.calls, 1)
+        self.assertEqual(self.post('k2').data['call'], 2)
+
+    def test_duplicate_of_request_in_flight_is_turned_away_at_once(self):
+        self.post('k1')
+        IdempotencyKey.objects.update(status_code=None)  # as if the first request were still running
+        response = self.post('k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_key_reused_for_other_body_is_rejected(self):
+        self.post('k1')
+        self.assertEqual(self.post('k1', {'amount': 99}).status_code, 422)
+
+    def test_requests_without_key_always_run(self):
+        for _ in range(2):
+            request = APIRequestFactory().post('/api/pay/', {}, format='json')
+            force_authenticate(request, self.user)
+            CountingView.as_view()(request)
+        self.assertEqual(CountingView.calls, 2)
+
+    def test_purge_deletes_only_expired_keys(self):
+        self.post('k1')
+        self.post('k2')
+        IdempotencyKey.objects.filter(pk__in=IdempotencyKey.objects.values('pk')[:1]).update(
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(purge_expired(batch_size=1), 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+class SlowCountingView(CountingView):
+    delay = 0.3
+
+
+@skipIf(connection.vendor == 'sqlite', 'in-memory SQLite test databases fail on locks instead of waiting')
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    def test_concurrent_duplicates_get_conflict(self):
+        user = get_user_model().objects.create_user('racer', password='x')
+        CountingView.calls = 0
+        responses = []
+
+        def post():
+            request = APIRequestFactory().post('/api/pay/', {'amount': 10}, format='json', HTTP_IDEMPOTENCY_KEY='race')
+            force_authenticate(request, user)
+            try:
+                responses.append(SlowCountingView.as_view()(request))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(SlowCountingView.calls, 1)
+        self.assertEqual(sorted(response.status_code for response in responses), [201, 409, 409])
+        self.assertTrue(all(response.has_header('Retry-After') for response in responses if response.status_code == 409))
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from bookings.models import Booking
+        from mentors.models import MentorProfile
+
+        User = get_user_model()
+        cls.admin = User.objects.create_user('admin', password='x', is_staff=True, bio='long text')
+        mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR, email='m@example.com')
+        MentorProfile.objects.create(user=mentor, university='MIT', availability=[], status=MentorProfile.Status.APPROVED)
+        cls.booking = Booking.objects.create(student=cls.admin, mentor=mentor, slot_time=timezone.now())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        return response, queries[-1]['sql']
+
+    def test_fields_trim_json_and_columns(self):
+        response, sql = self.get('/api/mentors/?fields=id,university,user.username')
+        self.assertEqual(list(response.json()[0]), ['id', 'user', 'university'])
+        self.assertEqual(response.json()[0]['user'], {'username': 'mentor'})
+        self.assertIn('"username"', sql)
+        for column in ('"availability"', '"email"', '"bio"', '"password"'):
+            self.assertNotIn(column, sql)
+
+    def test_omit_and_unrequested_relations_are_not_joined(self):
+        response, sql = self.get('/api/mentors/?omit=user,availability')
+        self.assertNotIn('user', response.json()[0])
+        self.assertNotIn('availability', response.json()[0])
+        self.assertNotIn('JOIN', sql)
+
+    def test_required_fields_keep_object_permissions_working(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/bookings/{self.booking.pk}/?fields=status')
+        self.assertEqual(response.json(), {'status': 'pending'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/bookings/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+
+class CompressionTests(TestCase):
+    def respond(self, response, accept='gzip'):
+        request = RequestFactory().get('/api/x/', HTTP_ACCEPT_ENCODING=accept)
+        return compression.CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        offered = ['gzip']
+        self.assertEqual(compression.negotiate('gzip, deflate', offered), 'gzip')
+        self.assertIsNone(compression.negotiate('gzip;q=0, identity', offered))
+        self.assertEqual(compression.negotiate('*', offered), 'gzip')
+        self.assertIsNone(compression.negotiate('', offered))
+        if 'br' in compression.ENCODERS:
+            self.assertEqual(compression.negotiate('gzip;q=1.0, br;q=0.5'), 'gzip')
+            self.assertEqual(compression.negotiate('gzip, br'), 'br')  # ties go to the better encoder
+
+    def test_large_json_is_compressed_small_is_not(self):
+        body = json.dumps([{'id': i, 'university': 'MIT'} for i in range(200)]).encode()
+        response = self.respond(HttpResponse(body, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), body)
+
+        small = self.respond(HttpResponse(b'{"ok": true}', content_type='application/json'))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        image = self.respond(HttpResponse(body, content_type='image/png'))
+        self.assertFalse(image.has_header('Content-Encoding'))
+
+    @skipIf(compression.brotli is None or compression.zstandard is None, 'brotli/zstandard not installed')
+    def test_optional_encodings(self):
+        body = b'{"x": "%s"}' % (b'y' * 5000)
+        response = self.respond(HttpResponse(body, content_type='application/json'), accept='br')
+        self.assertEqual(compression.brotli.decompress(response.content), body)
+        response = self.respond(HttpResponse(body, content_type='application/json'), accept='zstd')
+        self.assertEqual(compression.zstandard.ZstdDecompressor().decompressobj().decompress(response.content), body)
+
+    def test_streamed_export_is_compressed_per_chunk(self):
+        from bookings.models import Booking
+
+        User = get_user_model()
+        admin = User.objects.create_user('exporter', password='x', is_staff=True)
+        mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        Booking.objects.bulk_create(Booking(student=admin, mentor=mentor, slot_time=timezone.now()) for _ in range(50))
+        token = RefreshToken.for_user(admin).access_token
+        with override_settings(EXPORT_CHUNK_SIZE=10):
+            response = self.client.get(
+                '/api/internal/export/bookings.csv', headers={'Authorization': f'Bearer {token}'}, HTTP_ACCEPT_ENCODING='gzip',
+            )
+            chunks = list(response.streaming_content)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(len(gzip.decompress(b''.join(chunks)).decode().splitlines()), 51)
+
+        already = self.client.get(
+            '/api/internal/export/bookings.csv.gz', HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertFalse(already.has_header('Content-Encoding'))
+
+    def test_schema_is_served_precompressed(self):
+        from .schema import CachedSchemaView
+
+        CachedSchemaView.payloads.clear()
+        first = self.client.get('/api/schema/', HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch.object(compression._Gzip, 'compress') as compress:
+            second = self.client.get('/api/schema/', HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(second.content, first.content)
+        self.assertIn(b'openapi', gzip.decompress(second.content))
+        self.assertFalse(self.client.get('/api/schema/').has_header('Content-Encoding'))
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.student = User.objects.create_user('student', password='x')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILING_DIR=directory.name))
+
+    def get(self, path, profile=None, user=None):
+        headers = {}
+        if profile:
+            headers['X-Profile'] = profile
+        if user:
+            headers['Authorization'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return self.client.get(path, headers=headers)
+
+    def test_plain_requests_are_not_profiled(self):
+        response = self.get('/api/reviews/')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(profiling.list_ids(), [])
+        self.assertFalse(self.get('/api/reviews/', profile='cprofile:forged:sig').has_header('X-Profile-Id'))
+
+    def test_query_timer_is_only_installed_during_a_capture(self):
+        seen = []
+        original = profiling.Capture.record_query
+
+        def record_query(capture, *args):
+            seen.append(list(connection.execute_wrappers))
+            return original(capture, *args)
+
+        def captures(wrappers):
+            return [w for w in wrappers if isinstance(getattr(w, '__self__', None), profiling.Capture)]
+
+        with mock.patch.object(profiling.Capture, 'record_query', record_query):
+            self.get('/api/reviews/')
+            self.assertEqual(seen, [])
+            self.get('/api/reviews/', profile=profiling.make_token())
+        self.assertTrue(seen)
+        self.assertEqual(len(captures(seen[0])), 1)
+        self.assertEqual(captures(connection.execute_wrappers), [])
+
+    def test_signed_token_captures_profile_and_sql(self):
+        response = self.get('/api/reviews/', profile=profiling.make_token())
+        profile_id = response['X-Profile-Id']
+
+        detail = self.get(f'/api/internal/profiles/{profile_id}/', user=self.staff).json()
+        self.assertEqual((detail['mode'], detail['path'], detail['status']), ('cprofile', '/api/reviews/', 200))
+        self.assertTrue(any('reviews_review' in query['sql'] for query in detail['queries']))
+        self.assertIn('cumulative', detail['summary'])
+
+        listed = self.get('/api/internal/profiles/', user=self.staff).json()
+        self.assertIn(profile_id, [capture['id'] for capture in listed])
+        self.assertNotIn('queries', listed[0])
+        download = self.get(f'/api/internal/profiles/{profile_id}/download/', user=self.staff)
+        self.assertIn(f'{profile_id}.prof', download['Content-Disposition'])
+        self.assertEqual(self.get(f'/api/internal/profiles/{profile_id}/', user=self.student).status_code, 403)
+
+    def test_mode_header_needs_staff(self):
+        self.assertFalse(self.get('/api/users/me/', profile='sample', user=self.student).has_header('X-Profile-Id'))
+        response = self.get('/api/users/me/', profile='sample', user=self.staff)
+        path = profiling.data_path(response['X-Profile-Id'])
+        self.assertTrue(path.endswith('.folded'))
+
+    def test_asgi_captures_the_view_thread(self):
+        import httpx
+        from reviews.views import ReviewViewSet
+
+        original = ReviewViewSet.list
+
+        def slow_list(self, request, *args, **kwargs):
+            time.sleep(0.05)
+            return original(self, request, *args, **kwargs)
+
+        async def fetch():
+            transport = httpx.ASGITransport(app=PipelineASGIHandler())
+            async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+                return await client.get('/api/reviews/', headers={'X-Profile': profiling.make_token()})
+
+        with mock.patch.object(ReviewViewSet, 'list', slow_list):
+            response = asyncio.run(fetch())
+        profile_id = response.headers['X-Profile-Id']
+        capture = profiling.load(profile_id)
+        self.assertEqual(capture['mode'], 'sample')
+        self.assertTrue(any('reviews_review' in query['sql'] for query in capture['queries']))
+        with open(profiling.data_path(profile_id)) as file:
+            self.assertIn('slow_list (', file.read())
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_FILES=2)
+    def test_sampling_and_retention(self):
+        for _ in range(3):
+            self.assertTrue(self.get('/api/reviews/').has_header('X-Profile-Id'))
+        self.assertEqual(len(profiling.list_ids()), 2)
+        self.assertEqual(len(os.listdir(settings.PROFILING_DIR)), 4)
+
+
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_timed_per_view(self):
+        labels = {'view': 'review-list', 'method': 'GET'}
+        requests = self.sample('http_request_duration_seconds_count', **labels)
+        ok = self.sample('http_responses_total', status='200', **labels)
+        queries = self.sample('db_query_duration_seconds_count', alias='default')
+
+        self.assertEqual(self.client.get('/api/reviews/').status_code, 200)
+        self.assertEqual(self.sample('http_request_duration_seconds_count', **labels), requests + 1)
+        self.assertEqual(self.sample('http_responses_total', status='200', **labels), ok + 1)
+        self.assertGreater(self.sample('db_query_duration_seconds_count', alias='default'), queries)
+        self.assertEqual(self.sample('http_requests_in_flight'), 0)
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",view="review-list"}', body)
+
+    def test_cache_lookups(self):
+        test_cache.clear_local()
+        cache.clear()
+        misses = self.sample('cache_lookups_total', namespace='tests', result='miss')
+        hits = self.sample('cache_lookups_total', namespace='tests', result='local_hit')
+        test_cache.get_or_set('metrics', lambda: 1)
+        test_cache.get_or_set('metrics', lambda: 1)
+        self.assertEqual(self.sample('cache_lookups_total', namespace='tests', result='miss'), misses + 1)
+        self.assertEqual(self.sample('cache_lookups_total', namespace='tests', result='local_hit'), hits + 1)
+
+    def test_outbound_calls_are_timed(self):
+        import httpx
+
+        count = self.sample('outbound_request_duration_seconds_count', service='test', outcome='2xx')
+
+        async def call():
+            async with httpx.AsyncClient(transport=metrics.timed_transport('test')) as client:
+                return await client.get('https://example.invalid/')
+
+        with mock.patch.object(httpx.AsyncHTTPTransport, 'handle_async_request', return_value=httpx.Response(204)):
+            self.assertEqual(asyncio.run(call()).status_code, 204)
+        self.assertEqual(self.sample('outbound_request_duration_seconds_count', service='test', outcome='2xx'), count + 1)
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer scrape'}).status_code, 200)
+
+    def test_workers_are_aggregated(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory.name}
+        record = 'from unimentor import metrics; metrics.RESPONSES.labels("v", "GET", "200").inc()'
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', record], env=env, check=True)
+        scrape = (
+            'from prometheus_client import generate_latest; from unimentor import metrics; '
+            'print(generate_latest(metrics.registry()).decode())'
+        )
+        output = subprocess.run([sys.executable, '-c', scrape], env=env, check=True, capture_output=True, text=True)
+        self.assertIn('http_responses_total{method="GET",status="200",view="v"} 2.0', output.stdout)
+
+
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Every query counts as slow.
+        self.enterContext(override_settings(SLOW_QUERY_DIR=directory.name, SLOW_QUERY_THRESHOLD=1e-9))
+
+    def test_fingerprint_ignores_values_and_list_lengths(self):
+        sql = 'SELECT * FROM "users_user" WHERE "id" IN (%s, %s) AND "username" = %s LIMIT 21'
+        self.assertEqual(
+            slow_queries.fingerprint(sql),
+            slow_queries.fingerprint('SELECT *  FROM "users_user" WHERE "id" IN (%s, %s, %s) AND "username" = \'x\' LIMIT 5'),
+        )
+        self.assertNotEqual(slow_queries.fingerprint(sql), slow_queries.fingerprint(sql.replace('username', 'email')))
+
+    def test_requests_log_view_redacted_params_and_plan(self):
+        self.assertEqual(self.client.get('/api/reviews/').status_code, 200)
+        get_user_model().objects.filter(username='private-name', id__in=[1, 2]).exists()
+
+        entries = list(slow_queries.read())
+        reviews = [entry for entry in entries if 'reviews_review' in entry['sql']]
+        self.assertTrue(reviews)
+        self.assertEqual(reviews[0]['view'], 'ReviewViewSet.list')
+        self.assertTrue(reviews[0]['plan'])
+        self.assertFalse(any('EXPLAIN' in entry['sql'] for entry in entries))
+
+        lookup = next(entry for entry in entries if entry['params'] and '<str>' in entry['params'])
+        self.assertIsNone(lookup['view'])
+        self.assertIn(1, lookup['params'])
+        (name,) = os.listdir(settings.SLOW_QUERY_DIR)
+        with open(os.path.join(settings.SLOW_QUERY_DIR, name)) as file:
+            self.assertNotIn('private-name', file.read())
+
+    def test_entries_stay_out_of_other_logs(self):
+        with self.assertNoLogs(level='INFO'):
+            get_user_model().objects.exists()
+        self.assertTrue(list(slow_queries.read()))
+
+    def test_report_ranks_by_total_time(self):
+        for _ in range(3):
+            self.client.get('/api/reviews/')
+        offenders = slow_queries.top_offenders(slow_queries.read(), limit=50)
+        totals = [offender['total_ms'] for offender in offenders]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+        review_list = next(offender for offender in offenders if 'reviews_review' in offender['sql'])
+        self.assertEqual(review_list['count'], 3)
+
+        out = StringIO()
+        call_command('slow_queries', '--view', 'ReviewViewSet', '--plans', stdout=out)
+        self.assertIn('ReviewViewSet.list (3)', out.getvalue())
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_threshold_zero_turns_the_log_off(self):
+        self.client.get('/api/reviews/')
+        self.assertEqual(list(slow_queries.read()), [])
+
+
+class AsyncApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from bookings.models import Booking
+        from mentors.models import MentorProfile
+
+        User = get_user_model()
+        cls.student = User.objects.create_user('student', password='x')
+        other = User.objects.create_user('other', password='x')
+        mentor = User.objects.create_user('mentor', password='x', role=User.Role.MENTOR)
+        pending = User.objects.create_user('pending', password='x', role=User.Role.MENTOR)
+        cls.approved = MentorProfile.objects.create(user=mentor, status=MentorProfile.Status.APPROVED)
+        cls.unapproved = MentorProfile.objects.create(user=pending)
+        now = timezone.now()
+        cls.own = Booking.objects.create(student=cls.student, mentor=mentor, slot_time=now)
+        cls.foreign = Booking.objects.create(student=other, mentor=mentor, slot_time=now)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.student).access_token}')
+
+    def test_matches_the_sync_mentor_endpoints(self):
+        response = self.client.get('/api/async/mentors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.client.get('/api/mentors/').json())
+        self.assertEqual([profile['id'] for profile in response.json()], [self.approved.id])
+        self.assertEqual(self.client.get(f'/api/async/mentors/{self.approved.id}/').json()['id'], self.approved.id)
+        self.assertEqual(self.client.get(f'/api/async/mentors/{self.unapproved.id}/').status_code, 404)
+
+    def test_bookings_are_limited_to_participants(self):
+        response = self.client.get('/api/async/bookings/')
+        self.assertEqual([booking['id'] for booking in response.json()], [self.own.id])
+        self.assertEqual(self.client.get(f'/api/async/bookings/{self.own.id}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/async/bookings/{self.foreign.id}/').status_code, 404)
+
+    def test_rejects_missing_and_bad_tokens(self):
+        self.client.credentials()
+        response = self.client.get('/api/async/mentors/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get('/api/async/bookings/').status_code, 401)
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post('/api/async/mentors/', {}).status_code, 405)
+
+
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()  # throttle buckets
+
+    def test_journeys_complete_and_results_compare(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'run.json')
+        args = ['--url', self.live_server_url, '--journeys', '3', '--concurrency', '2', '--mentors', '2', '--seed', '1']
+        call_command('loadtest', *args, '--allow-seed', '--keep-data', '--save', path, stdout=StringIO())
+
+        with open(path) as file:
+            result = json.load(file)
+        self.assertEqual((result['journeys']['completed'], result['journeys']['failed']), (3, 0))
+        self.assertEqual(set(result['steps']) - {'journey'}, set(loadtest.STEPS) - {'oauth', 'journey'})
+        self.assertEqual(result['steps']['accept']['requests'], 3)
+        users = get_user_model().objects.filter(username__startswith='loadtest-')
+        self.assertEqual(users.filter(username__startswith=loadtest.MENTOR_PREFIX).count(), 2)
+        self.assertEqual(users.count(), 5)
+
+        rows = loadtest.compare(result, result)
+        self.assertIn(('review', 'p95_ms', result['steps']['review']['p95_ms'], result['steps']['review']['p95_ms'], 0.0), rows)
+
+    def test_seeding_and_cleanup_bump_the_directory(self):
+        from mentors.signals import changed_mentors, directory_version
+
+        usernames, _ = loadtest.seed_mentors(2)
+        ids = set(get_user_model().objects.filter(username__in=usernames).values_list('pk', flat=True))
+        self.assertEqual(changed_mentors(0, directory_version()), ids)
+
+        seeded = directory_version()
+        loadtest.cleanup(loadtest.new_run_id(), usernames)
+        self.assertEqual(changed_mentors(seeded, directory_version()), ids)
+
+    def test_needs_permission_to_seed_and_cleans_up(self):
+        from bookings.models import Booking
+
+        args = ['--url', self.live_server_url, '--journeys', '2', '--mentors', '1']
+        with self.assertRaises(CommandError):
+            call_command('loadtest', *args, stdout=StringIO())
+        self.assertFalse(get_user_model().objects.exists())
+
+        call_command('loadtest', *args, '--allow-seed', stdout=StringIO())
+        self.assertFalse(get_user_model().objects.filter(username__startswith='loadtest-').exists())
+        self.assertFalse(Booking.objects.exists())
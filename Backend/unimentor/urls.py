@@ -15,20 +15,24 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
 from rest_framework.routers import DefaultRouter
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+from unimentor import views as unimentor_views
+from unimentor.lazy import lazy_view
+from unimentor.metrics import metrics_view
+from unimentor.ratelimit import AuthThrottle
 
 # Include app routers
 from users.urls import router as users_router
 from mentors.urls import router as mentors_router
 from bookings.urls import router as bookings_router
-from payments.urls import router as payments_router
+from payments.urls import router as payments_router, webhook_urlpatterns as payments_webhook_urls
 from reviews.urls import router as reviews_router
 
 router = DefaultRouter()
@@ -41,11 +45,27 @@ router.registry.extend(reviews_router.registry)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/health/', unimentor_views.health, name='health'),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/internal/cache/', unimentor_views.CacheStatsView.as_view(), name='cache-stats'),
+    path('api/internal/db/', unimentor_views.DatabaseStatsView.as_view(), name='db-stats'),
+    path('api/internal/profiles/', unimentor_views.ProfileListView.as_view(), name='profile-list'),
+    path('api/internal/profiles/<str:profile_id>/', unimentor_views.ProfileDetailView.as_view(), name='profile-detail'),
+    path(
+        'api/internal/profiles/<str:profile_id>/download/', unimentor_views.ProfileDownloadView.as_view(),
+        name='profile-download',
+    ),
+    re_path(
+        r'^api/internal/export/(?P<name>\w+)\.(?P<fmt>csv|ndjson)(?P<gz>\.gz)?$',
+        unimentor_views.ExportView.as_view(), name='export',
+    ),
+    path('api/token/', TokenObtainPairView.as_view(throttle_classes=[AuthThrottle]), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/payments/webhooks/', include(payments_webhook_urls)),
+    path('api/async/', include('unimentor.async_urls')),  # Async read path for the ASGI server
     path('api/', include(router.urls)),
     path('api/users/', include('users.urls')),  # Include users URLs for OAuth endpoints
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('api/schema/', lazy_view('unimentor.schema.CachedSchemaView'), name='schema'),
+    path('api/docs/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
     # App-specific endpoints that might not use router could be included here later
 ]
@@ -0,0 +1,109 @@
+import os
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import cache, db, exports, profiling
+from .permissions import IsAdmin
+
+
+@require_GET
+def health(request):
+    """Cheap liveness probe for load balancers and the serve command."""
+    return JsonResponse({'status': 'ok'})
+
+
+class CacheStatsView(APIView):
+    """Per-namespace two-tier cache counters of the worker that answers."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'namespaces': cache.stats()})
+
+
+class DatabaseStatsView(APIView):
+    """Connection pool and statement timeout counters of the worker that answers."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(db.pool_stats())
+
+
+class ProfileListView(APIView):
+    """Stored request profiles, newest first, without their SQL."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        captures = (profiling.load(profile_id, queries=False) for profile_id in profiling.list_ids())
+        return Response([capture for capture in captures if capture is not None])
+
+
+class ProfileDetailView(APIView):
+    """A request profile with its SQL timings and a text summary of where the time went."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request, profile_id):
+        capture = profiling.load(profile_id)
+        if capture is None:
+            raise exceptions.NotFound('No such profile.')
+        return Response({**capture, 'summary': profiling.summary(profile_id)})
+
+
+class ProfileDownloadView(APIView):
+    """The raw profile: a pstats ``.prof`` file or folded stacks for flame graph tools."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request, profile_id):
+        path = profiling.data_path(profile_id)
+        if path is None:
+            raise exceptions.NotFound('No such profile.')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+
+class _AnyAccept(BaseContentNegotiation):
+    """Exports answer in the format named by the URL whatever the Accept header says."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(APIView):
+    """Stream a whole table as CSV or NDJSON, optionally gzipped.
+
+    Filters: ``?since=`` and ``?until=`` (ISO dates or datetimes, inclusive)
+    and ``?status=a,b`` where the table has one.
+    """
+    permission_classes = [IsAdmin]
+    content_negotiation_class = _AnyAccept
+
+    def get(self, request, name, fmt, gz=None):
+        if name not in exports.EXPORTS:
+            raise exceptions.NotFound(f'Unknown export {name!r}.')
+        params = request.query_params
+        try:
+            queryset = exports.export_queryset(
+                name, since=params.get('since'), until=params.get('until'),
+                statuses=[status for status in params.get('status', '').split(',') if status],
+            )
+        except exports.InvalidFilter as exc:
+            raise exceptions.ValidationError({exc.param: exc.message})
+        # The rows are read after the view returns: pin the database chosen for this request.
+        queryset = queryset.using(queryset.db)
+        filename = f"{name}-{timezone.now():%Y%m%d}.{fmt}{gz or ''}"
+        # Under ASGI a sync iterator would be read into memory whole before sending.
+        produce = exports.astream if isinstance(request._request, ASGIRequest) else exports.stream
+        response = StreamingHttpResponse(
+            produce(name, queryset, fmt, compress=bool(gz)),
+            content_type='application/gzip' if gz else f'{exports.FORMATS[fmt]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
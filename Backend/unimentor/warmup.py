@@ -0,0 +1,65 @@
+"""Warm-up steps run by the gunicorn hooks in ``unimentor.gunicorn_conf``.
+
+The shared, read-only work (URL resolver, the rendered OpenAPI schema and the
+imports it pulls in) runs once in the master before forking, so every worker
+inherits it copy-on-write. Per-process resources (connection pools, cache
+clients) can only be opened after the fork.
+"""
+import time
+
+from django.conf import settings
+
+
+def allowed_host() -> str:
+    """A Host header that passes ``ALLOWED_HOSTS`` validation."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.strip().lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+def warm_shared() -> float:
+    """Populate the URL resolver and ``CachedSchemaView``'s payload cache; return seconds taken."""
+    from django.test import RequestFactory
+    from django.urls import get_resolver
+    from django.utils import translation
+
+    from .schema import CachedSchemaView
+
+    started = time.perf_counter()
+    resolver = get_resolver()
+    resolver.reverse_dict  # forces _populate() of every included URLconf
+    # Rendered and compressed through the view itself, so its first request is a cache hit.
+    request = RequestFactory(SERVER_NAME=allowed_host()).get('/api/schema/')
+    with translation.override(settings.LANGUAGE_CODE):
+        CachedSchemaView.as_view()(request)
+    return time.perf_counter() - started
+
+
+def warm_worker() -> float:
+    """Fill this worker's database connection pools, open its cache clients and
+    start its invalidation bus listener; return seconds taken."""
+    from django.core.cache import caches
+    from django.db import connections
+
+    from .invalidation import listener
+
+    started = time.perf_counter()
+    # Requests run on other threads with their own connections, so only a pool
+    # (shared by all threads) is worth warming; nothing stays checked out.
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            pool.open(wait=True)
+    for cache in caches.all():
+        cache.get('warmup')
+    listener.start()
+    return time.perf_counter() - started
+
+
+def close_connections():
+    """Drop connections opened in the master so workers never share a socket."""
+    from django.db import connections
+
+    connections.close_all()
@@ -0,0 +1,18 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+
+from unimentor.async_api import aauthenticate, error_response
+from .serializers import UserSerializer
+
+
+@require_GET
+async def me(request):
+    """Async read-only counterpart of ``UserViewSet.me``."""
+    try:
+        user = await aauthenticate(request)
+        if user is None:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        return error_response(request, exc)
+    return JsonResponse(UserSerializer(user).data)
@@ -1,24 +1,77 @@
 import json
-import requests
+import time
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from django.views.decorators.http import require_GET, require_http_methods
 from rest_framework_simplejwt.tokens import RefreshToken
+from unimentor.metrics import timed_transport
+from unimentor.ratelimit import ratelimit
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
+_ssl_context = None
+_client = None
+
+
+async def _client_lifetime(client):
+    # While suspended here the event loop tracks this generator, so the
+    # client is closed on its own loop: by shutdown_asyncgens() when the loop
+    # ends (asyncio.run, async_to_sync, uvicorn), or by the loop's finalizer
+    # hook once oauth_client() replaces and drops it.
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+async def oauth_client():
+    """
+    Return the async HTTP client for the Google endpoints.
+
+    One client is shared by every request on the running event loop, so
+    calls reuse its pooled TLS connections; its connections belong to that
+    loop, so another loop (e.g. ``asyncio.run`` in a script) gets its own,
+    and each client is closed when its loop shuts down.
+    Building an SSL context costs ~30 ms, so one is shared by all clients.
+    """
+    # Imported on first use to keep the HTTP client stack out of worker boot.
+    import asyncio
+    import httpx
+
+    global _ssl_context, _client
+    loop = asyncio.get_running_loop()
+    if _client is not None and _client[0] is loop and not _client[1].is_closed:
+        return _client[1]
+    if _ssl_context is None:
+        import ssl
+        import certifi
+
+        _ssl_context = ssl.create_default_context(cafile=certifi.where())
+    client = httpx.AsyncClient(
+        timeout=settings.OAUTH_HTTP_TIMEOUT, transport=timed_transport('google-oauth', verify=_ssl_context),
+    )
+    lifetime = _client_lifetime(client)
+    await lifetime.__anext__()
+    _client = (loop, client, lifetime)
+    return client
+
+
+# The OAuth views are plain async Django views rather than DRF views: they
+# spend most of their time waiting on Google, and as coroutines they do so
+# without tying up a worker thread under the ASGI server.
+
+
 @csrf_exempt
-def google_auth(request):
+@require_http_methods(['POST'])
+@ratelimit('oauth')
+async def google_auth(request):
     """
     Handle Google OAuth authentication
     """
@@ -34,12 +87,12 @@ def google_auth(request):
         if user_info:
             google_user_info = user_info
         else:
-            google_user_info = get_google_user_info(access_token)
+            google_user_info = await get_google_user_info(access_token)
             if not google_user_info:
                 return JsonResponse({'error': 'Invalid access token'}, status=400)
         
         # Get or create user
-        user = get_or_create_user(google_user_info)
+        user = await sync_to_async(get_or_create_user)(google_user_info)
         
         # Generate JWT tokens
         refresh = RefreshToken.for_user(user)
@@ -63,13 +116,13 @@ def google_auth(request):
         return JsonResponse({'error': 'Authentication failed'}, status=500)
 
 
-def get_google_user_info(access_token):
+async def get_google_user_info(access_token):
     """
     Get user information from Google using access token
     """
     try:
-        response = requests.get(
-            'https://www.googleapis.com/oauth2/v2/userinfo',
+        response = await (await oauth_client()).get(
+            settings.GOOGLE_OAUTH2_USERINFO_URL,
             headers={'Authorization': f'Bearer {access_token}'}
         )
         
@@ -132,10 +185,10 @@ def get_or_create_user(google_user_info):
     return user
 
 
-@api_view(['GET', 'POST'])
-@permission_classes([AllowAny])
 @csrf_exempt
-def google_auth_callback(request):
+@require_http_methods(['GET', 'POST'])
+@ratelimit('oauth')
+async def google_auth_callback(request):
     """
     Handle Google OAuth callback with authorization code
     """
@@ -156,19 +209,19 @@ def google_auth_callback(request):
             # Use the exact redirect_uri that was sent to Google in the initial authorization request
             # This is now loaded from settings.PUBLIC_BACKEND_URL for better maintainability
             redirect_uri = f"{settings.PUBLIC_BACKEND_URL}/api/users/auth/google/callback/"
-            token_data = exchange_code_for_tokens(code, redirect_uri)
+            token_data = await exchange_code_for_tokens(code, redirect_uri)
             
             if not token_data:
                 return redirect(f"{settings.FRONTEND_URL}/index.html?error=token_exchange_failed")
             
             # Get user info from Google
-            user_info = get_google_user_info_from_token(token_data['access_token'])
+            user_info = await get_google_user_info(token_data['access_token'])
             
             if not user_info:
                 return redirect(f"{settings.FRONTEND_URL}/index.html?error=user_info_failed")
             
             # Get or create user
-            user = get_or_create_user(user_info)
+            user = await sync_to_async(get_or_create_user)(user_info)
             
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
@@ -187,19 +240,19 @@ def google_auth_callback(request):
                 return JsonResponse({'error': 'Authorization code is required'}, status=400)
             
             # Exchange code for tokens
-            token_data = exchange_code_for_tokens(code, redirect_uri)
+            token_data = await exchange_code_for_tokens(code, redirect_uri)
             
             if not token_data:
                 return JsonResponse({'error': 'Failed to exchange code for tokens'}, status=400)
             
             # Get user info from Google
-            user_info = get_google_user_info_from_token(token_data['access_token'])
+            user_info = await get_google_user_info(token_data['access_token'])
             
             if not user_info:
                 return JsonResponse({'error': 'Failed to get user information'}, status=400)
             
             # Get or create user
-            user = get_or_create_user(user_info)
+            user = await sync_to_async(get_or_create_user)(user_info)
             
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
@@ -223,12 +276,11 @@ def google_auth_callback(request):
         return JsonResponse({'error': 'Authentication failed'}, status=500)
 
 
-def exchange_code_for_tokens(code, redirect_uri):
+async def exchange_code_for_tokens(code, redirect_uri):
     """
     Exchange authorization code for access tokens
     """
     try:
-        token_url = 'https://oauth2.googleapis.com/token'
         token_data = {
             'client_id': settings.GOOGLE_OAUTH2_CLIENT_ID,
             'client_secret': settings.GOOGLE_OAUTH2_CLIENT_SECRET,
@@ -237,7 +289,7 @@ def exchange_code_for_tokens(code, redirect_uri):
             'redirect_uri': redirect_uri,
         }
         
-        response = requests.post(token_url, data=token_data)
+        response = await (await oauth_client()).post(settings.GOOGLE_OAUTH2_TOKEN_URL, data=token_data)
         
         if response.status_code == 200:
             return response.json()
@@ -250,29 +302,7 @@ def exchange_code_for_tokens(code, redirect_uri):
         return None
 
 
-def get_google_user_info_from_token(access_token):
-    """
-    Get user information from Google using access token
-    """
-    try:
-        response = requests.get(
-            'https://www.googleapis.com/oauth2/v2/userinfo',
-            headers={'Authorization': f'Bearer {access_token}'}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.error(f"Google API error: {response.status_code} - {response.text}")
-            return None
-            
-    except Exception as e:
-        logger.error(f"Error fetching Google user info: {str(e)}")
-        return None
-
-
-@api_view(['GET'])
-@permission_classes([AllowAny])
+@require_GET
 def google_auth_url(request):
     """
     Get Google OAuth URL for frontend to redirect to
@@ -292,10 +322,25 @@ def google_auth_url(request):
     return JsonResponse({'auth_url': auth_url})
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
+_google_certs = {'keys': None, 'expires_at': 0.0}
+
+
+async def get_google_certs():
+    """
+    Fetch Google's ID token signing certificates, cached for an hour
+    """
+    if _google_certs['keys'] is None or _google_certs['expires_at'] < time.monotonic():
+        response = await (await oauth_client()).get(settings.GOOGLE_OAUTH2_CERTS_URL)
+        response.raise_for_status()
+        _google_certs['keys'] = response.json()
+        _google_certs['expires_at'] = time.monotonic() + 3600
+    return _google_certs['keys']
+
+
 @csrf_exempt
-def google_auth_token(request):
+@require_http_methods(['POST'])
+@ratelimit('oauth')
+async def google_auth_token(request):
     """
     Handle Google OAuth with ID token
     """
@@ -306,19 +351,18 @@ def google_auth_token(request):
         if not id_token:
             return JsonResponse({'error': 'ID token is required'}, status=400)
         
-        # Verify ID token with Google
-        from google.oauth2 import id_token as id_token_verifier
-        from google.auth.transport import requests as google_requests
-        
-        request = google_requests.Request()
+        # Verify ID token against Google's certificates (same checks as
+        # google.oauth2.id_token.verify_oauth2_token, without its sync fetch)
+        from google.auth import jwt as google_jwt
         
         try:
-            id_info = id_token_verifier.verify_oauth2_token(
-                id_token, request, settings.GOOGLE_OAUTH2_CLIENT_ID
-            )
+            certs = await get_google_certs()
+            id_info = google_jwt.decode(id_token, certs=certs, audience=settings.GOOGLE_OAUTH2_CLIENT_ID)
+            if id_info.get('iss') not in ('accounts.google.com', 'https://accounts.google.com'):
+                raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
             
             # Get or create user
-            user = get_or_create_user_from_id_token(id_info)
+            user = await sync_to_async(get_or_create_user_from_id_token)(id_info)
             
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
@@ -0,0 +1,10 @@
+from unimentor.invalidation import broadcast_changes
+from .models import User
+from .serializers import UserSerializer
+
+
+# Profile edits (e.g. PATCH /api/users/me/) invalidate cached user data in every
+# worker. Only the fields cached payloads embed count, so the last_login update
+# on every login is not broadcast; nor is signing up, as nothing cached can
+# contain a user that did not exist yet.
+broadcast_changes(User, fields=UserSerializer.Meta.fields, created=False)
@@ -1,3 +1,166 @@
-from django.test import TestCase
+import asyncio
+import gc
+import json
+import threading
+from unittest import mock
+from urllib.parse import parse_qs
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import oauth_views
+from .models import User
+
+
+class OAuthTests(TestCase):
+    """The OAuth views against a stub Google behind an ``httpx.MockTransport``."""
+
+    user_info = {'id': 'google-1', 'email': 'ada@example.com', 'name': 'Ada Lovelace', 'picture': 'https://p/ada'}
+
+    def setUp(self):
+        cache.clear()
+        oauth_views._client = None
+        oauth_views._google_certs.update(keys=None, expires_at=0.0)
+        self.requests = []
+        self.transports = []
+        patcher = mock.patch.object(oauth_views, 'timed_transport', side_effect=self.transport)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def transport(self, service, **kwargs):
+        transport = httpx.MockTransport(self.google)
+        self.transports.append(transport)
+        return transport
+
+    def google(self, request):
+        self.requests.append(request)
+        url = str(request.url)
+        if url == settings.GOOGLE_OAUTH2_USERINFO_URL:
+            if request.headers['Authorization'] != 'Bearer good-token':
+                return httpx.Response(401, json={'error': 'invalid_token'})
+            return httpx.Response(200, json=self.user_info)
+        if url == settings.GOOGLE_OAUTH2_TOKEN_URL:
+            if parse_qs(request.content.decode())['code'] != ['good-code']:
+                return httpx.Response(400, json={'error': 'invalid_grant'})
+            return httpx.Response(200, json={'access_token': 'good-token'})
+        if url == settings.GOOGLE_OAUTH2_CERTS_URL:
+            return httpx.Response(200, json={'key-1': 'certificate'})
+        return httpx.Response(404)
+
+    def post(self, path, data):
+        return self.client.post(path, json.dumps(data), content_type='application/json')
+
+    def test_access_token_is_checked_with_google(self):
+        response = self.post('/api/users/auth/google/', {'access_token': 'good-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'ada@example.com')
+        user = User.objects.get(email='ada@example.com')
+        self.assertEqual((user.google_id, user.first_name, user.last_name), ('google-1', 'Ada', 'Lovelace'))
+
+        response = self.post('/api/users/auth/google/', {'access_token': 'bad-token'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(User.objects.count(), 1)
+
+    @override_settings(GOOGLE_OAUTH2_CLIENT_ID='client-id', GOOGLE_OAUTH2_CLIENT_SECRET='client-secret')
+    def test_callback_exchanges_the_code_on_one_client(self):
+        response = self.post(
+            '/api/users/auth/google/callback/', {'code': 'good-code', 'redirect_uri': 'https://app/callback'},
+        )
+        self.assertEqual(response.status_code, 200)
+        exchange, userinfo = self.requests
+        self.assertEqual(exchange.method, 'POST')
+        self.assertEqual(parse_qs(exchange.content.decode()), {
+            'client_id': ['client-id'],
+            'client_secret': ['client-secret'],
+            'code': ['good-code'],
+            'grant_type': ['authorization_code'],
+            'redirect_uri': ['https://app/callback'],
+        })
+        self.assertEqual(userinfo.headers['Authorization'], 'Bearer good-token')
+        self.assertEqual(len(self.transports), 1)
+
+    def test_callback_rejects_a_bad_code(self):
+        response = self.post('/api/users/auth/google/callback/', {'code': 'bad-code'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/users/auth/google/callback/', {'code': 'bad-code'})
+        self.assertRedirects(
+            response, f'{settings.FRONTEND_URL}/index.html?error=token_exchange_failed', fetch_redirect_response=False,
+        )
+
+    def test_client_is_shared_on_a_loop(self):
+        async def clients():
+            return await oauth_views.oauth_client(), await oauth_views.oauth_client()
+
+        first, second = asyncio.run(clients())
+        self.assertIs(first, second)
+        self.assertTrue(first.is_closed)
+        third, _ = asyncio.run(clients())
+        self.assertIsNot(third, first)
+        self.assertTrue(third.is_closed)
+
+    def test_replaced_client_is_closed_on_its_loop(self):
+        async def serve(started, release):
+            client = await oauth_views.oauth_client()
+            started.set()
+            await release.wait()
+            await asyncio.sleep(0)  # let the loop run the dropped client's aclose()
+            await asyncio.sleep(0)
+            return client
+
+        async def replace():
+            return await oauth_views.oauth_client()
+
+        loop = asyncio.new_event_loop()
+        started, release = threading.Event(), asyncio.Event()
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(
+            client=loop.run_until_complete(serve(started, release))))
+        thread.start()
+        started.wait()
+        replacement = asyncio.run(replace())
+        gc.collect()
+        loop.call_soon_threadsafe(release.set)
+        thread.join()
+        loop.close()
+        self.assertIsNot(replacement, result['client'])
+        self.assertTrue(result['client'].is_closed)
+
+    def id_token(self, claims):
+        request = RequestFactory().post('/', json.dumps({'id_token': 'token'}), content_type='application/json')
+        with mock.patch('google.auth.jwt.decode', return_value=claims) as decode:
+            response = async_to_sync(oauth_views.google_auth_token)(request)
+        decode.assert_called_once_with(
+            'token', certs={'key-1': 'certificate'}, audience=settings.GOOGLE_OAUTH2_CLIENT_ID,
+        )
+        return response
+
+    def test_id_token_is_verified_against_cached_certs(self):
+        claims = {'iss': 'https://accounts.google.com', 'sub': 'google-2', 'email': 'grace@example.com'}
+        self.assertEqual(self.id_token(claims).status_code, 200)
+        self.assertEqual(self.id_token(claims).status_code, 200)
+        self.assertEqual([str(request.url) for request in self.requests], [settings.GOOGLE_OAUTH2_CERTS_URL])
+        self.assertTrue(User.objects.filter(google_id='google-2').exists())
+
+    def test_id_token_from_another_issuer_is_rejected(self):
+        response = self.id_token({'iss': 'https://evil.example.com', 'sub': 'google-3', 'email': 'eve@example.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(google_id='google-3').exists())
+
+
+class AsyncMeTests(APITestCase):
+    def test_me_needs_a_token(self):
+        response = self.client.get('/api/async/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+    def test_me_returns_the_token_user(self):
+        user = User.objects.create_user('student', password='x')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        response = self.client.get('/api/async/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'student')
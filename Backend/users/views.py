@@ -2,11 +2,13 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from unimentor.fieldsets import SparseFieldsetMixin
+from unimentor.ratelimit import RegisterThrottle
 from .models import User
 from .serializers import UserSerializer, RegisterSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for managing users.
 
     List/retrieve restricted to staff for MVP. Users can view/update their own profile via `me`.
@@ -23,10 +25,16 @@ class UserViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return super().get_permissions()
 
+    def get_throttles(self):
+        # Sign-up hashes a password for anonymous callers, so limit it per IP.
+        if self.action in ['create', 'register']:
+            return [RegisterThrottle()]
+        return super().get_throttles()
+
     @action(detail=False, methods=['get', 'patch'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
         if request.method == 'GET':
-            return Response(UserSerializer(request.user).data)
+            return Response(self.get_serializer(request.user).data)
         serializer = UserSerializer(request.user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()